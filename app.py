@@ -1,28 +1,43 @@
 import os
 import time
 import gc
-import psutil
 from datetime import datetime
 from dotenv import load_dotenv
 import logging
 from apscheduler.schedulers.blocking import BlockingScheduler
 from modules import manage
+from modules.dispatcher import TelegramDispatcher, shutdown_dispatcher
+from modules.filters import CardFilter
+from modules.known_links import KnownLinksIndex
+from modules.metrics import MemorySampler, MetricsServer, current_rss_mb, get_metrics
+from modules.objects import configure_fetcher
+from modules.scheduling import SCHEDULING_DEFAULTS, AdaptiveInterval, ArrivalModel
+from modules.storage import create_storage
+from modules.subscriptions import Subscription
+from modules.telegram import close_senders
+from modules.write_behind import WriteBehindQueue
 import yaml
 from contextlib import contextmanager
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+import inspect
 import signal
+import threading
 import weakref
 from collections import deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import json
 
-def verify_environment():
+def verify_environment(storage_backend: str = 'azure', has_subscriptions: bool = False):
     """Verify all required environment variables are set"""
     required_vars = {
-        'AZURE_TABLES_CONNECTION_STRING': 'Azure Tables connection string',
-        'TELEGRAM_BOT_TOKEN': 'Telegram bot token',
-        'TELEGRAM_CHAT_ID': 'Telegram chat ID'
+        'TELEGRAM_BOT_TOKEN': 'Telegram bot token'
     }
+    # Subscriptions name their own chats
+    if not has_subscriptions:
+        required_vars['TELEGRAM_CHAT_ID'] = 'Telegram chat ID'
+    # Local storage backends need no Azure account
+    if storage_backend == 'azure':
+        required_vars['AZURE_TABLES_CONNECTION_STRING'] = 'Azure Tables connection string'
 
     missing = []
     for var, description in required_vars.items():
@@ -50,12 +65,21 @@ class JobMetrics:
     memory_peak: float = 0
     success: bool = False
     error: Optional[str] = None
+    run_stats: Dict[str, Any] = field(default_factory=dict)
 
 class JobStats:
-    """Manages job statistics"""
-    def __init__(self, maxlen: int = 100):
+    """
+    Manages job statistics
+
+    The memory peak of a run comes from a background sampler running for
+    the whole run. Every finished run is also exported to the metrics
+    registry, and the last maxlen runs make up the rolling summary.
+    """
+    def __init__(self, maxlen: int = 100, memory_sample_seconds: float = 0.1):
         self.metrics = deque(maxlen=maxlen)
         self.current_job: Optional[JobMetrics] = None
+        self.memory_sample_seconds = memory_sample_seconds
+        self._sampler: Optional[MemorySampler] = None
 
     def start_job(self) -> None:
         """Record job start metrics"""
@@ -63,31 +87,66 @@ class JobStats:
             start_time=datetime.now(),
             memory_before=self._get_memory_usage()
         )
+        self._sampler = MemorySampler(self.memory_sample_seconds)
+        self._sampler.start()
 
-    def end_job(self, success: bool, error: Optional[str] = None) -> None:
+    def end_job(self, success: bool, error: Optional[str] = None,
+                run_stats: Optional[Dict[str, Any]] = None) -> None:
         """Record job end metrics"""
         if self.current_job:
             self.current_job.end_time = datetime.now()
+            self.current_job.run_stats = run_stats or {}
             self.current_job.memory_after = self._get_memory_usage()
+            if self._sampler is not None:
+                self.current_job.memory_peak = self._sampler.stop()
+                self._sampler = None
             self.current_job.success = success
             self.current_job.error = error
             self.metrics.append(self.current_job)
+            self._export_metrics(self.current_job)
             self._log_metrics(self.current_job)
             self.current_job = None
 
-    def update_peak_memory(self) -> None:
-        """Update peak memory usage during job execution"""
-        if self.current_job:
-            self.current_job.memory_peak = max(
-                self.current_job.memory_peak,
-                self._get_memory_usage()
-            )
-
     @staticmethod
     def _get_memory_usage() -> float:
         """Get current memory usage in MB"""
-        process = psutil.Process(os.getpid())
-        return process.memory_info().rss / 1024 / 1024
+        return current_rss_mb()
+
+    @staticmethod
+    def _export_metrics(metrics: JobMetrics) -> None:
+        """Publish a finished run to the metrics registry"""
+        registry = get_metrics()
+        duration = (metrics.end_time - metrics.start_time).total_seconds()
+        registry.inc('pararius_runs_total', help='Finished scrape runs',
+                     result='success' if metrics.success else 'failure')
+        registry.set_gauge('pararius_last_run_duration_seconds', duration, help='Duration of the last run')
+        registry.set_gauge('pararius_last_run_memory_peak_mb', round(metrics.memory_peak, 2),
+                           help='Peak resident set size during the last run')
+        registry.set_gauge('pararius_last_run_timestamp_seconds', metrics.end_time.timestamp(),
+                           help='End time of the last run')
+
+    def summary(self) -> Dict[str, Any]:
+        """Rolling summary of the runs in the ring buffer"""
+        runs = list(self.metrics)
+        durations = sorted((run.end_time - run.start_time).total_seconds() for run in runs if run.end_time)
+        peaks = sorted(run.memory_peak for run in runs)
+
+        def percentile(values: List[float], fraction: float) -> Optional[float]:
+            return round(values[min(len(values) - 1, int(fraction * len(values)))], 2) if values else None
+
+        return {
+            'runs': len(runs),
+            'failures': sum(1 for run in runs if not run.success),
+            'last_run': runs[-1].start_time.isoformat() if runs else None,
+            'last_error': next((run.error for run in reversed(runs) if run.error), None),
+            'duration_seconds': {
+                'p50': percentile(durations, 0.5), 'p95': percentile(durations, 0.95),
+                'max': durations[-1] if durations else None
+            },
+            'memory_peak_mb': {
+                'p50': percentile(peaks, 0.5), 'max': round(peaks[-1], 2) if peaks else None
+            }
+        }
 
     def _log_metrics(self, metrics: JobMetrics) -> None:
         """Log job metrics"""
@@ -102,48 +161,202 @@ class JobStats:
             "memory_peak_mb": round(metrics.memory_peak, 2),
             "memory_diff_mb": round(memory_diff, 2),
             "success": metrics.success,
-            "error": metrics.error
+            "error": metrics.error,
+            **metrics.run_stats
         }
 
         logging.info("Job Statistics: %s", json.dumps(log_data, indent=2))
 
 class ConfigValidator:
     """Validates configuration values"""
+    # Fields describing one search, either at top level or per entry of 'searches'
+    search_fields = {
+        'city': str,
+        'minimum_bedrooms': (int, float, str),
+        'max_price_in_euros': (int, float),
+        'km_radius': (int, float)
+    }
+
+    # Sections splatted into a constructor or function: its target, the parameters
+    # the app passes itself, and extra keys the app reads with their types
+    option_sections = {
+        'fetcher': (configure_fetcher, (), {}),
+        'card_filter': (CardFilter, (), {}),
+        'storage': (create_storage, ('connection_string',), {}),
+        'write_behind': (WriteBehindQueue, ('store',), {}),
+        'telegram': (TelegramDispatcher, ('deliver',), {'digest': (bool,)}),
+        'known_links_index': (KnownLinksIndex, (), {}),
+        'retention': (manage.retention_job,
+                      ('azure_table_connection_string', 'storage_options', 'fetcher_options', 'known_links_options'),
+                      {'interval_hours': (int, float)})
+    }
+
+    @staticmethod
+    def _parameter_types(target: Callable) -> Dict[str, Tuple[type, ...]]:
+        """Accepted value types per keyword parameter of a constructor or function"""
+        signature = inspect.signature(target)
+        hints = get_type_hints(target.__init__ if inspect.isclass(target) else target)
+        types = {}
+        for name, parameter in signature.parameters.items():
+            if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+                continue
+            annotation = hints.get(name)
+            if annotation is None:
+                types[name] = (object,)
+                continue
+            args = get_args(annotation) if get_origin(annotation) is Union else (annotation,)
+            accepted = tuple(get_origin(arg) or arg for arg in args if arg is not type(None))
+            # YAML writes whole numbers without a decimal point
+            types[name] = accepted + (int,) if float in accepted else accepted
+        return types
+
+    @staticmethod
+    def _check_options(section: str,
+                       options: Dict[str, Any],
+                       target: Callable,
+                       passed_by_app: Tuple[str, ...] = (),
+                       extra: Optional[Dict[str, Tuple[type, ...]]] = None) -> None:
+        """Check a section's keys and value types against the parameters of the target it is passed to"""
+        accepted = {
+            name: types for name, types in ConfigValidator._parameter_types(target).items()
+            if name not in passed_by_app
+        }
+        ConfigValidator._check_keys(section, options, {**accepted, **(extra or {})})
+
+    @staticmethod
+    def _check_keys(section: str, options: Dict[str, Any], accepted: Dict[str, Tuple[type, ...]]) -> None:
+        """Check a section only holds the accepted keys, with values of their types"""
+        for key, value in options.items():
+            if key not in accepted:
+                raise ValueError(f"Unknown {section} option: {key}")
+            if value is not None and not isinstance(value, accepted[key]):
+                raise TypeError(f"{section} option {key} must be of type "
+                                f"{' or '.join(t.__name__ for t in accepted[key])}")
+
+    @staticmethod
+    def search_profiles(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Search profiles of a config: the 'searches' list, or the top-level search fields"""
+        if 'searches' in config:
+            return config['searches']
+        return [{field: config[field] for field in ConfigValidator.search_fields if field in config}]
+
+    @staticmethod
+    def _check_fields(config: Dict[str, Any], required_fields: Dict[str, Any]) -> None:
+        """Check required fields exist, converting string values to the expected types"""
+        for field, field_type in required_fields.items():
+            if field not in config:
+                raise ValueError(f"Missing required field: {field}")
+
+            # Convert string values to appropriate types
+            if isinstance(field_type, tuple):
+                if not isinstance(config[field], field_type):
+                    config[field] = float(config[field])
+            elif not isinstance(config[field], field_type):
+                raise TypeError(f"Field {field} must be of type {field_type}")
+
+    @staticmethod
+    def _validate_search(profile: Dict[str, Any]) -> None:
+        """Validate a single search profile"""
+        ConfigValidator._check_fields(profile, ConfigValidator.search_fields)
+
+        if not profile['city'].strip():
+            raise ValueError("City cannot be empty")
+
+        if float(profile['minimum_bedrooms']) <= 0:
+            raise ValueError("Minimum bedrooms must be greater than 0")
+
+        if float(profile['max_price_in_euros']) <= 0:
+            raise ValueError("Maximum price must be greater than 0")
+
+        if float(profile['km_radius']) < 0:
+            raise ValueError("Radius cannot be negative")
+
     @staticmethod
     def validate_config(config: Dict[str, Any]) -> bool:
         required_fields = {
-            'city': str,
-            'minimum_bedrooms': (int, float, str),
-            'max_price_in_euros': (int, float),
-            'km_radius': (int, float),
             'scrape_interval_in_minutes': (int, float)
         }
 
-        try:
-            # Check all required fields exist
-            for field, field_type in required_fields.items():
-                if field not in config:
-                    raise ValueError(f"Missing required field: {field}")
-
-                # Convert string values to appropriate types
-                if isinstance(field_type, tuple):
-                    if not isinstance(config[field], field_type):
-                        config[field] = float(config[field])
-                elif not isinstance(config[field], field_type):
-                    raise TypeError(f"Field {field} must be of type {field_type}")
-
-            # Validate specific field constraints
-            if not config['city'].strip():
-                raise ValueError("City cannot be empty")
+        # Optional fields and the defaults used when they are left out
+        optional_fields = {
+            'max_pages': (int, 1),
+            'page_concurrency': (int, 1),
+            'fetcher': (dict, {}),
+            'card_filter': (dict, {}),
+            'known_links_index': (dict, {}),
+            'storage': (dict, {'backend': 'azure'}),
+            'notify_price_drops': (bool, True),
+            'write_behind': (dict, {}),
+            'retention': (dict, {}),
+            'telegram': (dict, {}),
+            'subscriptions': (list, []),
+            'pipeline': (dict, {}),
+            'metrics': (dict, {'enabled': True, 'port': 8000}),
+            'scheduling': (dict, {'mode': 'fixed'}),
+            'config_reload_seconds': ((int, float), 10)
+        }
 
-            if float(config['minimum_bedrooms']) <= 0:
-                raise ValueError("Minimum bedrooms must be greater than 0")
+        try:
+            ConfigValidator._check_fields(config, required_fields)
 
-            if float(config['max_price_in_euros']) <= 0:
-                raise ValueError("Maximum price must be greater than 0")
+            for field, (field_type, default) in optional_fields.items():
+                config.setdefault(field, default.copy() if isinstance(default, (dict, list)) else default)
+                if not isinstance(config[field], field_type):
+                    raise TypeError(f"Field {field} must be of type {field_type}")
 
-            if float(config['km_radius']) < 0:
-                raise ValueError("Radius cannot be negative")
+            # Validate search profiles
+            searches = ConfigValidator.search_profiles(config)
+            if not isinstance(searches, list) or not searches:
+                raise ValueError("Searches must be a non-empty list")
+
+            for profile in searches:
+                if not isinstance(profile, dict):
+                    raise TypeError("Every search must be a mapping of search fields")
+                ConfigValidator._validate_search(profile)
+
+            if config['max_pages'] < 1:
+                raise ValueError("Max pages must be at least 1")
+
+            if config['page_concurrency'] < 1:
+                raise ValueError("Page concurrency must be at least 1")
+
+            if config['storage'].get('backend', 'azure') not in ('azure', 'sqlite', 'memory'):
+                raise ValueError(f"Unknown storage backend: {config['storage']['backend']}")
+
+            for subscription in config['subscriptions']:
+                if not isinstance(subscription, dict) or not subscription.get('chat_id'):
+                    raise ValueError("Every subscription must be a mapping with a chat_id")
+                ConfigValidator._check_options('subscriptions', subscription, Subscription,
+                                               extra={'chat_id': (str, int)})
+
+            # A key the target does not take would only fail later, at every run
+            for section, (target, passed_by_app, extra) in ConfigValidator.option_sections.items():
+                ConfigValidator._check_options(section, config[section], target, passed_by_app, extra)
+            ConfigValidator._check_keys('pipeline', config['pipeline'],
+                                        {key: (int,) for key in manage.PIPELINE_DEFAULTS})
+            ConfigValidator._check_keys('metrics', config['metrics'], {
+                'enabled': (bool,), 'host': (str,), 'port': (int,), 'memory_sample_seconds': (int, float)
+            })
+            ConfigValidator._check_keys('scheduling', config['scheduling'], {
+                key: (str,) if isinstance(default, str) else (int, float)
+                for key, default in SCHEDULING_DEFAULTS.items()
+            })
+
+            retention = config['retention']
+            for field in ('ttl_days', 'interval_hours'):
+                if field in retention and not (isinstance(retention[field], (int, float)) and retention[field] > 0):
+                    raise ValueError(f"Retention {field} must be a positive number")
+
+            scheduling = {**SCHEDULING_DEFAULTS, **config['scheduling']}
+            if scheduling['mode'] not in ('fixed', 'adaptive'):
+                raise ValueError(f"Unknown scheduling mode: {scheduling['mode']}")
+            if not 0 < scheduling['min_interval_minutes'] <= scheduling['max_interval_minutes']:
+                raise ValueError("Scheduling needs 0 < min_interval_minutes <= max_interval_minutes")
+            if not 0 <= scheduling['jitter'] < 1:
+                raise ValueError("Scheduling jitter must be a fraction between 0 and 1")
+
+            if config['config_reload_seconds'] < 0:
+                raise ValueError("Config reload seconds must not be negative")
 
             return True
 
@@ -152,14 +365,40 @@ class ConfigValidator:
             raise ValueError(f"Invalid configuration: {str(e)}")
 
 class SchedulerManager:
-    """Manages the APScheduler with proper cleanup"""
+    """
+    Manages the APScheduler with proper cleanup
+
+    In the adaptive scheduling mode, the scrape job is rescheduled after
+    every run with an interval derived from the hourly arrival rate of new
+    listings, learned from the stored history and the runs since.
+
+    Every config_reload_seconds the config file is checked for changes. A
+    valid new config is picked up by the next run; scheduling, retention and
+    metrics settings are applied right away, and the Telegram dispatcher is
+    restarted before the next run when its options changed. The browser, HTTP
+    pools and known-links index stay warm.
+    """
+
+    SCRAPE_JOB_ID = 'scrape'
+    RETENTION_JOB_ID = 'retention'
+    CONFIG_JOB_ID = 'config_watch'
+
     def __init__(self, config_manager: 'ConfigManager'):
         self.config_manager = config_manager
         self.scheduler = BlockingScheduler()
         self.bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
         self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
         self.azure_table_connection_string = os.getenv('AZURE_TABLES_CONNECTION_STRING')
-        self.job_stats = JobStats(maxlen=100)
+        self.job_stats = JobStats(
+            maxlen=100,
+            memory_sample_seconds=config_manager.get_config().get('metrics', {}).get('memory_sample_seconds', 0.1)
+        )
+        self.metrics_server: Optional[MetricsServer] = None
+        self.adaptive_interval: Optional[AdaptiveInterval] = None
+        self._history_fitted_at = 0.0
+        self._next_minutes: Optional[float] = None
+        self._schedule_lock = threading.RLock()
+        self._restart_dispatcher = False
 
         # Set up signal handlers
         signal.signal(signal.SIGINT, self._shutdown)
@@ -171,8 +410,16 @@ class SchedulerManager:
     def run_job(self) -> None:
         """Execute the job with proper resource management"""
         self.job_stats.start_job()
+        run_stats = None
 
         try:
+            if self._restart_dispatcher:
+                # Telegram options changed; the next get_dispatcher starts one with the new ones
+                # and sends what the old one left in the journal
+                self._restart_dispatcher = False
+                shutdown_dispatcher(timeout=30)
+
+            # One snapshot for the whole run, so a reload never mixes two configs
             config = self.config_manager.get_config()
 
             # Validate config before running
@@ -180,20 +427,33 @@ class SchedulerManager:
 
             # Create job context
             job_context = {
-                'city': config["city"].lower(),
-                'minimum_bedrooms': str(config["minimum_bedrooms"]),
-                'max_price_in_euros': str(config["max_price_in_euros"]),
-                'km_radius': str(config["km_radius"]),
+                'searches': [
+                    {
+                        'city': profile["city"].lower(),
+                        'minimum_bedrooms': str(profile["minimum_bedrooms"]),
+                        'max_price_in_euros': str(profile["max_price_in_euros"]),
+                        'km_radius': str(profile["km_radius"])
+                    }
+                    for profile in ConfigValidator.search_profiles(config)
+                ],
+                'max_pages': config["max_pages"],
+                'page_concurrency': config["page_concurrency"],
+                'fetcher_options': config["fetcher"],
+                'card_filter': config["card_filter"],
+                'known_links_options': config["known_links_index"],
+                'storage_options': config["storage"],
+                'notify_price_drops': config["notify_price_drops"],
+                'write_behind_options': config["write_behind"],
+                'telegram_options': config["telegram"],
+                'subscriptions': config["subscriptions"],
+                'pipeline_options': config["pipeline"],
                 'bot_token': self.bot_token,
                 'chat_id': self.chat_id,
                 'azure_table_connection_string': self.azure_table_connection_string
             }
 
-            # Monitor peak memory during execution
-            self.job_stats.update_peak_memory()
-
             # Execute job
-            manage.cronjob(**job_context)
+            run_stats = manage.cronjob(**job_context)
 
             # Clear job context
             del job_context
@@ -201,12 +461,93 @@ class SchedulerManager:
             # Force garbage collection
             gc.collect()
 
-            self.job_stats.end_job(success=True)
+            self.job_stats.end_job(success=True, run_stats=run_stats)
 
         except Exception as e:
             self.job_stats.end_job(success=False, error=str(e))
             self._cleanup()
             raise
+        finally:
+            self._adapt_interval(run_stats)
+
+    def _scheduling_options(self) -> Dict[str, Any]:
+        return {**SCHEDULING_DEFAULTS, **self.config_manager.get_config().get('scheduling', {})}
+
+    def _setup_adaptive_interval(self, config: Dict[str, Any]) -> None:
+        """Create the arrival model and interval when scheduling is adaptive"""
+        options = self._scheduling_options()
+        if options['mode'] != 'adaptive':
+            return
+
+        self.adaptive_interval = AdaptiveInterval(
+            ArrivalModel(history_days=options['history_days']),
+            min_interval_minutes=options['min_interval_minutes'],
+            max_interval_minutes=options['max_interval_minutes'],
+            target_new_per_run=options['target_new_per_run'],
+            jitter=options['jitter'],
+            max_backoff_minutes=options['max_backoff_minutes'],
+            default_interval_minutes=config['scrape_interval_in_minutes']
+        )
+        self._fit_arrival_model()
+
+    def _fit_arrival_model(self) -> None:
+        """Learn arrival rates from the stored history; on failure the current model is kept"""
+        config = self.config_manager.get_config()
+        model = self.adaptive_interval.model
+        try:
+            rows = manage.arrival_history(
+                azure_table_connection_string=self.azure_table_connection_string,
+                storage_options=config['storage'],
+                history_days=model.history_days
+            )
+            counted = model.fit(rows)
+            logging.info(f"Learned listing arrival rates from {counted} stored rows")
+        except Exception as e:
+            logging.error(f"Could not read the listing history: {e}")
+        finally:
+            self._history_fitted_at = time.time()
+
+    def _adapt_interval(self, run_stats: Optional[Dict[str, Any]]) -> None:
+        """Reschedule the scrape job after a run, when scheduling is adaptive"""
+        with self._schedule_lock:
+            if self.adaptive_interval is not None:
+                self._adapt_interval_locked(run_stats)
+
+    def _adapt_interval_locked(self, run_stats: Optional[Dict[str, Any]]) -> None:
+        try:
+            if time.time() - self._history_fitted_at >= self._scheduling_options()['refresh_hours'] * 3600:
+                self._fit_arrival_model()
+            elif run_stats:
+                self.adaptive_interval.model.record(run_stats.get('new_listings', 0))
+
+            # Pararius always lists something, so a run without search cards means it failed or blocked us
+            error = not (run_stats or {}).get('fetched_cards')
+            self._next_minutes = self.adaptive_interval.next_minutes(error=error)
+            get_metrics().set_gauge('pararius_scrape_interval_minutes', round(self._next_minutes, 2),
+                                    help='Minutes until the next scrape run')
+            logging.info(f"Next scrape run in {self._next_minutes:.1f} minutes")
+
+            if self.scheduler.get_job(self.SCRAPE_JOB_ID) is not None:
+                self.scheduler.reschedule_job(self.SCRAPE_JOB_ID, trigger='interval', minutes=self._next_minutes)
+        except Exception as e:
+            logging.error(f"Could not adapt the scrape interval: {e}")
+
+    def run_retention(self) -> None:
+        """Execute the retention job; a failure is logged and retried at the next interval"""
+        try:
+            config = self.config_manager.get_config()
+            options = {key: value for key, value in config['retention'].items() if key != 'interval_hours'}
+            manage.retention_job(
+                azure_table_connection_string=self.azure_table_connection_string,
+                storage_options=config['storage'],
+                fetcher_options=config['fetcher'],
+                known_links_options=config['known_links_index'],
+                **options
+            )
+        except Exception as e:
+            logging.error(f"Retention job failed: {e}")
+        finally:
+            gc.collect()
 
     def start(self) -> None:
         """Start the scheduler with proper error handling"""
@@ -217,7 +558,13 @@ class SchedulerManager:
             # Validate config before running
             ConfigValidator.validate_config(config)
 
-            logging.info(f"Scraping pararius every {config['scrape_interval_in_minutes']} minute")
+            if self._scheduling_options()['mode'] == 'adaptive':
+                logging.info("Scraping pararius at an adaptive interval")
+                self._setup_adaptive_interval(config)
+            else:
+                logging.info(f"Scraping pararius every {config['scrape_interval_in_minutes']} minute")
+
+            self._start_metrics_server(config)
 
             # Initial job run
             self.run_job()
@@ -227,11 +574,15 @@ class SchedulerManager:
             self.scheduler.add_job(
                 self.run_job,
                 'interval',
-                minutes=config["scrape_interval_in_minutes"],
+                id=self.SCRAPE_JOB_ID,
+                minutes=self._next_minutes or config["scrape_interval_in_minutes"],
                 max_instances=1,  # Prevent job overlapping
                 coalesce=True     # Combine missed runs
             )
 
+            self._schedule_retention(config)
+            self._schedule_config_watch(config)
+
             self.scheduler.start()
 
         except (KeyboardInterrupt, SystemExit):
@@ -240,6 +591,93 @@ class SchedulerManager:
             logging.error(f"Scheduler error: {e}")
             self._shutdown()
 
+    def _start_metrics_server(self, config: Dict[str, Any]) -> None:
+        """Serve /metrics, /health and /summary while the scheduler runs"""
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if config['metrics'].get('enabled', True):
+            self.metrics_server = MetricsServer(
+                get_metrics(),
+                host=config['metrics'].get('host', '0.0.0.0'),
+                port=config['metrics'].get('port', 8000),
+                summary=self.job_stats.summary
+            ).start()
+
+    def _schedule_retention(self, config: Dict[str, Any]) -> None:
+        """Add, reschedule or remove the retention job; it only runs when a TTL is configured"""
+        if self.scheduler.get_job(self.RETENTION_JOB_ID) is not None:
+            self.scheduler.remove_job(self.RETENTION_JOB_ID)
+        if config['retention'].get('ttl_days'):
+            self.scheduler.add_job(
+                self.run_retention,
+                'interval',
+                id=self.RETENTION_JOB_ID,
+                hours=config['retention'].get('interval_hours', 24),
+                max_instances=1,
+                coalesce=True
+            )
+
+    def _schedule_config_watch(self, config: Dict[str, Any]) -> None:
+        """Add or reschedule the config file check; config_reload_seconds of 0 disables it"""
+        if self.scheduler.get_job(self.CONFIG_JOB_ID) is not None:
+            self.scheduler.remove_job(self.CONFIG_JOB_ID)
+        if config['config_reload_seconds'] > 0:
+            self.scheduler.add_job(
+                self.check_config,
+                'interval',
+                id=self.CONFIG_JOB_ID,
+                seconds=config['config_reload_seconds'],
+                max_instances=1,
+                coalesce=True
+            )
+
+    def check_config(self) -> None:
+        """Apply the config file when it changed; an invalid file keeps the current config"""
+        old = self.config_manager.get_config()
+        new = self.config_manager.reload_if_changed()
+        if new is None:
+            return
+        try:
+            self._apply_config(old, new)
+        except Exception as e:
+            logging.error(f"Error applying the reloaded config: {e}")
+
+    def _apply_config(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        """Apply what a new config changes outside of the runs themselves"""
+        with self._schedule_lock:
+            old_scheduling = {**SCHEDULING_DEFAULTS, **old['scheduling']}
+            new_scheduling = {**SCHEDULING_DEFAULTS, **new['scheduling']}
+            if new_scheduling['mode'] == 'adaptive':
+                if old_scheduling != new_scheduling or self.adaptive_interval is None:
+                    self._setup_adaptive_interval(new)
+                    self._next_minutes = self.adaptive_interval.next_minutes()
+                    self.scheduler.reschedule_job(self.SCRAPE_JOB_ID, trigger='interval', minutes=self._next_minutes)
+                    logging.info(f"Switched to adaptive scheduling, next run in {self._next_minutes:.1f} minutes")
+            elif (old_scheduling['mode'] != 'fixed'
+                  or old['scrape_interval_in_minutes'] != new['scrape_interval_in_minutes']):
+                self.adaptive_interval = None
+                self._next_minutes = None
+                self.scheduler.reschedule_job(
+                    self.SCRAPE_JOB_ID, trigger='interval', minutes=new['scrape_interval_in_minutes']
+                )
+                logging.info(f"Scraping pararius every {new['scrape_interval_in_minutes']} minute")
+
+        if old['retention'] != new['retention']:
+            self._schedule_retention(new)
+
+        if old['config_reload_seconds'] != new['config_reload_seconds']:
+            self._schedule_config_watch(new)
+
+        if old['metrics'] != new['metrics']:
+            self.job_stats.memory_sample_seconds = new['metrics'].get('memory_sample_seconds', 0.1)
+            self._start_metrics_server(new)
+
+        def dispatcher_options(config: Dict[str, Any]) -> Dict[str, Any]:
+            return {key: value for key, value in config['telegram'].items() if key != 'digest'}
+        if dispatcher_options(old) != dispatcher_options(new):
+            self._restart_dispatcher = True
+
     def _cleanup(self) -> None:
         """Clean up resources"""
         try:
@@ -258,6 +696,11 @@ class SchedulerManager:
         try:
             if self.scheduler.running:
                 self.scheduler.shutdown(wait=False)
+            # Send what is still queued before the sessions close
+            shutdown_dispatcher(timeout=30)
+            close_senders()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
             self._cleanup()
             logging.info("Shutdown completed successfully.")
         except Exception as e:
@@ -266,29 +709,79 @@ class SchedulerManager:
             exit(0)
 
 class ConfigManager:
-    """Manages configuration with proper resource handling"""
+    """
+    Manages configuration with proper resource handling
+
+    reload_if_changed re-reads the file when its modification time or size
+    changed. A new config only replaces the current one once it passed
+    validation, and the swap happens under a lock, so readers always get
+    either the old or the new config as a whole.
+    """
     def __init__(self, path: str = "config.yaml"):
         self.path = path
         self.config: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._signature: Optional[tuple] = None
         self._load_config()
 
+    def _file_signature(self) -> tuple:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_config(self) -> Dict[str, Any]:
+        with open(self.path, "r") as file:
+            config = yaml.safe_load(file)
+        # Validate config on load
+        ConfigValidator.validate_config(config)
+        return config
+
     def _load_config(self) -> None:
         try:
-            with open(self.path, "r") as file:
-                self.config = yaml.safe_load(file)
-            # Validate config on load
-            ConfigValidator.validate_config(self.config)
+            signature = self._file_signature()
+            config = self._read_config()
+            with self._lock:
+                self.config, self._signature = config, signature
         except Exception as e:
             logging.error(f"Error loading config: {e}")
             raise
 
+    def reload_if_changed(self) -> Optional[Dict[str, Any]]:
+        """
+        Load the file again when it changed since the last load
+
+        Returns:
+            Optional[Dict[str, Any]]: The new config once applied, None when the
+            file is unchanged or the new one is invalid (the current one is kept)
+        """
+        try:
+            signature = self._file_signature()
+        except OSError as e:
+            logging.error(f"Cannot read config file {self.path}: {e}")
+            return None
+        if signature == self._signature:
+            return None
+
+        # Remember the attempt, so an invalid file is reported once rather than on every check
+        self._signature = signature
+        try:
+            config = self._read_config()
+        except Exception as e:
+            logging.error(f"Keeping the current config, {self.path} is invalid: {e}")
+            return None
+
+        with self._lock:
+            self.config = config
+        logging.info(f"Reloaded config from {self.path}")
+        return config.copy()
+
     def get_config(self) -> Dict[str, Any]:
-        return self.config.copy()
+        with self._lock:
+            return self.config.copy()
 
 @contextmanager
-def create_scheduler() -> SchedulerManager:
+def create_scheduler(config_manager: Optional['ConfigManager'] = None) -> SchedulerManager:
     """Context manager for scheduler lifecycle"""
-    config_manager = ConfigManager()
+    config_manager = config_manager or ConfigManager()
     scheduler_manager = SchedulerManager(config_manager)
     try:
         yield scheduler_manager
@@ -309,12 +802,15 @@ def main():
         # Load environment variables
         load_dotenv()
 
+        config_manager = ConfigManager()
+
         # Verify environment
         logging.info("Verifying environment variables...")
-        verify_environment()
+        config = config_manager.get_config()
+        verify_environment(config['storage'].get('backend', 'azure'), has_subscriptions=bool(config['subscriptions']))
 
         # Run scheduler with context manager
-        with create_scheduler() as scheduler:
+        with create_scheduler(config_manager) as scheduler:
             scheduler.start()
 
     except EnvironmentError as e:
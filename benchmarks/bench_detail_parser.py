@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of detail page parsing: the original double-find html.parser
+extraction against the selector-table parser in modules.objects.
+
+Run: python benchmarks/bench_detail_parser.py [--pages 200]
+"""
+import sys
+import os
+import argparse
+import timeit
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup as bs
+from modules.objects import parse_object_details, HTML_PARSER
+
+def make_detail_page(filler_blocks: int = 300) -> str:
+    """Synthetic detail page padded with the navigation, scripts and photo markup a real page carries"""
+    filler = "".join(
+        f'<div class="media-block"><img src="/photo/{i}.jpg" alt="photo {i}">'
+        f'<p class="caption">Photo {i} of the living room, kitchen and garden</p></div>'
+        for i in range(filler_blocks)
+    )
+    scripts = "".join(f"<script>window.__data{i} = {{'key': {i}}};</script>" for i in range(50))
+    return f"""
+<html><head><title>Apartment for rent</title>{scripts}</head><body>
+<nav class="menu">{''.join(f'<a href="/page/{i}">Link {i}</a>' for i in range(100))}</nav>
+{filler}
+<section class="listing-detail-summary">
+  <div class="listing-detail-summary__price">
+    <span class="listing-detail-summary__price-main">€1,650</span>
+    <span class="listing-detail-summary__price-postfix">per month</span>
+  </div>
+  <ul class="illustrated-features">
+    <li class="illustrated-features__item illustrated-features__item--surface-area">75 m²</li>
+  </ul>
+</section>
+<section class="listing-features">
+  <dl class="listing-features__list">
+    <dd class="listing-features__description listing-features__description--number_of_bedrooms">2</dd>
+    <dd class="listing-features__description listing-features__description--service_costs">€ 50 per month</dd>
+  </dl>
+  <ul class="listing-features__sub-description"><li>Includes gas</li></ul>
+</section>
+{filler}
+</body></html>
+"""
+
+def legacy_parse(html: str) -> dict:
+    """Extraction as it was before the selector table: full html.parser tree, two finds per field"""
+    soup = bs(html, 'html.parser')
+    details = {"price": '', "bedrooms": 0, "service_costs": 0, "rental_price_services": '', "surface_area": 0}
+    price_postfix = ''
+    if soup.find("span", "listing-detail-summary__price-postfix"):
+        price_postfix = soup.find("span", "listing-detail-summary__price-postfix").text
+    if soup.find("div", "listing-detail-summary__price"):
+        price_element = soup.find("div", "listing-detail-summary__price")
+        details['price'] = price_element.text.replace(price_postfix, '').strip().replace("€", '').replace(',', '')
+    if soup.find("dd", "listing-features__description listing-features__description--number_of_bedrooms"):
+        details['bedrooms'] = soup.find("dd", "listing-features__description listing-features__description--number_of_bedrooms").text.strip()
+    if soup.find("dd", "listing-features__description listing-features__description--service_costs"):
+        details['service_costs'] = soup.find("dd", "listing-features__description listing-features__description--service_costs").text.replace("€", "").strip()
+    if soup.find("ul", "listing-features__sub-description"):
+        details['rental_price_services'] = soup.find("ul", "listing-features__sub-description").text.strip()
+    if soup.find("li", "illustrated-features__item illustrated-features__item--surface-area"):
+        details['surface_area'] = soup.find("li", "illustrated-features__item illustrated-features__item--surface-area").text.replace("m²", "")
+    return details
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=200, help='Number of parses per implementation')
+    args = parser.parse_args()
+
+    html = make_detail_page()
+    print(f"Page size: {len(html) / 1024:.0f} KiB, parser backend: {HTML_PARSER}")
+
+    results = {}
+    for name, func in (('before (legacy)', legacy_parse), ('after (selector table)', parse_object_details)):
+        func(html)  # Warm up
+        seconds = timeit.timeit(lambda: func(html), number=args.pages)
+        results[name] = seconds / args.pages * 1000
+        print(f"{name:<24} {results[name]:8.2f} ms/page")
+
+    before, after = results.values()
+    print(f"Speed-up: {before / after:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+End-to-end benchmark of manage.cronjob against local Pararius and Telegram stand-ins
+
+Reports listings/sec from the start of the run to the last notification,
+p50/p95 time-to-notify (first shown on a search page -> message received by
+Telegram) and the peak RSS of the process. The stand-ins run in the same
+process, so the RSS includes them.
+
+Run: python benchmarks/bench_pipeline.py [--listings 300] [--telegram-rate 30] [--digest]
+"""
+import sys
+import os
+import argparse
+import math
+import resource
+import tempfile
+import time
+from typing import Dict, List
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.standins import ParariusStandIn, TelegramStandIn, make_listings
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of values"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def run_benchmark(listings: int = 300,
+                  per_page: int = 30,
+                  telegram_rate: float = 30,
+                  dispatch_rate: float = 25,
+                  detail_workers: int = 8,
+                  digest: bool = False) -> Dict[str, float]:
+    """Run one cronjob over fresh stand-ins and return its measurements"""
+    with ParariusStandIn(make_listings(listings), per_page=per_page) as pararius, \
+            TelegramStandIn(per_chat_per_second=telegram_rate) as telegram, \
+            tempfile.TemporaryDirectory() as data_dir:
+        # The modules read their hosts at import time
+        os.environ['PARARIUS_BASE_URL'] = pararius.url
+        os.environ['PARARIUS_SEARCH_URL'] = pararius.url
+        os.environ['TELEGRAM_API_URL'] = telegram.url
+        from modules import manage
+        from modules.dispatcher import get_dispatcher, shutdown_dispatcher
+
+        started = time.monotonic()
+        manage.cronjob(
+            searches=[{'city': 'haarlem', 'minimum_bedrooms': '', 'max_price_in_euros': '0', 'km_radius': ''}],
+            bot_token='bench',
+            chat_id='bench-chat',
+            batch_size=50,
+            max_pages=pararius.last_page,
+            page_concurrency=4,
+            fetcher_options={
+                'strategy': 'http',
+                'requests_per_second': 1000,
+                'burst': 100,
+                'detail_workers': detail_workers
+            },
+            storage_options={'backend': 'memory'},
+            known_links_options={'path': os.path.join(data_dir, 'known_links.sqlite3')},
+            write_behind_options={'journal_path': os.path.join(data_dir, 'write_journal.jsonl')},
+            telegram_options={
+                'digest': digest,
+                'per_chat_per_second': dispatch_rate,
+                'global_per_second': max(30, dispatch_rate)
+            }
+        )
+        scraped = time.monotonic()
+        get_dispatcher().drain(timeout=600)
+        shutdown_dispatcher()
+
+        notified = telegram.notified_at()
+        delays = [notified[path] - pararius.first_shown[path] for path in notified if path in pararius.first_shown]
+        finished = max(notified.values(), default=scraped)
+
+        return {
+            'listings': listings,
+            'notified': len(notified),
+            'telegram_messages': len(telegram.messages),
+            'telegram_429s': telegram.rejected,
+            'pararius_requests': pararius.requests,
+            'scrape_seconds': scraped - started,
+            'total_seconds': finished - started,
+            'listings_per_second': len(notified) / max(finished - started, 1e-9),
+            'time_to_notify_p50': percentile(delays, 0.50) if delays else float('nan'),
+            'time_to_notify_p95': percentile(delays, 0.95) if delays else float('nan'),
+            # ru_maxrss is in kilobytes on Linux
+            'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--listings', type=int, default=300)
+    parser.add_argument('--per-page', type=int, default=30)
+    parser.add_argument('--telegram-rate', type=float, default=30, help="Stand-in per-chat limit before it answers 429")
+    parser.add_argument('--dispatch-rate', type=float, default=25, help="Dispatcher per-chat rate")
+    parser.add_argument('--detail-workers', type=int, default=8)
+    parser.add_argument('--digest', action='store_true')
+    args = parser.parse_args()
+
+    results = run_benchmark(
+        listings=args.listings,
+        per_page=args.per_page,
+        telegram_rate=args.telegram_rate,
+        dispatch_rate=args.dispatch_rate,
+        detail_workers=args.detail_workers,
+        digest=args.digest
+    )
+    for name, value in results.items():
+        print(f"{name:>20}: {value:.3f}" if isinstance(value, float) else f"{name:>20}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Local stand-ins for the Pararius website and the Telegram Bot API
+
+ParariusStandIn serves synthetic search result pages (with pagination) and
+detail pages in the markup the parsers expect, and remembers when each
+listing was first shown on a search page. TelegramStandIn accepts sendMessage
+calls, records when each one arrived, and answers 429 with a retry_after once
+a chat exceeds its rate limit, like the real API.
+
+Both run a ThreadingHTTPServer on a free localhost port in a daemon thread.
+Nothing from modules is imported here, so callers can start the stand-ins
+and point PARARIUS_BASE_URL, PARARIUS_SEARCH_URL and TELEGRAM_API_URL at
+them before the modules read those at import time.
+"""
+import json
+import math
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+PAGE_PATTERN = re.compile(r'/page-(\d+)')
+LISTING_PATH_PATTERN = re.compile(r'/apartment-for-rent/[^/\s]+/[0-9a-f]+/[^/\s]+')
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status: int, body: str, content_type: str = 'text/html; charset=utf-8') -> None:
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StandInServer:
+    """A ThreadingHTTPServer on a free localhost port, served from a daemon thread"""
+
+    handler_class = _QuietHandler
+
+    def __init__(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler_class)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+@dataclass
+class SyntheticListing:
+    path: str
+    city: str
+    price: int
+    surface_area: int
+    rooms: int
+    bedrooms: int
+    postcode: str
+
+
+def make_listings(count: int, cities: Tuple[str, ...] = ('haarlem',)) -> List[SyntheticListing]:
+    """Deterministic listings spread over cities, prices and sizes"""
+    listings = []
+    for i in range(count):
+        city = cities[i % len(cities)]
+        rooms = 1 + i % 4
+        listings.append(SyntheticListing(
+            path=f"/apartment-for-rent/{city}/{i:08x}/street-{i}",
+            city=city,
+            price=900 + (i * 37) % 1400,
+            surface_area=30 + (i * 13) % 90,
+            rooms=rooms,
+            bedrooms=max(1, rooms - 1),
+            postcode=f"{2011 + i % 40} AB"
+        ))
+    return listings
+
+
+class _ParariusHandler(_QuietHandler):
+    def do_GET(self):
+        standin: 'ParariusStandIn' = self.server.standin
+        path = self.path.split('?')[0].rstrip('/')
+
+        if path.startswith('/apartments'):
+            match = PAGE_PATTERN.search(path)
+            self._respond(200, standin.search_page(int(match.group(1)) if match else 1, PAGE_PATTERN.sub('', path)))
+            return
+
+        listing = standin.by_path.get(path)
+        if listing is None:
+            self._respond(404, '<html><body>Not found</body></html>')
+            return
+        self._respond(200, standin.detail_page(listing))
+
+
+class ParariusStandIn(StandInServer):
+    """Serves synthetic search and detail pages and records when listings were first shown"""
+
+    handler_class = _ParariusHandler
+
+    def __init__(self, listings: List[SyntheticListing], per_page: int = 30):
+        super().__init__()
+        self.listings = listings
+        self.per_page = per_page
+        self.by_path = {listing.path: listing for listing in listings}
+        self.first_shown: Dict[str, float] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def last_page(self) -> int:
+        return max(1, math.ceil(len(self.listings) / self.per_page))
+
+    def search_page(self, page: int, base_path: str) -> str:
+        shown = self.listings[(page - 1) * self.per_page:page * self.per_page]
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            for listing in shown:
+                self.first_shown.setdefault(listing.path, now)
+
+        cards = "".join(f"""
+<li class="search-list__item search-list__item--listing">
+  <section class="listing-search-item listing-search-item--list listing-search-item--for-rent">
+    <h2 class="listing-search-item__title">
+      <a class="listing-search-item__link listing-search-item__link--title" href="{listing.path}">Flat {listing.path}</a>
+    </h2>
+    <div class="listing-search-item__sub-title">{listing.postcode} {listing.city.title()}</div>
+    <div class="listing-search-item__price">€{listing.price:,} per month</div>
+    <ul class="illustrated-features illustrated-features--compact">
+      <li class="illustrated-features__item illustrated-features__item--surface-area">{listing.surface_area} m²</li>
+      <li class="illustrated-features__item illustrated-features__item--number-of-rooms">{listing.rooms} rooms</li>
+    </ul>
+  </section>
+</li>""" for listing in shown)
+        pagination = "".join(
+            f'<a class="pagination__link" href="{base_path}/page-{n}">{n}</a>' for n in range(1, self.last_page + 1)
+        )
+        if not shown:
+            cards = '<li class="search-list__item search-list__no-results">No results</li>'
+        return f"<html><body><ul class=\"search-list\">{cards}</ul>{pagination}</body></html>"
+
+    def detail_page(self, listing: SyntheticListing) -> str:
+        with self._lock:
+            self.requests += 1
+        return f"""<html><body>
+<section class="listing-detail-summary">
+  <div class="listing-detail-summary__price">
+    <span class="listing-detail-summary__price-main">€{listing.price:,}</span>
+    <span class="listing-detail-summary__price-postfix">per month</span>
+  </div>
+  <ul class="illustrated-features">
+    <li class="illustrated-features__item illustrated-features__item--surface-area">{listing.surface_area} m²</li>
+  </ul>
+</section>
+<section class="listing-features">
+  <dl class="listing-features__list">
+    <dd class="listing-features__description listing-features__description--number_of_bedrooms">{listing.bedrooms}</dd>
+    <dd class="listing-features__description listing-features__description--service_costs">€ 50 per month</dd>
+  </dl>
+  <ul class="listing-features__sub-description"><li>Includes gas</li></ul>
+</section>
+</body></html>"""
+
+
+class _TelegramHandler(_QuietHandler):
+    def do_POST(self):
+        standin: 'TelegramStandIn' = self.server.standin
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._respond(400, json.dumps({'ok': False, 'error_code': 400, 'description': 'Bad Request'}),
+                          'application/json')
+            return
+
+        status, body = standin.receive(self.path, payload)
+        self._respond(status, json.dumps(body), 'application/json')
+
+
+class TelegramStandIn(StandInServer):
+    """
+    Accepts sendMessage calls and records them
+
+    With per_chat_per_second set, a chat sending faster than that gets 429
+    responses carrying parameters.retry_after, as Telegram's flood control does.
+    """
+
+    handler_class = _TelegramHandler
+
+    def __init__(self, per_chat_per_second: Optional[float] = None):
+        super().__init__()
+        self.per_chat_per_second = per_chat_per_second
+        self.messages: List[Tuple[float, str, str]] = []  # (arrival, chat_id, text)
+        self.rejected = 0
+        self._last_accepted: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def receive(self, path: str, payload: Dict) -> Tuple[int, Dict]:
+        if not path.endswith('/sendMessage'):
+            return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+
+        chat_id = str(payload.get('chat_id', ''))
+        with self._lock:
+            now = time.monotonic()
+            if self.per_chat_per_second:
+                wait = self._last_accepted.get(chat_id, -math.inf) + 1 / self.per_chat_per_second - now
+                if wait > 0:
+                    self.rejected += 1
+                    retry_after = max(1, math.ceil(wait))
+                    return 429, {
+                        'ok': False,
+                        'error_code': 429,
+                        'description': f"Too Many Requests: retry after {retry_after}",
+                        'parameters': {'retry_after': retry_after}
+                    }
+            self._last_accepted[chat_id] = now
+            self.messages.append((now, chat_id, payload.get('text', '')))
+            message_id = len(self.messages)
+
+        return 200, {'ok': True, 'result': {'message_id': message_id, 'chat': {'id': chat_id}}}
+
+    def notified_at(self) -> Dict[str, float]:
+        """Arrival time of the first message mentioning each listing path"""
+        arrivals: Dict[str, float] = {}
+        with self._lock:
+            for arrival, _, text in self.messages:
+                for path in LISTING_PATH_PATTERN.findall(text):
+                    arrivals.setdefault(path, arrival)
+        return arrivals
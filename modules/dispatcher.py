@@ -0,0 +1,341 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from .journal import Journal
+from .rate_limiter import TokenBucket
+from .telegram import DeliveryResult, get_sender
+
+
+@dataclass
+class OutboundMessage:
+    """A message waiting in the dispatch queue of its chat"""
+    text: str
+    bot_token: str
+    chat_id: str
+    attempts: int = 0
+    journal_id: Optional[int] = None
+
+
+class TelegramDispatcher:
+    """
+    Outbound Telegram queue drained by worker threads at the allowed rate
+
+    Every chat gets its own FIFO queue and token bucket next to a global
+    bucket, so messages go out as fast as Telegram allows without tripping its
+    limits. Chats, not messages, are scheduled by the time they may send next,
+    so picking the next message costs O(log chats) however long a chat's
+    queue grows. A chat has at most one message in flight, so workers send to
+    different chats in parallel while each chat gets its messages in
+    submission order. A 429 blocks the chat for the retry_after Telegram asks
+    for; other transient failures block it with exponential backoff, up to
+    max_retries. Failed messages are retried before the rest of their chat.
+
+    With a journal_path, every submitted message is appended to a local
+    journal and marked done once sent or given up, so messages still queued
+    when the dispatcher is closed (or the process dies) are sent by the next
+    dispatcher using the same journal.
+    """
+
+    def __init__(self,
+                 per_chat_per_second: float = 1.0,
+                 global_per_second: float = 30.0,
+                 workers: int = 4,
+                 max_retries: int = 8,
+                 backoff_seconds: float = 1.0,
+                 max_backoff_seconds: float = 60.0,
+                 journal_path: Optional[str] = None,
+                 deliver: Optional[Callable[[OutboundMessage], DeliveryResult]] = None):
+        """
+        Args:
+            per_chat_per_second: Messages per second to a single chat
+            global_per_second: Messages per second over all chats
+            workers: Number of messages in flight at once
+            max_retries: Attempts after the first before a message is given up
+            backoff_seconds: Delay before the first retry, doubled on every next one
+            max_backoff_seconds: Upper bound of the retry delay
+            journal_path: JSON lines file holding every message not yet sent, None keeps them in memory only
+            deliver: Sends one message, defaults to the bot's cached TelegramSender
+        """
+        self.per_chat_per_second = per_chat_per_second
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._deliver = deliver or self._deliver_with_sender
+
+        self._global_bucket = TokenBucket(global_per_second)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._chat_blocked_until: Dict[str, float] = {}
+
+        # Per chat FIFO, and a heap of (time it may send, sequence, chat) for chats with messages
+        self._chat_queues: Dict[str, Deque[OutboundMessage]] = {}
+        self._schedule: List[Tuple[float, int, str]] = []
+        self._scheduled: Set[str] = set()
+        self._sequence = itertools.count()
+        self._queued = 0
+        self._in_flight = 0
+        # Chats with a message being sent; they are scheduled again once it is done
+        self._sending: Set[str] = set()
+        self._condition = threading.Condition()
+        self._stopping = False
+
+        self.stats = {'sent': 0, 'retried': 0, 'failed': 0}
+
+        self.journal_path = journal_path
+        self._journal = Journal(journal_path, 'Telegram journal') if journal_path else None
+        self._journal_ids = itertools.count()
+        if self._journal is not None:
+            self._replay_journal()
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f"telegram-dispatch-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @staticmethod
+    def _deliver_with_sender(message: OutboundMessage) -> DeliveryResult:
+        return get_sender(message.bot_token).deliver(message.text, chat_id=message.chat_id)
+
+    def _replay_journal(self) -> None:
+        """Queue the messages a previous dispatcher left unsent, then compact the journal"""
+        unsent: Dict[int, OutboundMessage] = {}
+        for entry in self._journal.read():
+            if 'done' in entry:
+                unsent.pop(entry['done'], None)
+            else:
+                unsent[entry['id']] = OutboundMessage(entry['text'], entry['bot_token'], entry['chat_id'])
+
+        with self._condition:
+            for message in unsent.values():
+                message.journal_id = next(self._journal_ids)
+                self._enqueue(message)
+            self._rewrite_journal()
+            self._journal.open()
+        if unsent:
+            logging.info(f"Replaying {len(unsent)} unsent Telegram messages from the journal")
+
+    def _append_journal(self, entry: Dict[str, Any]) -> None:
+        """Append one entry to the journal; callers hold the condition"""
+        if self._journal is None:
+            return
+        try:
+            self._journal.append([entry])
+        except (OSError, ValueError) as e:
+            logging.error(f"Error writing to the Telegram journal: {str(e)}")
+
+    def _rewrite_journal(self) -> None:
+        """Replace the journal with the messages still queued; callers hold the condition"""
+        # On failure the old journal still holds every unsent message
+        self._journal.rewrite(
+            self._journal_entry(message) for queue in self._chat_queues.values() for message in queue
+        )
+
+    @staticmethod
+    def _journal_entry(message: OutboundMessage) -> Dict[str, Any]:
+        return {'id': message.journal_id, 'text': message.text,
+                'bot_token': message.bot_token, 'chat_id': message.chat_id}
+
+    def _enqueue(self, message: OutboundMessage) -> None:
+        """Add a message to the end of its chat's queue; callers hold the condition"""
+        self._chat_queues.setdefault(message.chat_id, deque()).append(message)
+        self._queued += 1
+        self._schedule_chat(message.chat_id, time.monotonic())
+        self._condition.notify()
+
+    def submit(self, text: str, bot_token: str, chat_id: str) -> None:
+        """Queue a message; a chat's messages are sent one at a time, in submission order"""
+        with self._condition:
+            message = OutboundMessage(text, bot_token, chat_id, journal_id=next(self._journal_ids))
+            self._append_journal(self._journal_entry(message))
+            self._enqueue(message)
+
+    @property
+    def pending(self) -> int:
+        """Number of messages queued or being sent"""
+        with self._condition:
+            return self._queued + self._in_flight
+
+    def _schedule_chat(self, chat_id: str, ready_at: float) -> None:
+        """Put a chat with queued messages on the schedule; callers hold the condition"""
+        if chat_id not in self._scheduled and chat_id not in self._sending:
+            self._scheduled.add(chat_id)
+            heapq.heappush(self._schedule, (ready_at, next(self._sequence), chat_id))
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        if chat_id not in self._chat_buckets:
+            # No bursts within a chat; Telegram counts those against the chat's limit right away
+            self._chat_buckets[chat_id] = TokenBucket(self.per_chat_per_second, capacity=1)
+        return self._chat_buckets[chat_id]
+
+    def _next_message(self) -> Optional[OutboundMessage]:
+        """Block until a message may be sent and take its tokens; None when stopping"""
+        with self._condition:
+            while True:
+                if self._stopping:
+                    return None
+
+                if not self._schedule:
+                    self._condition.wait()
+                    continue
+
+                now = time.monotonic()
+                ready_at, sequence, chat_id = self._schedule[0]
+                if ready_at > now:
+                    self._condition.wait(timeout=min(ready_at - now, 1.0))
+                    continue
+
+                chat_bucket = self._chat_bucket(chat_id)
+                blocked_until = max(self._chat_blocked_until.get(chat_id, 0.0), now + chat_bucket.wait_time())
+                if blocked_until > now:
+                    # Move the chat behind chats that may send sooner
+                    heapq.heapreplace(self._schedule, (blocked_until, sequence, chat_id))
+                    continue
+
+                global_wait = self._global_bucket.wait_time()
+                if global_wait > 0:
+                    self._condition.wait(timeout=global_wait)
+                    continue
+
+                queue = self._chat_queues[chat_id]
+                message = queue.popleft()
+                chat_bucket.try_acquire()
+                self._global_bucket.try_acquire()
+                self._queued -= 1
+                self._in_flight += 1
+
+                # The chat leaves the schedule until this message is sent, retried or given up
+                heapq.heappop(self._schedule)
+                self._scheduled.discard(chat_id)
+                self._sending.add(chat_id)
+                if not queue:
+                    del self._chat_queues[chat_id]
+                return message
+
+    def _run(self) -> None:
+        while True:
+            message = self._next_message()
+            if message is None:
+                return
+
+            try:
+                result = self._deliver(message)
+            except Exception as e:
+                result = DeliveryResult(ok=False, retryable=True, error=str(e))
+
+            with self._condition:
+                self._in_flight -= 1
+                self._sending.discard(message.chat_id)
+                self._handle_result(message, result)
+                if message.chat_id in self._chat_queues:
+                    # The chat bucket holds the next message back as long as the rate requires
+                    self._schedule_chat(message.chat_id, time.monotonic())
+                self._condition.notify_all()
+
+    def _done(self, message: OutboundMessage) -> None:
+        """Mark a message as sent or given up in the journal, compacting it when idle; callers hold the condition"""
+        if self._journal is None:
+            return
+        if not self._queued and not self._in_flight:
+            self._rewrite_journal()
+        else:
+            self._append_journal({'done': message.journal_id})
+
+    def _handle_result(self, message: OutboundMessage, result: DeliveryResult) -> None:
+        """Count a delivery or schedule its retry; callers hold the condition"""
+        if result.ok:
+            self.stats['sent'] += 1
+            self._done(message)
+            return
+
+        message.attempts += 1
+        if not result.retryable or message.attempts > self.max_retries:
+            self.stats['failed'] += 1
+            logging.error(f"Giving up on Telegram message to {message.chat_id} "
+                          f"after {message.attempts} attempts: {result.error}")
+            self._done(message)
+            return
+
+        if result.retry_after is not None:
+            # Telegram's flood control applies to the whole chat, not just this message
+            delay = result.retry_after
+        else:
+            delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (message.attempts - 1))
+
+        self.stats['retried'] += 1
+        logging.warning(f"Retrying Telegram message to {message.chat_id} in {delay:.1f}s: {result.error}")
+        now = time.monotonic()
+        self._chat_blocked_until[message.chat_id] = max(self._chat_blocked_until.get(message.chat_id, 0.0), now + delay)
+        self._chat_queues.setdefault(message.chat_id, deque()).appendleft(message)
+        self._queued += 1
+        self._schedule_chat(message.chat_id, now + delay)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued message is sent or given up
+
+        Returns:
+            bool: True when the queue is empty
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._queued or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(timeout=remaining if remaining is not None else 1.0)
+            return True
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Drain the queue for up to timeout seconds, then stop the workers"""
+        if not self.drain(timeout):
+            if self._journal is not None:
+                logging.warning(f"Stopping the Telegram dispatcher with {self.pending} messages unsent, "
+                                f"they stay in {self.journal_path}")
+            else:
+                logging.error(f"Stopping the Telegram dispatcher with {self.pending} messages unsent")
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+        with self._condition:
+            if self._journal is not None:
+                # A message still in flight is only in the append-only journal, so keep that as it is
+                if not self._in_flight:
+                    self._rewrite_journal()
+                self._journal.close()
+                self._journal = None
+            self._chat_queues.clear()
+            self._schedule.clear()
+            self._scheduled.clear()
+            self._sending.clear()
+            self._queued = 0
+
+
+_dispatcher: Optional[TelegramDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher(**options) -> TelegramDispatcher:
+    """Process-wide dispatcher, started on first use with the given options"""
+    global _dispatcher
+
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = TelegramDispatcher(**options)
+        return _dispatcher
+
+def shutdown_dispatcher(timeout: Optional[float] = 30.0) -> None:
+    """Drain and stop the process-wide dispatcher, if one was started"""
+    global _dispatcher
+
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        dispatcher.close(timeout)
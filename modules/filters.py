@@ -0,0 +1,43 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class CardFilter:
+    """
+    Rejects listings from their search card alone, before any detail request
+
+    A criterion left at None (or an empty postcode list) is not applied, and
+    a card value that could not be read never rejects a listing; the detail
+    page is fetched for those.
+    """
+    max_price: Optional[int] = None
+    min_surface_area: Optional[int] = None
+    min_rooms: Optional[int] = None
+    postcodes: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_config(cls, options: Optional[Dict[str, Any]]) -> 'CardFilter':
+        """Build a filter from the card_filter section of config.yaml"""
+        options = dict(options or {})
+        options['postcodes'] = [str(prefix).replace(' ', '').upper() for prefix in options.get('postcodes') or []]
+        return cls(**options)
+
+    def accepts(self, card: Any) -> bool:
+        """True unless a known card value fails a criterion"""
+        if self.max_price is not None and card.price is not None and card.price > self.max_price:
+            return False
+
+        if (self.min_surface_area is not None and card.surface_area is not None
+                and card.surface_area < self.min_surface_area):
+            return False
+
+        if self.min_rooms is not None and card.rooms is not None and card.rooms < self.min_rooms:
+            return False
+
+        if self.postcodes and card.postcode is not None:
+            postcode = card.postcode.replace(' ', '').upper()
+            if not postcode.startswith(tuple(self.postcodes)):
+                return False
+
+        return True
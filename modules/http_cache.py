@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from threading import Lock
+from typing import Dict, Optional
+
+
+@dataclass
+class CacheEntry:
+    """A cached response body with its validators"""
+    url: str
+    body: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = 0
+
+
+class HttpCache:
+    """On-disk response cache keyed by URL, evicted by TTL and total size"""
+
+    def __init__(self,
+                 directory: str,
+                 ttl_seconds: float = 7 * 24 * 3600,
+                 max_bytes: int = 100 * 1024 * 1024,
+                 fresh_seconds: float = 0,
+                 evict_every: int = 50):
+        """
+        Args:
+            directory: Directory holding one JSON file per cached URL
+            ttl_seconds: Entries older than this are dropped
+            max_bytes: Total size above which the least recently validated entries are dropped
+            fresh_seconds: Entries younger than this are served without contacting the server
+            evict_every: Number of stores between eviction sweeps
+        """
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.evict_every = evict_every
+        self._stores_since_evict = 0
+        self._lock = Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        """File path of the entry for a URL"""
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Cached entry for a URL, None when missing, unreadable or past its TTL"""
+        path = self._path(url)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                entry = CacheEntry(**json.load(file))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"Dropping unreadable cache entry for {url}: {str(e)}")
+            self._remove(path)
+            return None
+
+        if time.time() - entry.stored_at > self.ttl_seconds:
+            self._remove(path)
+            return None
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """True when an entry can be served without a conditional request"""
+        return time.time() - entry.stored_at < self.fresh_seconds
+
+    @staticmethod
+    def conditional_headers(entry: Optional[CacheEntry]) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for revalidating an entry"""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Write or replace the entry for a URL"""
+        self._write(CacheEntry(url=url, body=body, etag=etag, last_modified=last_modified, stored_at=time.time()))
+
+        with self._lock:
+            self._stores_since_evict += 1
+            sweep = self._stores_since_evict >= self.evict_every
+            if sweep:
+                self._stores_since_evict = 0
+        if sweep:
+            self.evict()
+
+    def touch(self, entry: CacheEntry) -> None:
+        """Restart the TTL of an entry the server confirmed as unchanged"""
+        entry.stored_at = time.time()
+        self._write(entry)
+
+    def _write(self, entry: CacheEntry) -> None:
+        """Atomically write an entry, so readers never see a partial file"""
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(asdict(entry), file)
+            os.replace(tmp_path, self._path(entry.url))
+        except OSError as e:
+            logging.error(f"Error writing cache entry for {entry.url}: {str(e)}")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then the oldest ones until the cache fits max_bytes
+
+        Returns:
+            int: Number of removed entries
+        """
+        now = time.time()
+        entries = []
+        removed = 0
+
+        for item in os.scandir(self.directory):
+            if not item.is_file() or not item.name.endswith('.json'):
+                continue
+            stat = item.stat()
+            # The file is rewritten on every store and touch, so mtime tracks stored_at
+            if now - stat.st_mtime > self.ttl_seconds:
+                self._remove(item.path)
+                removed += 1
+            else:
+                entries.append((stat.st_mtime, stat.st_size, item.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+
+        if removed:
+            logging.info(f"Evicted {removed} HTTP cache entries")
+        return removed
@@ -0,0 +1,90 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Iterable, List
+
+
+class Journal:
+    """
+    Append-only JSON lines file that survives crashes
+
+    Appends are fsynced before they return, and compaction writes the
+    remaining entries to a temporary file that atomically replaces the
+    journal. Not thread-safe; callers serialize access with their own lock.
+    """
+
+    def __init__(self, path: str, name: str = 'journal'):
+        """
+        Args:
+            path: Location of the JSON lines file
+            name: Name used in log messages, e.g. 'write journal'
+        """
+        self.path = path
+        self.name = name
+        self._file = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def read(self) -> List[Dict[str, Any]]:
+        """Entries in the journal, oldest first; empty when there is no journal yet"""
+        entries = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # A crash mid-write leaves at most one partial line
+                        logging.warning(f"Skipping unreadable {self.name} line")
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def open(self) -> None:
+        """Open the journal for appending"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+    def append(self, entries: Iterable[Dict[str, Any]]) -> None:
+        """
+        Append entries and fsync them
+
+        Raises:
+            OSError, TypeError, ValueError: When an entry is not serializable or the write failed
+        """
+        self.open()
+        self._file.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def rewrite(self, entries: Iterable[Dict[str, Any]]) -> bool:
+        """
+        Atomically replace the journal with entries
+
+        Returns:
+            bool: False when the rewrite failed and the old journal was kept
+        """
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                file.write(''.join(json.dumps(entry) + '\n' for entry in entries))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Error rewriting the {self.name}: {str(e)}")
+            return False
+
+        # The open handle still points at the replaced file
+        if self._file is not None:
+            self.close()
+            self.open()
+        return True
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
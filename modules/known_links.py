@@ -0,0 +1,177 @@
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+from .metrics import timed
+from .storage import StorageBackend
+
+
+@dataclass(frozen=True)
+class KnownListing:
+    """What the store last recorded for a link, and the keys of that row when the store has any"""
+    content_hash: Optional[str] = None
+    price: Optional[int] = None
+    partition_key: Optional[str] = None
+    row_key: Optional[str] = None
+
+    def stored_keys(self) -> Dict[str, str]:
+        """PartitionKey and RowKey of the stored row, empty when they are not known"""
+        if self.partition_key is None or self.row_key is None:
+            return {}
+        return {'PartitionKey': self.partition_key, 'RowKey': self.row_key}
+
+
+class KnownLinksIndex:
+    """
+    Local index of the links in the store, synced incrementally
+
+    Links are kept in a dict, with the content hash, price and keys of the
+    row last stored for them, and persisted in SQLite together with a high-water mark on the
+    store's insert timestamp. Each sync pulls only the
+    rows written since that mark; every full_reconcile_hours the index is
+    rebuilt from a full scan so rows deleted from the store disappear too.
+    """
+
+    def __init__(self,
+                 path: str,
+                 full_reconcile_hours: float = 24,
+                 overlap_minutes: float = 10):
+        """
+        Args:
+            path: SQLite file holding the index
+            full_reconcile_hours: Interval between full scans of the store
+            overlap_minutes: Rows this much older than the high-water mark are pulled again,
+                covering clock skew and rows committed out of order
+        """
+        self.path = path
+        self.full_reconcile_seconds = full_reconcile_hours * 3600
+        self.overlap = timedelta(minutes=overlap_minutes)
+        self._lock = Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS links (link TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        # Indexes written before hashes were tracked get the columns added
+        existing = {row[1] for row in self._connection.execute("PRAGMA table_info(links)")}
+        for column, column_type in (('content_hash', 'TEXT'), ('price', 'INTEGER'),
+                                    ('partition_key', 'TEXT'), ('row_key', 'TEXT')):
+            if column not in existing:
+                self._connection.execute(f"ALTER TABLE links ADD COLUMN {column} {column_type}")
+        self._connection.commit()
+
+        self._links: Dict[str, KnownListing] = {
+            link: KnownListing(*values)
+            for link, *values in self._connection.execute(
+                "SELECT link, content_hash, price, partition_key, row_key FROM links"
+            )
+        }
+
+    def __contains__(self, link: object) -> bool:
+        return link in self._links
+
+    def __len__(self) -> int:
+        return len(self._links)
+
+    def get(self, link: str) -> Optional[KnownListing]:
+        """Stored hash and price of a link, None when the link is unknown"""
+        return self._links.get(link)
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _write(self, listings: Dict[str, KnownListing]) -> None:
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO links (link, content_hash, price, partition_key, row_key) VALUES (?, ?, ?, ?, ?)",
+            ((link, listing.content_hash, listing.price, listing.partition_key, listing.row_key)
+             for link, listing in listings.items())
+        )
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Record rows written to the store during this run
+
+        Their keys are assigned by the store and come in with the next sync.
+        """
+        listings = {row['link']: KnownListing(row.get('content_hash'), row.get('price')) for row in rows if row.get('link')}
+        with self._lock, self._connection:
+            self._write(listings)
+            self._links.update(listings)
+
+    def sync(self, store: StorageBackend) -> int:
+        """
+        Bring the index up to date with the store
+
+        Returns:
+            int: Number of rows read from the store
+        """
+        with self._lock:
+            high_water_mark = self._get_meta('high_water_mark')
+            last_full_sync = float(self._get_meta('last_full_sync') or 0)
+            full = high_water_mark is None or time.time() - last_full_sync >= self.full_reconcile_seconds
+
+            since = None if full else datetime.fromisoformat(high_water_mark) - self.overlap
+
+            rows = 0
+            # A link updated since its first write can have several rows; the newest one wins
+            latest: Dict[str, Tuple[Optional[datetime], KnownListing]] = {}
+            newest: Optional[datetime] = datetime.fromisoformat(high_water_mark) if high_water_mark else None
+            with timed('table_query'):
+                for entity in store.query_links(since=since):
+                    rows += 1
+                    timestamp = entity.get('Timestamp')
+                    previous = latest.get(entity['link'])
+                    if previous is None or previous[0] is None or (timestamp is not None and timestamp >= previous[0]):
+                        latest[entity['link']] = (timestamp, KnownListing(
+                            entity.get('content_hash'), entity.get('price'),
+                            entity.get('PartitionKey'), entity.get('RowKey')
+                        ))
+                    if timestamp is not None and (newest is None or timestamp > newest):
+                        newest = timestamp
+            listings = {link: listing for link, (_, listing) in latest.items()}
+
+            with self._connection:
+                if full:
+                    self._connection.execute("DELETE FROM links")
+                    self._links = {}
+                    self._set_meta('last_full_sync', str(time.time()))
+                self._write(listings)
+                if newest is not None:
+                    self._set_meta('high_water_mark', newest.astimezone(timezone.utc).isoformat())
+            self._links.update(listings)
+
+        logging.info(f"{'Full' if full else 'Incremental'} known links sync read {rows} rows, "
+                     f"index holds {len(self._links)} links")
+        return rows
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_indexes: Dict[str, KnownLinksIndex] = {}
+_indexes_lock = Lock()
+
+def get_known_links_index(path: str = 'data/known_links.sqlite3', **options) -> KnownLinksIndex:
+    """Process-wide index per path, so the in-memory set stays warm between runs"""
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = KnownLinksIndex(path, **options)
+        else:
+            index.full_reconcile_seconds = options.get('full_reconcile_hours', 24) * 3600
+            index.overlap = timedelta(minutes=options.get('overlap_minutes', 10))
+        return index
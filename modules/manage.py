@@ -1,60 +1,202 @@
-from datetime import datetime
-from .objects import get_pararius_objects, get_object_details, enrich_details
-from .telegram import send_text
-from .table_handler import AzureTableHandler
+from datetime import datetime, timedelta, timezone
+from .objects import get_pararius_cards, get_object_html, parse_object_details, enrich_details, configure_fetcher, pop_browser_stats, check_listing_live, listing_city, ListingCard, SEARCH_BASE_URL
+from .filters import CardFilter
+from .known_links import get_known_links_index, KnownListing
+from .dispatcher import TelegramDispatcher, get_dispatcher
+from .telegram import pack_digest
+from .retention import apply_retention
+from .storage import create_storage
+from .pipeline import Pipeline, Stage
+from .subscriptions import SubscriptionIndex
+from .write_behind import WriteBehindQueue
 from dotenv import load_dotenv
 import logging
 import gc
+import threading
 from contextlib import contextmanager
-from typing import List, Any
-import time
+from typing import List, Any, Container, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Workers per stage and queue size between stages of process_property_batch
+PIPELINE_DEFAULTS = {
+    'fetch_workers': 4,
+    'parse_workers': 2,
+    'persist_workers': 1,
+    'notify_workers': 1,
+    'queue_size': 50
+}
 
 @contextmanager
-def table_handler_context(azure_table_connection_string: str = ''):
-    """Context manager for file handler to ensure proper cleanup"""
+def table_handler_context(azure_table_connection_string: str = '',
+                          storage_options: Optional[Dict[str, Any]] = None):
+    """Context manager for the configured store to ensure proper cleanup"""
     load_dotenv()
-    table_handler_instance = AzureTableHandler(azure_table_connection_string)
+    table_handler_instance = create_storage(
+        connection_string=azure_table_connection_string,
+        **(storage_options or {})
+    )
     try:
         yield table_handler_instance
     finally:
         # Add cleanup
         table_handler_instance.cleanup()
 
+def format_listing_message(details: Dict[str, Any], link: str) -> str:
+    """Telegram message listing the non-empty details of a listing"""
+    msg_parts = [f"{k} - {v}" for k, v in details.items() if v]
+    return "\n".join(msg_parts) + f"\n{link}".replace('_', ' ')
+
 def process_property_batch(links: List[str],
                          table_handler_instance: Any,
                          bot_token: str,
                          chat_id: str,
-                         batch_size: int = 5) -> None:
-    """Process properties in smaller batches to manage memory"""
-    for i in range(0, len(links), batch_size):
-        batch = links[i:i + batch_size]
+                         batch_size: int = 5,
+                         content_hashes: Optional[Dict[str, str]] = None,
+                         previous: Optional[Dict[str, KnownListing]] = None,
+                         notify_price_drops: bool = True,
+                         digest: bool = False,
+                         dispatcher: Optional[TelegramDispatcher] = None,
+                         subscriptions: Optional[SubscriptionIndex] = None,
+                         postcodes: Optional[Dict[str, Optional[str]]] = None,
+                         pipeline_options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch, parse, store and notify listings as a staged pipeline
 
-        for link in batch:
-            try:
-                # Process timestamp and storage
-                timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-                table_handler_instance.insert_row_to_table(link, timestamp)
+    Links in previous are known listings whose card changed; their row is
+    updated and a message is only sent for a price drop.
 
-                # Get and process details
-                details = get_object_details(link)
-                enriched_details = enrich_details(details)
+    Returns:
+        List[Dict[str, Any]]: The rows stored
+    """
+    content_hashes = content_hashes or {}
+    previous = previous or {}
+    dispatcher = dispatcher or get_dispatcher()
+    postcodes = postcodes or {}
+    options = {**PIPELINE_DEFAULTS, **(pipeline_options or {})}
+    digest_messages: Dict[str, List[str]] = {}
+    digest_lock = threading.Lock()
+
+    def fetch(batch: List[str]) -> List[Tuple[str, str]]:
+        # Links whose page failed stay unknown (or unchanged), so the next run retries them
+        return [(link, html) for link, html in ((link, get_object_html(link)) for link in batch) if html is not None]
 
-                # Prepare and send message
-                msg_parts = [f"{k} - {v}" for k, v in enriched_details.items() if v]
-                msg = "\n".join(msg_parts) + f"\n{link}".replace('_', ' ')
-                send_text(msg, bot_token=bot_token, chat_id=chat_id)
+    def parse(batch: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        return [
+            {'link': link, 'timestamp': timestamp, **parse_object_details(html), 'content_hash': content_hashes.get(link)}
+            for link, html in batch
+        ]
 
-                # Clear variables explicitly
-                del details, enriched_details, msg_parts, msg
+    def persist(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Hand the rows to the store (or write-behind queue) in one call; updates name the row they replace
+        insert_result = table_handler_instance.insert_rows(
+            [{**row, **previous[row['link']].stored_keys()} if row['link'] in previous else row for row in rows]
+        )
+        for link, error in insert_result.failures.items():
+            # Not stored, so notifying now would notify again next run
+            logging.error(f"Skipping {link}, insert failed: {error}")
+        return [row for row in rows if row['link'] not in insert_result.failures]
+
+    def notify(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for row in rows:
+            link = row['link']
+            try:
+                header = ''
+                known = previous.get(link)
+                if known is not None:
+                    price = row['price']
+                    if not (notify_price_drops and known.price is not None
+                            and isinstance(price, int) and price < known.price):
+                        continue
+                    header = f"Price drop: €{known.price} → €{price}\n"
 
-                time.sleep(1)  # Rate limiting
+                details = {key: value for key, value in row.items() if key not in ('link', 'timestamp', 'content_hash')}
+                msg = header + format_listing_message(enrich_details(details), link)
+                if subscriptions is None:
+                    recipients = [chat_id]
+                else:
+                    # Parsing defaults missing bedrooms and surface area to 0, which must not fail a minimum
+                    recipients = subscriptions.chat_ids(
+                        city=listing_city(link),
+                        price=row['price'],
+                        bedrooms=row['bedrooms'] or None,
+                        surface_area=row['surface_area'] or None,
+                        postcode=postcodes.get(link)
+                    )
+                for recipient in recipients:
+                    if digest:
+                        with digest_lock:
+                            digest_messages.setdefault(recipient, []).append(msg)
+                    else:
+                        dispatcher.submit(msg, bot_token=bot_token, chat_id=recipient)
 
             except Exception as e:
                 logging.error(f"Error processing link {link}: {str(e)}")
-                continue
+        return rows
 
-        # Force garbage collection after each batch
-        gc.collect()
+    pipeline = Pipeline([
+        Stage('fetch', fetch, workers=options['fetch_workers'], queue_size=options['queue_size']),
+        Stage('parse', parse, workers=options['parse_workers'], queue_size=options['queue_size']),
+        Stage('persist', persist, workers=options['persist_workers'], queue_size=options['queue_size'],
+              batch_size=max(1, batch_size)),
+        Stage('notify', notify, workers=options['notify_workers'], queue_size=options['queue_size'],
+              batch_size=max(1, batch_size))
+    ])
+    stored = pipeline.run(links)
+    logging.info(f"Processed {len(links)} listings, stored {len(stored)}; busy seconds per stage: "
+                 f"{ {name: round(stage['seconds'], 2) for name, stage in pipeline.stats.items()} }")
+
+    for recipient, messages in digest_messages.items():
+        packed = pack_digest(messages)
+        for text in packed:
+            dispatcher.submit(text, bot_token=bot_token, chat_id=recipient)
+        logging.info(f"Queued {len(messages)} listings in {len(packed)} digest messages for {recipient}")
+
+    return stored
+
+def build_search_url(city: str = '',
+                     minimum_bedrooms: str = '',
+                     max_price_in_euros: str = '0',
+                     km_radius: str = '') -> str:
+    """Build the Pararius search URL for one search profile"""
+    url_params = {
+        'city': f"/{city}" if city else '',
+        'bedrooms': f"/{int(float(minimum_bedrooms))}-bedrooms" if minimum_bedrooms else '',
+        'price': f"/0-{int(float(max_price_in_euros))}" if float(max_price_in_euros or 0) > 0 else '',
+        'radius': f"/radius-{int(float(km_radius))}" if km_radius else ''
+    }
+    return f"{SEARCH_BASE_URL}/apartments{''.join(url_params.values())}"
+
+def crawl_searches(urls: List[str],
+                   known_links: Container[str],
+                   max_pages: int = 1,
+                   page_concurrency: int = 1) -> List[ListingCard]:
+    """
+    Crawl several search URLs concurrently and merge their listing cards
+
+    All searches share the fetch layer (HTTP pool, rate limiter, browser) and
+    the known links. Overlapping results are merged before any detail fetch,
+    so the pipeline only starts once every search is crawled.
+    """
+    if not urls:
+        return []
+
+    with ThreadPoolExecutor(max_workers=len(urls)) as executor:
+        results = executor.map(
+            lambda url: get_pararius_cards(
+                url=url,
+                known_links=known_links,
+                max_pages=max_pages,
+                page_concurrency=page_concurrency
+            ),
+            urls
+        )
+        # Keep first-seen order while dropping listings found by several searches
+        merged: Dict[str, ListingCard] = {}
+        for cards in results:
+            for card in cards:
+                merged.setdefault(card.url, card)
+        return list(merged.values())
 
 def cronjob(city: str = 'haarlem',
             minimum_bedrooms: str = '1',
@@ -63,56 +205,136 @@ def cronjob(city: str = 'haarlem',
             bot_token: str = '',
             chat_id: str = '',
             azure_table_connection_string: str = '',
-            batch_size: int = 5) -> None:
+            batch_size: int = 50,
+            max_pages: int = 1,
+            page_concurrency: int = 1,
+            fetcher_options: Optional[Dict[str, Any]] = None,
+            searches: Optional[List[Dict[str, str]]] = None,
+            card_filter: Optional[Dict[str, Any]] = None,
+            known_links_options: Optional[Dict[str, Any]] = None,
+            storage_options: Optional[Dict[str, Any]] = None,
+            notify_price_drops: bool = True,
+            write_behind_options: Optional[Dict[str, Any]] = None,
+            telegram_options: Optional[Dict[str, Any]] = None,
+            subscriptions: Optional[List[Dict[str, Any]]] = None,
+            pipeline_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
-    Optimized cronjob function with better memory management and error handling
+    Crawl the searches, then fetch, store and notify new and changed listings
+
+    Returns:
+        Dict[str, Any]: Run statistics, such as browser bytes transferred, page-load time,
+        the number of search cards fetched and of new listings among them
     """
-    logging.info(f"Starting cronjob with parameters: city={city}, "
-                f"minimum_bedrooms={minimum_bedrooms}, max_price_in_euros={max_price_in_euros}, "
-                f"km_radius={km_radius}")
+    if not searches:
+        searches = [{
+            'city': city,
+            'minimum_bedrooms': minimum_bedrooms,
+            'max_price_in_euros': max_price_in_euros,
+            'km_radius': km_radius
+        }]
+
+    logging.info(f"Starting cronjob with {len(searches)} searches: {searches}, max_pages={max_pages}")
 
     try:
-        # Build URL with parameters
-        url_params = {
-            'city': f"/{city}" if city else '',
-            'bedrooms': f"/{minimum_bedrooms}-bedrooms" if minimum_bedrooms else '',
-            'price': f"/0-{int(max_price_in_euros)}" if int(max_price_in_euros) > 0 else '',
-            'radius': f"/radius-{km_radius}" if km_radius else ''
-        }
+        # Apply fetch layer settings; pooled sessions and the browser stay warm between runs
+        configure_fetcher(**(fetcher_options or {}))
 
-        url = f"https://www.pararius.com/apartments{''.join(url_params.values())}"
-        logging.info(f"Built URL: {url}")
+        # Build URLs with parameters, dropping searches that resolve to the same URL
+        urls = list(dict.fromkeys(build_search_url(**search) for search in searches))
+        logging.info(f"Built URLs: {urls}")
 
-        # Get fresh objects
-        fresh_objects = get_pararius_objects(url=url)
-        if not fresh_objects:
-            logging.warning("No objects retrieved from Pararius")
-            return
+        # Use context manager for file handler
+        with table_handler_context(azure_table_connection_string, storage_options) as table_handler_instance, \
+                WriteBehindQueue(table_handler_instance, **(write_behind_options or {})) as writer:
+            # Sync known links once for all searches, so each crawl can stop at the first page without new ones
+            known_links = get_known_links_index(**(known_links_options or {}))
+            known_links.sync(table_handler_instance)
+            # Rows replayed from the journal are known even before they reach the store
+            known_links.add(writer.pending_rows())
 
-        logging.info(f"Retrieved {len(fresh_objects)} objects")
+            # Get fresh objects
+            fresh_objects = crawl_searches(
+                urls=urls,
+                known_links=known_links,
+                max_pages=max_pages,
+                page_concurrency=page_concurrency
+            )
+            if not fresh_objects:
+                logging.warning("No objects retrieved from Pararius")
+                return {**pop_browser_stats(), 'fetched_cards': 0, 'new_listings': 0}
 
-        # Use context manager for file handler
-        with table_handler_context(azure_table_connection_string) as table_handler_instance:
-            # Query known links
-            known_links = set(entity['link'] for entity in
-                            table_handler_instance.query_entities("PartitionKey eq 'pararius'"))
+            logging.info(f"Retrieved {len(fresh_objects)} unique objects")
+
+            # Find new objects, and known ones whose card no longer matches the stored hash
+            unknown_cards = [card for card in fresh_objects if card.url not in known_links]
+            changed = {
+                card.url: known_links.get(card.url) for card in fresh_objects
+                if card.url in known_links and known_links.get(card.url).content_hash != card.content_hash
+            }
+            logging.info(f"Found {len(unknown_cards)} new objects and {len(changed)} changed ones")
 
-            # Find new objects
-            unknown_objects = list(set(fresh_objects) - known_links)
-            logging.info(f"Found {len(unknown_objects)} new objects")
+            # Reject what the search cards already rule out, before any detail request
+            listing_filter = CardFilter.from_config(card_filter)
+            subscription_index = SubscriptionIndex.from_config(subscriptions, default_chat_id=chat_id)
+
+            def wanted(card: ListingCard) -> bool:
+                if not listing_filter.accepts(card):
+                    return False
+                return not subscription_index.size or bool(subscription_index.match(
+                    city=listing_city(card.url), price=card.price,
+                    surface_area=card.surface_area, postcode=card.postcode
+                ))
+
+            unknown_objects, rejected = [], []
+            for card in unknown_cards + [card for card in fresh_objects if card.url in changed]:
+                (unknown_objects if wanted(card) else rejected).append(card)
+            stored_rows = []
+            if rejected:
+                logging.info(f"Card filter rejected {len(rejected)} new or changed objects")
+                timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+                # Only the card's fields; a changed listing keeps its stored detail columns
+                rejected_rows = [
+                    {'link': card.url, 'timestamp': timestamp, 'price': card.price, 'content_hash': card.content_hash}
+                    for card in rejected
+                ]
+                insert_result = writer.insert_rows(
+                    [{**row, **changed[row['link']].stored_keys()} if row['link'] in changed else row
+                     for row in rejected_rows]
+                )
+                stored_rows += [row for row in rejected_rows if row['link'] not in insert_result.failures]
 
             if unknown_objects:
                 # Process properties in batches
-                process_property_batch(
-                    links=unknown_objects,
-                    table_handler_instance=table_handler_instance,
+                stored_rows += process_property_batch(
+                    links=[card.url for card in unknown_objects],
+                    table_handler_instance=writer,
                     bot_token=bot_token,
                     chat_id=chat_id,
-                    batch_size=batch_size
+                    batch_size=batch_size,
+                    content_hashes={card.url: card.content_hash for card in unknown_objects},
+                    previous=changed,
+                    notify_price_drops=notify_price_drops,
+                    digest=bool((telegram_options or {}).get('digest', False)),
+                    dispatcher=get_dispatcher(**{
+                        key: value for key, value in (telegram_options or {}).items() if key != 'digest'
+                    }),
+                    subscriptions=subscription_index if subscription_index.size else None,
+                    postcodes={card.url: card.postcode for card in unknown_objects},
+                    pipeline_options={
+                        'fetch_workers': (fetcher_options or {}).get('detail_workers', PIPELINE_DEFAULTS['fetch_workers']),
+                        **(pipeline_options or {})
+                    }
                 )
 
+            # The next sync brings these in too; recording them now keeps the index current in between
+            known_links.add(stored_rows)
+
+        run_stats = {**pop_browser_stats(), 'fetched_cards': len(fresh_objects), 'new_listings': len(unknown_cards)}
+
         # Clear main variables
-        del fresh_objects, known_links, unknown_objects
+        del fresh_objects, known_links, unknown_cards, unknown_objects, stored_rows
+
+        return run_stats
 
     except Exception as e:
         logging.error(f"Critical error in cronjob: {str(e)}")
@@ -121,6 +343,48 @@ def cronjob(city: str = 'haarlem',
         # Cleanup and force garbage collection
         gc.collect()
 
+def retention_job(azure_table_connection_string: str = '',
+                  storage_options: Optional[Dict[str, Any]] = None,
+                  fetcher_options: Optional[Dict[str, Any]] = None,
+                  ttl_days: float = 90,
+                  archive_dir: str = 'data/archive',
+                  max_checks: int = 500,
+                  check_liveness: bool = True,
+                  known_links_options: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """
+    Archive and delete rows older than ttl_days whose listing is offline
+
+    Liveness checks share the fetch layer, and so the request budget, with
+    the scrape job. With check_liveness off, every expired row is deleted.
+    Expired rows that are not the newest of their link, according to the
+    freshly synced known-links index (known_links_options), are deleted
+    without a check.
+
+    Returns:
+        Dict[str, int]: Number of expired, superseded, kept, deleted and unchecked rows
+    """
+    configure_fetcher(**(fetcher_options or {}))
+    with table_handler_context(azure_table_connection_string, storage_options) as table_handler_instance:
+        known_links = get_known_links_index(**(known_links_options or {}))
+        known_links.sync(table_handler_instance)
+        return apply_retention(
+            table_handler_instance,
+            ttl_days=ttl_days,
+            archive_dir=archive_dir,
+            max_checks=max_checks,
+            check_workers=max(1, int((fetcher_options or {}).get('detail_workers', 4))),
+            is_live=check_listing_live if check_liveness else None,
+            newest_row=known_links.get
+        )
+
+def arrival_history(azure_table_connection_string: str = '',
+                    storage_options: Optional[Dict[str, Any]] = None,
+                    history_days: float = 28) -> List[Dict[str, Any]]:
+    """Rows written in the last history_days, for learning when listings arrive"""
+    since = datetime.now(timezone.utc) - timedelta(days=history_days)
+    with table_handler_context(azure_table_connection_string, storage_options) as table_handler_instance:
+        return list(table_handler_instance.query_links(since=since))
+
 # Example usage with logging configuration
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
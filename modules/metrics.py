@@ -0,0 +1,260 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import psutil
+
+# Upper bounds (seconds) of the stage duration histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    return psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
+
+
+class Histogram:
+    """Cumulative duration histogram in the Prometheus bucket layout"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    Stage duration histograms, counters and gauges of the process
+
+    Stages are timed where their work happens (detail_fetch, detail_parse,
+    telegram_send, ...), so the histograms show where a run spends its time.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._stages: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record one duration of a stage"""
+        with self._lock:
+            if stage not in self._stages:
+                self._stages[stage] = Histogram(self.buckets)
+            self._stages[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block as one observation of stage, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def inc(self, name: str, value: float = 1.0, help: str = '', **labels: str) -> None:
+        """Add to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def set_gauge(self, name: str, value: float, help: str = '') -> None:
+        """Set a gauge to a value"""
+        with self._lock:
+            self._gauges[name] = value
+            if help:
+                self._help.setdefault(name, help)
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, total and mean seconds per stage"""
+        with self._lock:
+            return {
+                stage: {
+                    'count': histogram.count,
+                    'seconds': round(histogram.sum, 4),
+                    'mean_seconds': round(histogram.sum / histogram.count, 4) if histogram.count else 0.0
+                }
+                for stage, histogram in sorted(self._stages.items())
+            }
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            if self._stages:
+                lines += [
+                    '# HELP pararius_stage_seconds Duration of one unit of work per pipeline stage',
+                    '# TYPE pararius_stage_seconds histogram'
+                ]
+                for stage, histogram in sorted(self._stages.items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'pararius_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                    lines.append(f'pararius_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'pararius_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                    lines.append(f'pararius_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            counters: Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], float]]] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append((labels, value))
+            for name, series in counters.items():
+                lines += [f'# HELP {name} {self._help.get(name, name)}', f'# TYPE {name} counter']
+                for labels, value in series:
+                    label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+                    lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+            for name, value in sorted(self._gauges.items()):
+                lines += [f'# HELP {name} {self._help.get(name, name)}', f'# TYPE {name} gauge', f'{name} {value}']
+
+        lines += [
+            '# HELP pararius_process_resident_memory_mb Current resident set size',
+            '# TYPE pararius_process_resident_memory_mb gauge',
+            f'pararius_process_resident_memory_mb {round(current_rss_mb(), 2)}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+class MemorySampler:
+    """
+    Samples the RSS of the process from a background thread
+
+    A single reading before or after a run misses the peak in between;
+    sampling every interval_seconds while the run is going catches it.
+    """
+
+    def __init__(self, interval_seconds: float = 0.1):
+        self.interval_seconds = interval_seconds
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'MemorySampler':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def _sample(self) -> None:
+        try:
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+        except psutil.Error as e:
+            logging.warning(f"Could not sample memory usage: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self._sample()
+
+    def start(self) -> None:
+        self.peak_mb = 0.0
+        self._stop.clear()
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name='memory-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> float:
+        """Stop sampling and return the peak RSS in MB"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._sample()
+        return self.peak_mb
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        # Scrapes and healthchecks would flood the log
+        pass
+
+    def _respond(self, status: int, body: str, content_type: str) -> None:
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def do_GET(self):
+        server: 'MetricsServer' = self.server.metrics_server
+        path = self.path.split('?')[0]
+        try:
+            if path == '/metrics':
+                self._respond(200, server.registry.render(), 'text/plain; version=0.0.4; charset=utf-8')
+            elif path == '/health':
+                self._respond(200, json.dumps({'status': 'ok'}), 'application/json')
+            elif path == '/summary':
+                summary = server.summary() if server.summary else {}
+                summary['stages'] = server.registry.stage_summary()
+                self._respond(200, json.dumps(summary, default=str), 'application/json')
+            else:
+                self._respond(404, json.dumps({'error': 'not found'}), 'application/json')
+        except Exception as e:
+            logging.error(f"Error serving {path}: {e}")
+            self._respond(500, json.dumps({'error': str(e)}), 'application/json')
+
+    # wget --spider, as used by the container healthcheck, sends HEAD requests
+    do_HEAD = do_GET
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint for the metrics
+
+    /metrics serves the registry in the Prometheus text format, /health
+    answers the container healthcheck and /summary returns the rolling run
+    summary from summary() with the per-stage totals.
+    """
+
+    def __init__(self,
+                 registry: MetricsRegistry,
+                 host: str = '0.0.0.0',
+                 port: int = 8000,
+                 summary: Optional[Callable[[], Dict[str, Any]]] = None):
+        self.registry = registry
+        self.summary = summary
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.metrics_server = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> 'MetricsServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        logging.info(f"Serving metrics on port {self.port}")
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+_registry = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide metrics registry"""
+    return _registry
+
+def timed(stage: str):
+    """Time a block as one observation of stage in the process-wide registry"""
+    return _registry.timer(stage)
@@ -1,24 +1,196 @@
-from bs4 import BeautifulSoup as bs
+from bs4 import BeautifulSoup as bs, SoupStrainer
 import requests as r
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Container, Deque, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
 import gc
+import hashlib
+import json
 import logging
+import re
 import time
-from threading import Lock
-from queue import Queue
+from threading import Condition, Lock
+from collections import deque
+from contextlib import contextmanager
 import os
+from .rate_limiter import HostRateLimiter
+from .http_cache import HttpCache
+from .metrics import get_metrics, timed
+
+# lxml is considerably faster than the stdlib parser; fall back when it is not installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Pagination links on search results look like /apartments/haarlem/page-2
+PAGE_PATTERN = re.compile(r'/page-(\d+)')
+
+# Numbers in prices and areas, including thousands separators
+NUMBER_PATTERN = re.compile(r'\d[\d.,]*')
+
+# Dutch postcodes: four digits, optionally followed by two letters
+POSTCODE_PATTERN = re.compile(r'\b(\d{4})(?:\s?([A-Z]{2}))?\b')
+
+# Class of the listing anchors; its presence tells a real results page from a JS challenge
+LISTING_MARKER = 'listing-search-item__link--title'
+
+# Class of the notice a search without results shows instead of listings (search-list__no-results)
+NO_RESULTS_MARKER = 'no-results'
+NO_RESULTS_PATTERN = re.compile(r'class="[^"]*' + NO_RESULTS_MARKER)
+
+# Stored links use this host, so canonical URLs must keep it for dedupe to work.
+# Both hosts can be pointed at a local stand-in for benchmarks and end-to-end tests.
+BASE_URL = os.getenv('PARARIUS_BASE_URL', 'https://pararius.com')
+SEARCH_BASE_URL = os.getenv('PARARIUS_SEARCH_URL', 'https://www.pararius.com')
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+HTTP_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9'
+}
+
+# http_first: plain HTTP with browser fallback, http: never start a browser, browser: always use it
+FETCH_STRATEGIES = ('http_first', 'http', 'browser')
+
+_fetcher_settings: Dict[str, Any] = {
+    'strategy': 'http_first',
+    'pool_size': 10,
+    'timeout': 10,
+    'requests_per_second': 2.0,
+    'burst': 2,
+    'detail_workers': 4,
+    'cache': None
+}
+_http_session: Optional[r.Session] = None
+_http_session_lock = Lock()
+_http_cache: Optional[HttpCache] = None
+_rate_limiter = HostRateLimiter(_fetcher_settings['requests_per_second'], _fetcher_settings['burst'])
+
+def _class_matcher(*prefixes: str) -> Callable[[Optional[str]], bool]:
+    """Strainer predicate for elements with a class starting with one of prefixes"""
+    def matches(value: Optional[str]) -> bool:
+        # Depending on the bs4 version this gets single classes or the whole attribute
+        return bool(value) and any(cls.startswith(prefixes) for cls in value.split())
+    return matches
+
+
+# Resources that never affect the listing anchors we read from a search page
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*googletagmanager.com*', '*google-analytics.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*facebook.net*', '*hotjar.com*', '*criteo.*',
+    '*cookiebot.com*', '*bing.com*', '*tiktok.com*'
+]
+
+def page_transfer(log_entries: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """
+    Bytes received over the network and number of finished requests in a performance log
+
+    Chromium reports encodedDataLength for every response, cross-origin ones
+    included, unlike the transferSize of the Resource Timing API.
+    """
+    transferred = requests = 0
+    for entry in log_entries:
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, TypeError, ValueError):
+            continue
+        if message.get('method') == 'Network.loadingFinished':
+            transferred += int(message.get('params', {}).get('encodedDataLength', 0))
+            requests += 1
+    return transferred, requests
+
+
+class BrowserFetchStats:
+    """Thread-safe totals of browser fetches, drained once per job"""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.fetches = 0
+        self.bytes = 0
+        self.requests = 0
+        self.seconds = 0.0
+
+    def record(self, transferred: int, requests: int, seconds: float) -> None:
+        with self._lock:
+            self.fetches += 1
+            self.bytes += transferred
+            self.requests += requests
+            self.seconds += seconds
+
+    def drain(self) -> Dict[str, Any]:
+        """Totals since the previous drain"""
+        with self._lock:
+            stats = {
+                'browser_fetches': self.fetches,
+                'browser_kib': round(self.bytes / 1024, 1),
+                'browser_requests': self.requests,
+                'browser_seconds': round(self.seconds, 2)
+            }
+            self._reset()
+            return stats
+
+_browser_stats = BrowserFetchStats()
+
+def pop_browser_stats() -> Dict[str, Any]:
+    """Browser fetch totals since the previous call, for the job statistics"""
+    return _browser_stats.drain()
+
+
+class PooledDriver:
+    """A headless Chromium driver with the bookkeeping needed to recycle it"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.pages = 0
+
+    def is_healthy(self) -> bool:
+        """True when the browser still answers commands"""
+        try:
+            return self.driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logging.error(f"Error closing driver: {str(e)}")
+
 
 class ParariusDriver:
+    """
+    Process-wide bounded pool of headless Chromium drivers
+
+    Drivers are started lazily up to pool_size, checked out for one page load
+    at a time and recycled after max_pages_per_driver pages or
+    max_driver_age_minutes of uptime, or when they fail a health check.
+    """
     _instance = None
     _lock = Lock()
-    _driver = None
-    _task_queue = Queue()
+    _settings: Dict[str, Any] = {
+        'pool_size': 1,
+        'max_pages_per_driver': 50,
+        'max_driver_age_minutes': 60,
+        'lean': False,
+        'blocked_url_patterns': BLOCKED_URL_PATTERNS
+    }
 
     @classmethod
     def get_instance(cls):
@@ -28,14 +200,48 @@ class ParariusDriver:
                     cls._instance = cls()
         return cls._instance
 
+    @classmethod
+    def configure(cls,
+                  pool_size: int = 1,
+                  max_pages_per_driver: int = 50,
+                  max_driver_age_minutes: float = 60,
+                  lean: bool = False,
+                  blocked_url_patterns: Optional[List[str]] = None) -> None:
+        """
+        Set pool limits; a running pool adopts them as drivers are checked in
+
+        With lean set, new drivers skip images, fonts and the URL patterns in
+        BLOCKED_URL_PATTERNS plus blocked_url_patterns. Drivers already running
+        keep their mode until they are recycled.
+        """
+        if pool_size < 1:
+            raise ValueError("Browser pool size must be at least 1")
+
+        with cls._lock:
+            cls._settings = {
+                'pool_size': pool_size,
+                'max_pages_per_driver': max_pages_per_driver,
+                'max_driver_age_minutes': max_driver_age_minutes,
+                'lean': lean,
+                'blocked_url_patterns': BLOCKED_URL_PATTERNS + list(blocked_url_patterns or [])
+            }
+        # A larger pool has room for callers waiting on a driver
+        if cls._instance is not None:
+            with cls._instance._available:
+                cls._instance._available.notify_all()
+
     def __init__(self):
         if ParariusDriver._instance is not None:
             raise Exception("This class is a singleton!")
-        else:
-            ParariusDriver._instance = self
-            self._setup_driver()
+        ParariusDriver._instance = self
+        self._idle: Deque[PooledDriver] = deque()
+        self._created = 0
+        self._pool_lock = Lock()
+        # Signalled whenever a driver is checked in or a slot frees up
+        self._available = Condition(self._pool_lock)
 
     def _setup_driver(self):
+        """Start a new headless Chromium driver"""
         chrome_options = Options()
         chrome_options.binary_location = os.environ.get('CHROME_BIN', '/usr/bin/chromium')
         chrome_options.add_argument('--headless=new')
@@ -46,106 +252,450 @@ class ParariusDriver:
         chrome_options.add_argument('--start-maximized')
         chrome_options.add_argument('--disable-extensions')
         chrome_options.add_argument('--dns-prefetch-disable')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
+        # Network events are read back from the performance log to measure page weight
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+        lean = self._settings['lean']
+        if lean:
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2
+            })
 
         # Set up ChromeDriver service
         service = Service(
             executable_path=os.environ.get('CHROMEDRIVER_PATH', '/usr/bin/chromedriver')
         )
 
-        self._driver = webdriver.Chrome(service=service, options=chrome_options)
-        self._driver.set_page_load_timeout(10)
-
-    def get_driver(self):
-        if self._driver is None:
-            self._setup_driver()
-        return self._driver
-
-    def add_task(self, task):
-        """Add a scraping task to the queue"""
-        self._task_queue.put(task)
-
-    def process_queue(self):
-        """Process tasks from the queue with rate limiting"""
-        while not self._task_queue.empty():
-            task = self._task_queue.get()
-            try:
-                result = self._process_task(task)
-                # Add delay between tasks for rate limiting
-                time.sleep(2)  # Adjust this value based on your needs
-                self._task_queue.task_done()
-                yield result
-            except Exception as e:
-                logging.error(f"Error processing task: {e}")
-                self._task_queue.task_done()
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        driver.set_page_load_timeout(10)
+
+        if lean:
+            # Block matching requests before they leave the browser
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self._settings['blocked_url_patterns']})
+        return driver
+
+    def _is_worn_out(self, pooled: PooledDriver) -> bool:
+        """True when a driver reached its page or uptime limit"""
+        settings = self._settings
+        age_minutes = (time.monotonic() - pooled.created_at) / 60
+        return (pooled.pages >= settings['max_pages_per_driver']
+                or age_minutes >= settings['max_driver_age_minutes'])
+
+    def _retire(self, pooled: PooledDriver) -> None:
+        """Quit a driver and free its slot in the pool"""
+        pooled.quit()
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _acquire(self) -> PooledDriver:
+        """Take an idle driver, start one when below pool size, or wait for a check-in or a free slot"""
+        while True:
+            with self._available:
+                while not self._idle and self._created >= self._settings['pool_size']:
+                    self._available.wait()
+                pooled = self._idle.popleft() if self._idle else None
+                if pooled is None:
+                    self._created += 1
+
+            if pooled is None:
+                try:
+                    return PooledDriver(self._setup_driver())
+                except Exception:
+                    with self._available:
+                        self._created -= 1
+                        self._available.notify()
+                    raise
+
+            if self._is_worn_out(pooled) or not pooled.is_healthy():
+                logging.info(f"Recycling browser after {pooled.pages} pages")
+                self._retire(pooled)
+                continue
+            return pooled
+
+    def _release(self, pooled: PooledDriver) -> None:
+        """Check a driver back in, retiring it when worn out or the pool shrank"""
+        with self._available:
+            if self._created <= self._settings['pool_size'] and not self._is_worn_out(pooled):
+                self._idle.append(pooled)
+                self._available.notify()
+                return
+        self._retire(pooled)
+
+    @contextmanager
+    def checkout(self):
+        """Check out a driver for exclusive use by the caller"""
+        pooled = self._acquire()
+        try:
+            yield pooled.driver
+        finally:
+            pooled.pages += 1
+            self._release(pooled)
 
     def _process_task(self, task):
-        """Process a single scraping task"""
-        with self._lock:
-            driver = self.get_driver()
-            try:
+        """Process a single scraping task on a pooled driver"""
+        try:
+            with self.checkout() as driver:
+                # Drop events of an earlier page load that failed before they were read
+                self._read_performance_log(driver)
+                start = time.perf_counter()
                 driver.get(task['url'])
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.CLASS_NAME, "listing-search-item__link--title"))
-                )
+                WebDriverWait(driver, 10).until(EC.any_of(
+                    EC.presence_of_element_located((By.CLASS_NAME, LISTING_MARKER)),
+                    EC.presence_of_element_located((By.CSS_SELECTOR, f"[class*='{NO_RESULTS_MARKER}']"))
+                ))
+                seconds = time.perf_counter() - start
+                get_metrics().observe('browser_fetch', seconds)
+                self._record_transfer(driver, task['url'], seconds)
                 return driver.page_source
-            except Exception as e:
-                logging.error(f"Error in task processing: {e}")
-                return None
+        except Exception as e:
+            logging.error(f"Error in task processing: {e}")
+            return None
 
-    def quit(self):
-        if self._driver:
-            try:
-                self._driver.quit()
-            except Exception as e:
-                logging.error(f"Error closing driver: {str(e)}")
-            finally:
-                self._driver = None
-
-@contextmanager
-def create_session():
-    session = r.Session()
-    try:
-        yield session
-    finally:
-        session.close()
+    @staticmethod
+    def _read_performance_log(driver) -> List[Dict[str, Any]]:
+        """Performance log entries since the previous read"""
+        try:
+            return driver.get_log('performance')
+        except Exception as e:
+            logging.warning(f"Could not read the browser performance log: {str(e)}")
+            return []
 
-def get_pararius_objects(url='https://www.pararius.com/apartments/amsterdam', batch_size=10):
+    @classmethod
+    def _record_transfer(cls, driver, url: str, seconds: float) -> None:
+        """Log and accumulate the bytes and time a page load took"""
+        transferred, requests = page_transfer(cls._read_performance_log(driver))
+        _browser_stats.record(transferred, requests, seconds)
+        logging.info(f"Browser fetch of {url}: {transferred / 1024:.0f} KiB in {requests} requests, {seconds:.2f}s")
+
+    def quit(self):
+        """Quit all idle drivers"""
+        while True:
+            with self._available:
+                if not self._idle:
+                    break
+                pooled = self._idle.popleft()
+            self._retire(pooled)
+
+def configure_fetcher(strategy: str = 'http_first',
+                      pool_size: int = 10,
+                      timeout: float = 10,
+                      requests_per_second: float = 2.0,
+                      burst: int = 2,
+                      detail_workers: int = 4,
+                      cache_dir: Optional[str] = None,
+                      cache_ttl_hours: float = 168,
+                      cache_max_mb: float = 100,
+                      cache_fresh_minutes: float = 10,
+                      browser_pool_size: int = 1,
+                      browser_max_pages: int = 50,
+                      browser_max_age_minutes: float = 60,
+                      lean_browser: bool = False,
+                      blocked_url_patterns: Optional[List[str]] = None) -> None:
     """
-    Thread-safe implementation of Pararius apartment listings fetcher using queue.
+    Configure the fetch layer shared by search and detail page requests
+
+    Args:
+        strategy: One of FETCH_STRATEGIES
+        pool_size: Maximum number of pooled keep-alive connections per host
+        timeout: Timeout in seconds for plain HTTP requests
+        requests_per_second: Sustained request rate per host, shared by all fetches
+        burst: Number of requests per host allowed back to back
+        detail_workers: Number of detail pages fetched concurrently
+        cache_dir: Directory of the on-disk detail page cache, None disables it
+        cache_ttl_hours: Age after which cached pages are evicted
+        cache_max_mb: Total cache size above which the oldest pages are evicted
+        cache_fresh_minutes: Age below which cached pages are served without a conditional request
+        browser_pool_size: Maximum number of Chromium drivers used in parallel
+        browser_max_pages: Pages after which a driver is recycled
+        browser_max_age_minutes: Uptime after which a driver is recycled
+        lean_browser: Block images, fonts and third-party scripts in the browser
+        blocked_url_patterns: URL patterns blocked in lean mode on top of BLOCKED_URL_PATTERNS
     """
-    logging.info(f"Starting get_pararius_objects with URL: {url}")
-    all_listings = []
-
+    global _http_session, _rate_limiter, _http_cache
+
+    if strategy not in FETCH_STRATEGIES:
+        raise ValueError(f"Unknown fetch strategy: {strategy}")
+
+    ParariusDriver.configure(
+        pool_size=browser_pool_size,
+        max_pages_per_driver=browser_max_pages,
+        max_driver_age_minutes=browser_max_age_minutes,
+        lean=lean_browser,
+        blocked_url_patterns=blocked_url_patterns
+    )
+
+    with _http_session_lock:
+        # A new pool size only takes effect on a fresh session
+        if pool_size != _fetcher_settings['pool_size'] and _http_session is not None:
+            _http_session.close()
+            _http_session = None
+
+        # Keep the buckets, and the budget already spent, unless the limits change
+        if (requests_per_second, burst) != (_rate_limiter.rate, _rate_limiter.capacity):
+            _rate_limiter = HostRateLimiter(requests_per_second, burst)
+
+        cache_settings = (cache_dir, cache_ttl_hours, cache_max_mb, cache_fresh_minutes)
+        if cache_settings != _fetcher_settings['cache']:
+            _http_cache = HttpCache(
+                directory=cache_dir,
+                ttl_seconds=cache_ttl_hours * 3600,
+                max_bytes=int(cache_max_mb * 1024 * 1024),
+                fresh_seconds=cache_fresh_minutes * 60
+            ) if cache_dir else None
+            if _http_cache is not None:
+                _http_cache.evict()
+
+        _fetcher_settings.update({
+            'strategy': strategy,
+            'pool_size': pool_size,
+            'timeout': timeout,
+            'requests_per_second': requests_per_second,
+            'burst': burst,
+            'detail_workers': detail_workers,
+            'cache': cache_settings
+        })
+
+def get_http_session() -> r.Session:
+    """Process-wide session with a keep-alive connection pool"""
+    global _http_session
+
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = r.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=_fetcher_settings['pool_size']
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(HTTP_HEADERS)
+                _http_session = session
+    return _http_session
+
+def _page_url(url: str, page: int) -> str:
+    """Build the URL of a results page, page 1 being the search URL itself"""
+    base = PAGE_PATTERN.sub('', url.rstrip('/'))
+    return base if page <= 1 else f"{base}/page-{page}"
+
+def _last_page(html: str) -> int:
+    """Highest page number linked from the pagination of a results page"""
+    return max((int(page) for page in PAGE_PATTERN.findall(html)), default=1)
+
+def _fetch_search_page_http(url: str) -> Optional[str]:
+    """Fetch a search results page over plain HTTP, None when it lacks both listing and no-results markup"""
     try:
-        # Get the singleton driver instance
-        driver_manager = ParariusDriver.get_instance()
-
-        # Add scraping task to queue
-        driver_manager.add_task({'url': url, 'batch_size': batch_size})
-
-        # Process the queue and get results
-        for html in driver_manager.process_queue():
-            if html:
-                # Process HTML outside the lock
-                soup = bs(html, 'html.parser')
-                items = soup.find_all("a", "listing-search-item__link listing-search-item__link--title", href=True)
-
-                # Process items in batches
-                for i in range(0, len(items), batch_size):
-                    batch = items[i:i + batch_size]
-                    batch_urls = ['https://pararius.com' + a['href'] for a in batch]
-                    all_listings.extend(batch_urls)
+        _rate_limiter.acquire(url)
+        with timed('search_fetch'):
+            response = get_http_session().get(url, timeout=_fetcher_settings['timeout'])
+        if not response.ok:
+            logging.info(f"HTTP fetch of {url} returned status {response.status_code}")
+            return None
+        if LISTING_MARKER in response.text:
+            return response.text
+        if NO_RESULTS_PATTERN.search(response.text):
+            # A real results page, just an empty one; the browser would only time out on it
+            logging.info(f"HTTP fetch of {url} found no results")
+            return response.text
+        logging.info(f"HTTP fetch of {url} returned no listing markup")
+        return None
+    except r.RequestException as e:
+        logging.warning(f"HTTP fetch of {url} failed: {str(e)}")
+        return None
+
+def _fetch_search_page(url: str) -> Optional[str]:
+    """Fetch the HTML of a single search results page using the configured strategy"""
+    strategy = _fetcher_settings['strategy']
+
+    if strategy != 'browser':
+        html = _fetch_search_page_http(url)
+        if html is not None or strategy == 'http':
+            return html
+        logging.info(f"Falling back to browser for {url}")
+
+    driver_manager = ParariusDriver.get_instance()
+    return driver_manager._process_task({'url': url})
+
+def _to_int(text: str) -> Optional[int]:
+    """First number in a text, ignoring thousands separators ('€1,500 per month' -> 1500)"""
+    match = NUMBER_PATTERN.search(text)
+    return int(re.sub(r'[.,]', '', match.group())) if match else None
+
+def _to_text(text: str) -> str:
+    """Text with collapsed whitespace"""
+    return ' '.join(text.split())
+
+def _to_postcode(text: str) -> Optional[str]:
+    """Dutch postcode in a text ('2011 AB Haarlem (Centrum)' -> '2011 AB')"""
+    match = POSTCODE_PATTERN.search(text)
+    if not match:
+        return None
+    return f"{match.group(1)} {match.group(2)}" if match.group(2) else match.group(1)
+
+# Field tables map field -> (tag, class, converter, default). Classes are single
+# class names, so every element can be looked up directly while walking once.
+FieldTable = Dict[str, Tuple[str, str, Callable[[str], Any], Any]]
+
+def _extract_fields(root, fields: FieldTable) -> Dict[str, Any]:
+    """Walk the elements under root once and convert the first match of every field"""
+    selectors = {(tag, cls): field for field, (tag, cls, _, _) in fields.items()}
+    tags = sorted({tag for tag, _, _, _ in fields.values()})
+    found: Dict[str, Any] = {}
+
+    for element in root.find_all(tags):
+        for cls in element.get('class', []):
+            field = selectors.get((element.name, cls))
+            if field is not None and field not in found:
+                found[field] = fields[field][2](element.get_text(' ', strip=True))
+
+    return {
+        field: found[field] if found.get(field) is not None else default
+        for field, (_, _, _, default) in fields.items()
+    }
+
+DETAIL_FIELDS: FieldTable = {
+    'price': ('div', 'listing-detail-summary__price', _to_int, None),
+    'bedrooms': ('dd', 'listing-features__description--number_of_bedrooms', _to_int, 0),
+    'service_costs': ('dd', 'listing-features__description--service_costs', _to_int, 0),
+    'rental_price_services': ('ul', 'listing-features__sub-description', _to_text, ''),
+    'surface_area': ('li', 'illustrated-features__item--surface-area', _to_int, 0)
+}
+
+# Only the summary and features sections of a detail page are parsed
+_DETAIL_SECTIONS = ('listing-detail-summary', 'listing-features', 'illustrated-features')
+DETAIL_STRAINER = SoupStrainer(class_=_class_matcher(*_DETAIL_SECTIONS))
+
+CARD_FIELDS: FieldTable = {
+    'price': ('div', 'listing-search-item__price', _to_int, None),
+    'surface_area': ('li', 'illustrated-features__item--surface-area', _to_int, None),
+    'rooms': ('li', 'illustrated-features__item--number-of-rooms', _to_int, None),
+    'postcode': ('div', 'listing-search-item__sub-title', _to_postcode, None)
+}
+
+# Listing cards and their title anchors are the only part of a search results page we read
+CARD_CLASS = 'listing-search-item'
+CARD_STRAINER = SoupStrainer(class_=_class_matcher(CARD_CLASS))
+
+@dataclass
+class ListingCard:
+    """Summary of a listing as shown on its search results card"""
+    url: str
+    price: Optional[int] = None
+    surface_area: Optional[int] = None
+    rooms: Optional[int] = None
+    postcode: Optional[str] = None
+
+    @property
+    def content_hash(self) -> str:
+        """Hash of the card values; it changes when the listing is edited"""
+        values = f"{self.price}|{self.surface_area}|{self.rooms}|{self.postcode}"
+        return hashlib.sha1(values.encode('utf-8')).hexdigest()
+
+def canonical_url(href: str) -> str:
+    """Canonical listing URL: pararius.com host, no query string or fragment"""
+    return BASE_URL + urlsplit(urljoin(BASE_URL + '/', href)).path
+
+def listing_city(url: str) -> Optional[str]:
+    """City segment of a listing URL (/apartment-for-rent/<city>/<id>/<street>), None when absent"""
+    segments = [segment for segment in urlsplit(url).path.split('/') if segment]
+    return segments[1].lower() if len(segments) > 2 else None
+
+def iter_listing_cards(html: str) -> Iterator[ListingCard]:
+    """
+    Yield a ListingCard per listing on a search results page
 
-                    # Add delay between batches
-                    time.sleep(0.5)
+    Only the listing cards are parsed; the rest of the page is skipped by the
+    strainer. The strained page is parsed in full before the first card is
+    yielded, so this saves memory and tree building, not time to first card.
+    A title anchor outside a card yields a card with only its URL.
+    """
+    soup = bs(html, HTML_PARSER, parse_only=CARD_STRAINER)
+    for anchor in soup.find_all('a', class_=LISTING_MARKER, href=True):
+        card = anchor.find_parent(class_=CARD_CLASS)
+        summary = _extract_fields(card, CARD_FIELDS) if card is not None else {}
+        yield ListingCard(url=canonical_url(anchor['href']), **summary)
+
+def iter_listing_links(html: str) -> Iterator[str]:
+    """Yield canonical listing URLs from a search results page"""
+    for card in iter_listing_cards(html):
+        yield card.url
+
+def _collect_page(html: Optional[str],
+                  known_links: Optional[Container[str]],
+                  listings: List[ListingCard]) -> bool:
+    """
+    Append the listing cards of a page to listings
 
-                    logging.info(f"Processed batch of {len(batch_urls)} items")
+    Returns:
+        bool: True when the page held a link not in known_links, i.e. the crawl should go on
+    """
+    has_new = False
+    with timed('search_parse'):
+        for card in iter_listing_cards(html or ''):
+            listings.append(card)
+            has_new = has_new or known_links is None or card.url not in known_links
+    return has_new
+
+def get_pararius_objects(url='https://www.pararius.com/apartments/amsterdam',
+                         known_links: Optional[Container[str]] = None,
+                         max_pages: int = 1,
+                         page_concurrency: int = 1) -> List[str]:
+    """Fetch listing URLs for a search; see get_pararius_cards"""
+    return [card.url for card in get_pararius_cards(url, known_links, max_pages, page_concurrency)]
+
+def get_pararius_cards(url='https://www.pararius.com/apartments/amsterdam',
+                       known_links: Optional[Container[str]] = None,
+                       max_pages: int = 1,
+                       page_concurrency: int = 1) -> List[ListingCard]:
+    """
+    Fetch listing cards for a search, following /page-N links up to max_pages.
 
-                # Clean up
-                del soup
-                gc.collect()
+    Page 1 is always fetched on its own. When it holds new listings, the
+    following pages are fetched in waves of page_concurrency pages, and the
+    crawl stops after the first wave containing a page whose links are all
+    in known_links (or that is empty). Cards are returned once the crawl is
+    done, deduplicated across pages.
+    """
+    logging.info(f"Starting get_pararius_cards with URL: {url}")
+    all_listings = []
 
+    try:
+        html = _fetch_search_page(_page_url(url, 1))
+        if not html:
+            return []
+
+        has_new = _collect_page(html, known_links, all_listings)
+        last_page = min(_last_page(html), max(1, max_pages))
+        del html
+
+        if last_page > 1 and has_new:
+            page_concurrency = max(1, page_concurrency)
+            with ThreadPoolExecutor(max_workers=page_concurrency) as executor:
+                page = 2
+                while page <= last_page:
+                    wave = list(range(page, min(page + page_concurrency, last_page + 1)))
+                    pages_html = executor.map(lambda n: _fetch_search_page(_page_url(url, n)), wave)
+
+                    stop = False
+                    for number, page_html in zip(wave, pages_html):
+                        found_before = len(all_listings)
+                        has_new = _collect_page(page_html, known_links, all_listings)
+                        logging.info(f"Page {number} yielded {len(all_listings) - found_before} items")
+                        stop = stop or not has_new
+
+                    if stop:
+                        logging.info(f"Stopping crawl after page {wave[-1]}: no new listings")
+                        break
+                    page += len(wave)
+
+        # Listings can shift between pages while crawling
+        unique_listings: Dict[str, ListingCard] = {}
+        for card in all_listings:
+            unique_listings.setdefault(card.url, card)
+        all_listings = list(unique_listings.values())
         logging.info(f"Found {len(all_listings)} items total.")
         return all_listings
 
@@ -153,75 +703,119 @@ def get_pararius_objects(url='https://www.pararius.com/apartments/amsterdam', ba
         logging.error(f"An error occurred: {str(e)}")
         return []
 
-def get_object_details(url):
-    """Thread-safe implementation of object details fetcher with rate limiting"""
-    time.sleep(1)  # Rate limiting for API calls
+def _fetch_detail_html(url: str) -> str:
+    """
+    Fetch a detail page over the pooled session, paced by the per-host rate limiter
 
-    with create_session() as session:
-        try:
-            response = session.get(url)
-            soup = bs(response.text, 'html.parser')
-            details = {
-                "price": '',
-                "bedrooms": 0,
-                "service_costs": 0,
-                "rental_price_services": '',
-                "surface_area": 0
-            }
+    With the cache enabled, fresh entries are served from disk and older ones
+    are revalidated with a conditional GET, so unchanged pages come back as 304s.
+    """
+    cache = _http_cache
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        return entry.body
+
+    _rate_limiter.acquire(url)
+    with timed('detail_fetch'):
+        response = get_http_session().get(
+            url,
+            headers=HttpCache.conditional_headers(entry),
+            timeout=_fetcher_settings['timeout']
+        )
 
-            # Extract price postfix
-            if soup.find("span", "listing-detail-summary__price-postfix"):
-                price_postfix = soup.find("span", "listing-detail-summary__price-postfix").text
+    if response.status_code == 304 and entry is not None:
+        cache.touch(entry)
+        return entry.body
+
+    response.raise_for_status()
+    if cache is not None:
+        cache.store(
+            url,
+            response.text,
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified')
+        )
+    return response.text
 
-            # Extract price
-            if soup.find("div", "listing-detail-summary__price"):
-                price_element = soup.find("div", "listing-detail-summary__price")
-                details['price'] = price_element.text.replace(price_postfix, '').strip().replace("€", '').replace(',','')
+def check_listing_live(url: str) -> Optional[bool]:
+    """
+    Whether a listing is still online, paced by the per-host rate limiter
 
-            # Extract bedrooms
-            if soup.find("dd", "listing-features__description listing-features__description--number_of_bedrooms"):
-                bedroom_element = soup.find("dd", "listing-features__description listing-features__description--number_of_bedrooms")
-                details['bedrooms'] = bedroom_element.text.strip()
+    Returns:
+        Optional[bool]: True for a 2xx response, False for 404 or 410, None when unknown
+    """
+    try:
+        _rate_limiter.acquire(url)
+        # Stream so only the headers are read; the body is never needed
+        with get_http_session().get(url, timeout=_fetcher_settings['timeout'], stream=True) as response:
+            if response.status_code in (404, 410):
+                return False
+            if response.ok:
+                return True
+            logging.info(f"Liveness check of {url} returned status {response.status_code}")
+            return None
+    except r.RequestException as e:
+        logging.warning(f"Liveness check of {url} failed: {str(e)}")
+        return None
 
-            # Extract service costs
-            if soup.find("dd","listing-features__description listing-features__description--service_costs"):
-                service_cost_element = soup.find("dd","listing-features__description listing-features__description--service_costs")
-                details['service_costs'] = service_cost_element.text.replace("€","").strip()
+def parse_object_details(html: str) -> Dict[str, Any]:
+    """
+    Extract typed listing details from a detail page in a single pass
 
-            # Extract rental price services
-            if soup.find("ul", "listing-features__sub-description"):
-                rental_price_services_element = soup.find("ul", "listing-features__sub-description")
-                details['rental_price_services'] = rental_price_services_element.text.strip()
+    Args:
+        html: Detail page HTML
 
-            # Extract surface area
-            if soup.find("li", "illustrated-features__item illustrated-features__item--surface-area"):
-                surface_area_element = soup.find("li", "illustrated-features__item illustrated-features__item--surface-area")
-                details['surface_area'] = surface_area_element.text.replace("m²","")
+    Returns:
+        Dict[str, Any]: One value per DETAIL_FIELDS entry, the field default when missing
+    """
+    with timed('detail_parse'):
+        soup = bs(html, HTML_PARSER, parse_only=DETAIL_STRAINER)
+        details = _extract_fields(soup, DETAIL_FIELDS)
+    del soup
+    return details
 
-            return details
+def get_object_html(url: str) -> Optional[str]:
+    """Detail page HTML, or None when it could not be fetched"""
+    try:
+        return _fetch_detail_html(url)
+    except Exception as e:
+        logging.error(f"Error fetching details for {url}: {str(e)}")
+        return None
 
-        except Exception as e:
-            logging.error(f"Error fetching details for {url}: {str(e)}")
-            return None
-        finally:
-            del soup
-            gc.collect()
+def get_object_details(url):
+    """Thread-safe implementation of object details fetcher with rate limiting"""
+    try:
+        html = get_object_html(url)
+        return parse_object_details(html) if html is not None else None
+
+    except Exception as e:
+        logging.error(f"Error parsing details for {url}: {str(e)}")
+        return None
+    finally:
+        gc.collect()
 
 def enrich_details(details):
     # Calculate price per bedroom
-    if isinstance(details['price'], int) and isinstance(details['bedrooms'], int):
-        details['price_per_bedroom'] = (details['price'] + details['service_costs']) / details['bedrooms']
+    if isinstance(details['price'], int) and isinstance(details['bedrooms'], int) and details['bedrooms'] > 0:
+        details['price_per_bedroom'] = round((details['price'] + details['service_costs']) / details['bedrooms'])
 
     # Calculate price per square meter
-    if isinstance(details['price'], int) and isinstance(details['surface_area'], int):
-        details['price_per_m2'] = details['price'] / details['surface_area']
+    if isinstance(details['price'], int) and isinstance(details['surface_area'], int) and details['surface_area'] > 0:
+        details['price_per_m2'] = round(details['price'] / details['surface_area'], 2)
 
     return details
 
 def cleanup():
+    global _http_session
+
     try:
-        driver_manager = ParariusDriver.get_instance()
-        driver_manager.quit()
+        # Only quit a browser that was actually started
+        if ParariusDriver._instance is not None:
+            ParariusDriver._instance.quit()
+        with _http_session_lock:
+            if _http_session is not None:
+                _http_session.close()
+                _http_session = None
     except Exception as e:
         logging.error(f"Error during cleanup: {str(e)}")
 
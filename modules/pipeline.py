@@ -0,0 +1,126 @@
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List
+
+# Tells a stage worker that its input is exhausted
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """
+    One step of a Pipeline
+
+    handler receives a list of up to batch_size items and returns the items
+    passed on to the next stage; items it drops are simply not returned.
+    """
+    name: str
+    handler: Callable[[List[Any]], Iterable[Any]]
+    workers: int = 1
+    queue_size: int = 50
+    batch_size: int = 1
+
+
+class Pipeline:
+    """
+    Stages connected by bounded queues, each drained by its own worker threads
+
+    A stage blocks once the queue in front of the next one is full, so a slow
+    stage holds back the ones before it instead of letting work pile up in
+    memory, while waiting on the network in one stage overlaps with work in
+    the others. The wall-clock time of a run approaches that of its slowest
+    stage. An exception in a handler drops the items of that call and is logged.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """
+        Push items through every stage, blocking until all are done
+
+        Returns:
+            List[Any]: The items returned by the last stage, in completion order
+        """
+        queues = [queue.Queue(maxsize=max(1, stage.queue_size)) for stage in self.stages]
+        results: List[Any] = []
+        results_lock = threading.Lock()
+        self.stats = {stage.name: {'items': 0, 'seconds': 0.0} for stage in self.stages}
+
+        threads = []
+        remaining = [max(1, stage.workers) for stage in self.stages]
+        remaining_lock = threading.Lock()
+
+        def emit(index: int, outputs: Iterable[Any]) -> None:
+            if index + 1 == len(self.stages):
+                with results_lock:
+                    results.extend(outputs)
+            else:
+                for output in outputs:
+                    queues[index + 1].put(output)
+
+        def finish(index: int) -> None:
+            # The last worker of a stage tells every worker of the next one to stop
+            with remaining_lock:
+                remaining[index] -= 1
+                last = remaining[index] == 0
+            if last and index + 1 < len(self.stages):
+                for _ in range(max(1, self.stages[index + 1].workers)):
+                    queues[index + 1].put(_DONE)
+
+        def work(index: int) -> None:
+            stage, inbox = self.stages[index], queues[index]
+            try:
+                while True:
+                    item = inbox.get()
+                    if item is _DONE:
+                        return
+
+                    batch = [item]
+                    done = False
+                    while len(batch) < stage.batch_size:
+                        try:
+                            item = inbox.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is _DONE:
+                            done = True
+                            break
+                        batch.append(item)
+
+                    started = time.monotonic()
+                    try:
+                        outputs = list(stage.handler(batch))
+                    except Exception as e:
+                        logging.error(f"Pipeline stage {stage.name} dropped {len(batch)} items: {str(e)}")
+                        outputs = []
+                    with remaining_lock:
+                        self.stats[stage.name]['items'] += len(batch)
+                        self.stats[stage.name]['seconds'] += time.monotonic() - started
+
+                    emit(index, outputs)
+                    if done:
+                        return
+            finally:
+                finish(index)
+
+        for index, stage in enumerate(self.stages):
+            for i in range(max(1, stage.workers)):
+                thread = threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}-{i}", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        for item in items:
+            queues[0].put(item)
+        for _ in range(max(1, self.stages[0].workers)):
+            queues[0].put(_DONE)
+
+        for thread in threads:
+            thread.join()
+        return results
@@ -0,0 +1,111 @@
+import gzip
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional
+from .known_links import KnownListing
+from .storage import StorageBackend
+
+
+def archive_rows(rows: List[Dict[str, Any]], archive_dir: str) -> str:
+    """
+    Write rows to a new gzipped JSON lines file in archive_dir
+
+    Returns:
+        str: Path of the archive file
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"links-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}.jsonl.gz")
+    with gzip.open(path, 'wt', encoding='utf-8') as file:
+        for row in rows:
+            file.write(json.dumps(row, default=str) + '\n')
+    return path
+
+
+def is_superseded(row: Dict[str, Any], newest: Optional[KnownListing]) -> bool:
+    """
+    True when a stored row is not the newest one of its link
+
+    Only stores with row keys can hold several rows per link. Rows are
+    compared with the index by key, or by content hash while the index does
+    not know the keys yet.
+    """
+    if newest is None or row.get('PartitionKey') is None:
+        return False
+    keys = newest.stored_keys()
+    if keys:
+        return keys != {'PartitionKey': row['PartitionKey'], 'RowKey': row.get('RowKey')}
+    return newest.content_hash != row.get('content_hash')
+
+
+def apply_retention(store: StorageBackend,
+                    ttl_days: float = 90,
+                    archive_dir: str = 'data/archive',
+                    max_checks: int = 500,
+                    check_workers: int = 4,
+                    is_live: Optional[Callable[[str], Optional[bool]]] = None,
+                    newest_row: Optional[Callable[[str], Optional[KnownListing]]] = None) -> Dict[str, int]:
+    """
+    Archive and delete rows not written for ttl_days
+
+    Deleting the row of a listing that is still online would get it notified
+    again, so each expired listing is checked first: live ones are touched and
+    kept for another TTL, ones answering 404/410 are archived and deleted, and
+    ones that could not be checked are left for the next run. Expired rows
+    superseded by a newer row of the same link are deleted without a check:
+    touching one would bring its old values back as the newest row.
+
+    Args:
+        store: Store to clean up
+        ttl_days: Age of the last write after which a row expires
+        archive_dir: Directory receiving one gzipped JSON lines file per run
+        max_checks: Maximum number of expired rows handled per run
+        check_workers: Number of concurrent liveness checks, paced by the fetch layer's rate limiter
+        is_live: Liveness check per link, None deletes expired rows without checking
+        newest_row: What the known-links index holds for a link, None skips the superseded check
+
+    Returns:
+        Dict[str, int]: Number of expired, superseded, kept, deleted and unchecked rows
+    """
+    before = datetime.now(timezone.utc) - timedelta(days=ttl_days)
+    expired = list(islice(store.query_links(before=before), max_checks))
+    stats = {'expired': len(expired), 'superseded': 0, 'kept': 0, 'deleted': 0, 'unchecked': 0}
+    if not expired:
+        return stats
+
+    if newest_row is not None:
+        current, superseded = [], []
+        for row in expired:
+            (superseded if is_superseded(row, newest_row(row['link'])) else current).append(row)
+        if superseded:
+            # The newer row still holds the listing, so nothing is archived
+            stats['superseded'] = store.delete_rows(superseded)
+        expired = current
+
+    if is_live is None:
+        gone, live = expired, []
+    else:
+        with ThreadPoolExecutor(max_workers=check_workers) as executor:
+            states = list(executor.map(lambda row: is_live(row['link']), expired))
+        gone = [row for row, state in zip(expired, states) if state is False]
+        live = [row for row, state in zip(expired, states) if state is True]
+        stats['unchecked'] = len(expired) - len(gone) - len(live)
+
+    if live:
+        stats['kept'] = store.touch_rows(live)
+
+    if gone:
+        try:
+            path = archive_rows(gone, archive_dir)
+        except OSError as e:
+            # Never delete what could not be archived
+            logging.error(f"Error archiving {len(gone)} expired rows, keeping them: {str(e)}")
+            return stats
+        stats['deleted'] = store.delete_rows(gone)
+        logging.info(f"Archived {len(gone)} expired rows to {path}")
+
+    logging.info(f"Retention: {stats}")
+    return stats
@@ -0,0 +1,174 @@
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Format of the 'timestamp' column written by manage
+TIMESTAMP_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+SCHEDULING_DEFAULTS = {
+    'mode': 'fixed',
+    'min_interval_minutes': 2,
+    'max_interval_minutes': 30,
+    'target_new_per_run': 1.0,
+    'jitter': 0.15,
+    'history_days': 28,
+    'refresh_hours': 24,
+    'max_backoff_minutes': 60
+}
+
+
+def row_time(row: Dict[str, Any]) -> Optional[datetime]:
+    """Local time a row was written, from its 'timestamp' column or else the store's Timestamp"""
+    try:
+        return datetime.strptime(row['timestamp'], TIMESTAMP_FORMAT)
+    except (KeyError, TypeError, ValueError):
+        written = row.get('Timestamp')
+        return written.astimezone().replace(tzinfo=None) if isinstance(written, datetime) else None
+
+
+class ArrivalModel:
+    """
+    New-listing arrival rates by weekday and hour
+
+    Counts listings per (weekday, hour) slot over a window of history and
+    divides by the number of times each slot occurred in that window, giving
+    the expected number of new listings per hour at that time of the week.
+    """
+
+    def __init__(self, history_days: float = 28):
+        self.history_days = history_days
+        self._counts: Dict[Tuple[int, int], float] = {}
+        self._window_start: Optional[datetime] = None
+        self._window_end: Optional[datetime] = None
+
+    def fit(self, rows: Iterable[Dict[str, Any]], now: Optional[datetime] = None) -> int:
+        """
+        Replace the counts with those of rows written in the last history_days
+
+        Returns:
+            int: Number of rows counted
+        """
+        now = now or datetime.now()
+        start = now - timedelta(days=self.history_days)
+        counts: Dict[Tuple[int, int], float] = {}
+        counted = 0
+        earliest: Optional[datetime] = None
+        for row in rows:
+            written = row_time(row)
+            if written is None or not start <= written <= now:
+                continue
+            slot = (written.weekday(), written.hour)
+            counts[slot] = counts.get(slot, 0.0) + 1
+            counted += 1
+            earliest = written if earliest is None else min(earliest, written)
+
+        self._counts = counts
+        # A store younger than history_days only covers the time since its first row
+        self._window_start, self._window_end = earliest or now, now
+        return counted
+
+    def record(self, count: int, now: Optional[datetime] = None) -> None:
+        """Add the new listings found by a run, keeping the model current between fits"""
+        now = now or datetime.now()
+        if count:
+            slot = (now.weekday(), now.hour)
+            self._counts[slot] = self._counts.get(slot, 0.0) + count
+        if self._window_start is None:
+            self._window_start = now
+        self._window_end = max(self._window_end or now, now)
+
+    def _occurrences(self, weekday: int, hour: int) -> int:
+        """Number of times a (weekday, hour) slot started within the window, at least one"""
+        if self._window_start is None or self._window_end is None:
+            return 1
+        start = self._window_start.replace(minute=0, second=0, microsecond=0)
+        first = start + timedelta(days=(weekday - start.weekday()) % 7, hours=hour - start.hour)
+        if first < start:
+            first += timedelta(weeks=1)
+        if first > self._window_end:
+            return 1
+        return int((self._window_end - first) / timedelta(weeks=1)) + 1
+
+    def rate(self, when: datetime) -> Optional[float]:
+        """Expected new listings per hour at a time of the week, None without history"""
+        if not self._counts:
+            return None
+        slot = (when.weekday(), when.hour)
+        return self._counts.get(slot, 0.0) / self._occurrences(*slot)
+
+
+class AdaptiveInterval:
+    """
+    Picks the time until the next run from the arrival rate
+
+    The interval aims at target_new_per_run new listings per run: short when
+    listings arrive quickly, long when they do not, always within the
+    configured bounds. Jitter spreads runs so they do not hit Pararius at
+    fixed times. Consecutive upstream errors double the interval, up to
+    max_backoff_minutes, until a run succeeds again.
+    """
+
+    def __init__(self,
+                 model: ArrivalModel,
+                 min_interval_minutes: float = 2,
+                 max_interval_minutes: float = 30,
+                 target_new_per_run: float = 1.0,
+                 jitter: float = 0.15,
+                 max_backoff_minutes: float = 60,
+                 default_interval_minutes: Optional[float] = None,
+                 rng: Optional[random.Random] = None):
+        """
+        Args:
+            model: Arrival rates the interval is derived from
+            min_interval_minutes: Shortest interval, at peak arrival rates
+            max_interval_minutes: Longest interval, when nothing arrives
+            target_new_per_run: New listings a run should find on average
+            jitter: Fraction by which an interval is randomly stretched or shortened
+            max_backoff_minutes: Longest interval after repeated upstream errors
+            default_interval_minutes: Interval while there is no history, defaults to max_interval_minutes
+            rng: Random source for the jitter
+        """
+        self.model = model
+        self.min_interval_minutes = min_interval_minutes
+        self.max_interval_minutes = max(min_interval_minutes, max_interval_minutes)
+        self.target_new_per_run = target_new_per_run
+        self.jitter = jitter
+        self.max_backoff_minutes = max_backoff_minutes
+        self.default_interval_minutes = default_interval_minutes
+        self.consecutive_errors = 0
+        self._rng = rng or random.Random()
+
+    def base_minutes(self, now: Optional[datetime] = None) -> float:
+        """Interval for the arrival rate at now, without jitter or backoff"""
+        now = now or datetime.now()
+        # Look ahead one longest interval, so runs speed up before a busy hour rather than into it
+        rates = [rate for rate in (self.model.rate(now), self.model.rate(now + timedelta(minutes=self.max_interval_minutes)))
+                 if rate is not None]
+        rate = max(rates) if rates else None
+        if rate is None:
+            minutes = self.default_interval_minutes or self.max_interval_minutes
+        elif rate <= 0:
+            minutes = self.max_interval_minutes
+        else:
+            minutes = 60 * self.target_new_per_run / rate
+        return min(self.max_interval_minutes, max(self.min_interval_minutes, minutes))
+
+    def next_minutes(self, error: bool = False, now: Optional[datetime] = None) -> float:
+        """Minutes until the next run, after a run that did or did not hit an upstream error"""
+        self.consecutive_errors = self.consecutive_errors + 1 if error else 0
+
+        minutes = self.base_minutes(now)
+        if self.jitter:
+            minutes *= 1 + self._rng.uniform(-self.jitter, self.jitter)
+
+        # Jitter comes before the bounds, so it never pushes an interval outside them
+        longest = self.max_interval_minutes
+        if self.consecutive_errors:
+            longest = max(self.max_backoff_minutes, longest)
+            minutes *= 2 ** self.consecutive_errors
+        minutes = min(longest, max(self.min_interval_minutes, minutes))
+
+        if self.consecutive_errors:
+            logging.warning(f"Backing off to {minutes:.1f} minutes after {self.consecutive_errors} failed runs")
+        return minutes
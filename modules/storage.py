@@ -0,0 +1,287 @@
+import logging
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+@dataclass
+class BulkInsertResult:
+    """Outcome of a bulk insert"""
+    inserted: int = 0
+    requests: int = 0
+    failures: Dict[str, str] = field(default_factory=dict)  # link -> error message
+
+    @property
+    def failed_links(self) -> List[str]:
+        return list(self.failures)
+
+
+# Typed listing columns stored next to link and timestamp, with their SQLite types
+DETAIL_COLUMNS = {
+    'price': 'INTEGER',
+    'bedrooms': 'INTEGER',
+    'service_costs': 'INTEGER',
+    'surface_area': 'INTEGER',
+    'rental_price_services': 'TEXT',
+    'content_hash': 'TEXT'
+}
+
+
+class StorageBackend(ABC):
+    """Interface of the store holding every link seen so far"""
+
+    @abstractmethod
+    def insert_row_to_table(self, link: str, timestamp: str) -> bool:
+        """Insert a single row, returning True on success"""
+
+    @abstractmethod
+    def insert_rows(self, rows: Iterable[Dict[str, Any]]) -> BulkInsertResult:
+        """
+        Upsert rows given as dicts with 'link' and 'timestamp', plus any of DETAIL_COLUMNS
+
+        Detail columns a row does not carry keep their stored values. A row updating a stored link may carry the 'PartitionKey' and 'RowKey'
+        the link is stored under; stores keyed by link alone ignore them.
+        """
+
+    @abstractmethod
+    def exists(self, link: str) -> bool:
+        """True when the link is stored"""
+
+    @abstractmethod
+    def query_links(self,
+                    since: Optional[datetime] = None,
+                    before: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield stored rows, optionally only those written at or after since and before before
+
+        Rows are dicts with 'link', 'timestamp' and 'Timestamp', the latter
+        being the UTC time the store wrote the row, plus 'price' and
+        'content_hash' (None when not stored). Rows read with before hold
+        every stored column, so they can be archived.
+        """
+
+    @abstractmethod
+    def delete_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Delete rows as yielded by query_links, returning the number deleted"""
+
+    @abstractmethod
+    def touch_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Mark rows as yielded by query_links as written now, keeping their values"""
+
+    def cleanup(self) -> None:
+        """Release resources"""
+
+
+class MemoryStorage(StorageBackend):
+    """Process-local store, for tests, profiling and load tests"""
+
+    def __init__(self):
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+
+    def insert_row_to_table(self, link: str, timestamp: str) -> bool:
+        with self._lock:
+            if link in self._rows:
+                logging.error(f"Error inserting row: {link} already exists")
+                return False
+            self._rows[link] = {'link': link, 'timestamp': timestamp, 'Timestamp': datetime.now(timezone.utc)}
+            return True
+
+    def insert_rows(self, rows: Iterable[Dict[str, Any]]) -> BulkInsertResult:
+        result = BulkInsertResult(requests=1)
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            for row in rows:
+                columns = {name: value for name, value in row.items() if name not in ('PartitionKey', 'RowKey')}
+                self._rows[row['link']] = {**self._rows.get(row['link'], {}), **columns, 'Timestamp': now}
+                result.inserted += 1
+        return result
+
+    def exists(self, link: str) -> bool:
+        with self._lock:
+            return link in self._rows
+
+    def query_links(self,
+                    since: Optional[datetime] = None,
+                    before: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = [{'price': None, 'content_hash': None, **row}
+                    for row in self._rows.values()
+                    if (since is None or row['Timestamp'] >= since) and (before is None or row['Timestamp'] < before)]
+        return iter(rows)
+
+    def delete_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        with self._lock:
+            return sum(self._rows.pop(row['link'], None) is not None for row in rows)
+
+    def touch_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        now = datetime.now(timezone.utc)
+        touched = 0
+        with self._lock:
+            for row in rows:
+                if row['link'] in self._rows:
+                    self._rows[row['link']]['Timestamp'] = now
+                    touched += 1
+        return touched
+
+
+class SQLiteStorage(StorageBackend):
+    """Local store in a SQLite database in WAL mode"""
+
+    def __init__(self, path: str = 'data/links.sqlite3'):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets readers run while a write is in progress
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS links (
+                link TEXT PRIMARY KEY,
+                timestamp TEXT,
+                written_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS links_written_at ON links (written_at);
+        """)
+        # Databases created before the detail columns existed get them added
+        existing = {row[1] for row in self._connection.execute("PRAGMA table_info(links)")}
+        for column, column_type in DETAIL_COLUMNS.items():
+            if column not in existing:
+                self._connection.execute(f"ALTER TABLE links ADD COLUMN {column} {column_type}")
+        self._connection.commit()
+
+    def insert_row_to_table(self, link: str, timestamp: str) -> bool:
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT INTO links (link, timestamp, written_at) VALUES (?, ?, ?)",
+                    (link, timestamp, datetime.now(timezone.utc).timestamp())
+                )
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Error inserting row: {str(e)}")
+            return False
+
+    def insert_rows(self, rows: Iterable[Dict[str, Any]]) -> BulkInsertResult:
+        rows = list(rows)
+        written_at = datetime.now(timezone.utc).timestamp()
+        # One upsert per set of carried columns, so the columns a row leaves out keep their values
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(tuple(column for column in DETAIL_COLUMNS if column in row), []).append(row)
+        try:
+            with self._lock, self._connection:
+                for carried, group in groups.items():
+                    columns = ''.join(f", {column}" for column in carried)
+                    placeholders = ''.join(', ?' for _ in carried)
+                    updates = ''.join(f", {column} = excluded.{column}" for column in carried)
+                    self._connection.executemany(
+                        f"INSERT INTO links (link, timestamp, written_at{columns}) VALUES (?, ?, ?{placeholders}) "
+                        f"ON CONFLICT(link) DO UPDATE SET timestamp = excluded.timestamp, "
+                        f"written_at = excluded.written_at{updates}",
+                        ((row['link'], row['timestamp'], written_at, *(row[column] for column in carried))
+                         for row in group)
+                    )
+            return BulkInsertResult(inserted=len(rows), requests=1)
+        except sqlite3.Error as e:
+            logging.error(f"Error inserting rows: {str(e)}")
+            return BulkInsertResult(requests=1, failures={row['link']: str(e) for row in rows})
+
+    def exists(self, link: str) -> bool:
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM links WHERE link = ?", (link,)).fetchone() is not None
+
+    def query_links(self,
+                    since: Optional[datetime] = None,
+                    before: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        query = f"SELECT link, timestamp, written_at, {', '.join(DETAIL_COLUMNS)} FROM links"
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("written_at >= ?")
+            params.append(since.timestamp())
+        if before is not None:
+            conditions.append("written_at < ?")
+            params.append(before.timestamp())
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        for link, timestamp, written_at, *values in rows:
+            yield {
+                'link': link,
+                'timestamp': timestamp,
+                'Timestamp': datetime.fromtimestamp(written_at, timezone.utc),
+                **dict(zip(DETAIL_COLUMNS, values))
+            }
+
+    def delete_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        try:
+            with self._lock, self._connection:
+                cursor = self._connection.executemany(
+                    "DELETE FROM links WHERE link = ?", ((row['link'],) for row in rows)
+                )
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logging.error(f"Error deleting rows: {str(e)}")
+            return 0
+
+    def touch_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        written_at = datetime.now(timezone.utc).timestamp()
+        try:
+            with self._lock, self._connection:
+                cursor = self._connection.executemany(
+                    "UPDATE links SET written_at = ? WHERE link = ?", ((written_at, row['link']) for row in rows)
+                )
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            logging.error(f"Error touching rows: {str(e)}")
+            return 0
+
+    def cleanup(self) -> None:
+        try:
+            with self._lock:
+                self._connection.close()
+        except Exception as e:
+            logging.error(f"Error during cleanup: {str(e)}")
+
+
+STORAGE_BACKENDS = ('azure', 'sqlite', 'memory')
+
+# The memory store must outlive a single run to remember anything
+_memory_storage: Optional[MemoryStorage] = None
+
+def create_storage(backend: str = 'azure',
+                   connection_string: Optional[str] = None,
+                   path: str = 'data/links.sqlite3',
+                   history_months: int = 36) -> StorageBackend:
+    """
+    Create the store selected in config.yaml
+
+    Args:
+        backend: One of STORAGE_BACKENDS
+        connection_string: Azure Tables connection string, for the azure backend
+        path: Database file, for the sqlite backend
+        history_months: Number of monthly partitions read, for the azure backend
+    """
+    global _memory_storage
+
+    if backend == 'azure':
+        # Imported here so local backends run without the Azure SDK
+        from .table_handler import AzureTableHandler
+        return AzureTableHandler(connection_string, history_months=history_months)
+    if backend == 'sqlite':
+        return SQLiteStorage(path)
+    if backend == 'memory':
+        if _memory_storage is None:
+            _memory_storage = MemoryStorage()
+        return _memory_storage
+    raise ValueError(f"Unknown storage backend: {backend}")
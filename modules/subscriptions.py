@@ -0,0 +1,150 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Sort key of a subscription without a price limit
+NO_PRICE_LIMIT = float('inf')
+
+
+@dataclass
+class Subscription:
+    """
+    One chat's listing criteria
+
+    As with CardFilter, a criterion left at None (or an empty list) is not
+    applied, and a listing value that is unknown never rejects the listing.
+    """
+    chat_id: str
+    cities: List[str] = field(default_factory=list)
+    max_price: Optional[int] = None
+    min_bedrooms: Optional[int] = None
+    min_surface_area: Optional[int] = None
+    postcodes: List[str] = field(default_factory=list)
+    name: str = ''
+
+    @classmethod
+    def from_config(cls, options: Dict[str, Any]) -> 'Subscription':
+        """Build a subscription from an entry of the subscriptions section of config.yaml"""
+        options = dict(options)
+        options['chat_id'] = str(options['chat_id'])
+        options['cities'] = [str(city).lower() for city in options.get('cities') or []]
+        options['postcodes'] = [str(prefix).replace(' ', '').upper() for prefix in options.get('postcodes') or []]
+        return cls(**options)
+
+    def matches(self,
+                city: Optional[str] = None,
+                price: Optional[int] = None,
+                bedrooms: Optional[int] = None,
+                surface_area: Optional[int] = None,
+                postcode: Optional[str] = None) -> bool:
+        """True unless a known listing value fails a criterion"""
+        if self.cities and city is not None and city.lower() not in self.cities:
+            return False
+
+        if self.max_price is not None and price is not None and price > self.max_price:
+            return False
+
+        if self.min_bedrooms is not None and bedrooms is not None and bedrooms < self.min_bedrooms:
+            return False
+
+        if (self.min_surface_area is not None and surface_area is not None
+                and surface_area < self.min_surface_area):
+            return False
+
+        if self.postcodes and postcode is not None:
+            if not postcode.replace(' ', '').upper().startswith(tuple(self.postcodes)):
+                return False
+
+        return True
+
+
+class SubscriptionIndex:
+    """
+    Subscriptions indexed by city and min_bedrooms, each group sorted by max_price
+
+    A listing is only compared with the subscriptions of its city (plus those
+    without cities) that ask for no more bedrooms than it has and whose
+    max_price it does not exceed; a binary search finds where those start, so
+    only surface area and postcode are left to check per subscription.
+    """
+
+    def __init__(self, subscriptions: Iterable[Subscription]):
+        groups: Dict[Optional[str], Dict[int, List[Subscription]]] = {}
+        for subscription in subscriptions:
+            for city in subscription.cities or [None]:
+                groups.setdefault(city, {}).setdefault(subscription.min_bedrooms or 0, []).append(subscription)
+
+        # Per city: (min_bedrooms, max_price keys, subscriptions) ordered by min_bedrooms
+        self._buckets: Dict[Optional[str], List[Tuple[int, List[float], List[Subscription]]]] = {}
+        self.size = 0
+        for city, by_bedrooms in groups.items():
+            self._buckets[city] = []
+            for min_bedrooms in sorted(by_bedrooms):
+                group = sorted(by_bedrooms[min_bedrooms], key=self._price_key)
+                self._buckets[city].append((min_bedrooms, [self._price_key(subscription) for subscription in group], group))
+                self.size += len(group)
+
+    @staticmethod
+    def _price_key(subscription: Subscription) -> float:
+        return subscription.max_price if subscription.max_price is not None else NO_PRICE_LIMIT
+
+    @classmethod
+    def from_config(cls,
+                    entries: Optional[List[Dict[str, Any]]],
+                    default_chat_id: str = '') -> 'SubscriptionIndex':
+        """
+        Build the index from the subscriptions section of config.yaml
+
+        Without subscriptions, default_chat_id (TELEGRAM_CHAT_ID) receives every listing.
+        """
+        if not entries:
+            return cls([Subscription(chat_id=default_chat_id)] if default_chat_id else [])
+        return cls(Subscription.from_config(entry) for entry in entries)
+
+    def match(self,
+              city: Optional[str] = None,
+              price: Optional[int] = None,
+              bedrooms: Optional[int] = None,
+              surface_area: Optional[int] = None,
+              postcode: Optional[str] = None) -> List[Subscription]:
+        """Subscriptions whose criteria the listing meets"""
+        if city is None:
+            # A listing without a known city may belong to any of them, and a
+            # subscription with several cities sits in each of their buckets
+            matched: Dict[int, Subscription] = {}
+            for key in self._buckets:
+                for subscription in self._match_bucket(key, price, bedrooms, surface_area, postcode):
+                    matched.setdefault(id(subscription), subscription)
+            return list(matched.values())
+
+        return (self._match_bucket(city.lower(), price, bedrooms, surface_area, postcode)
+                + self._match_bucket(None, price, bedrooms, surface_area, postcode))
+
+    def _match_bucket(self,
+                      key: Optional[str],
+                      price: Optional[int],
+                      bedrooms: Optional[int],
+                      surface_area: Optional[int],
+                      postcode: Optional[str]) -> List[Subscription]:
+        """Subscriptions of one city bucket that the listing meets"""
+        matched: List[Subscription] = []
+        compact_postcode = postcode.replace(' ', '').upper() if postcode is not None else None
+        for min_bedrooms, prices, group in self._buckets.get(key, ()):
+            # Groups are ordered by min_bedrooms, so the rest ask for even more
+            if bedrooms is not None and min_bedrooms > bedrooms:
+                break
+            start = 0 if price is None else bisect_left(prices, price)
+            for i in range(start, len(group)):
+                subscription = group[i]
+                if (surface_area is not None and subscription.min_surface_area is not None
+                        and surface_area < subscription.min_surface_area):
+                    continue
+                if (compact_postcode is not None and subscription.postcodes
+                        and not compact_postcode.startswith(tuple(subscription.postcodes))):
+                    continue
+                matched.append(subscription)
+        return matched
+
+    def chat_ids(self, **listing: Any) -> List[str]:
+        """Distinct chats to notify of a listing"""
+        return list(dict.fromkeys(subscription.chat_id for subscription in self.match(**listing)))
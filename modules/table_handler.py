@@ -1,8 +1,15 @@
 import logging
-from azure.data.tables import TableServiceClient, TableEntity
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableServiceClient, TableEntity, TableTransactionError
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import contextmanager
-from typing import Dict, Any, Generator, Optional
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import Dict, Any, Generator, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
 import gc
+import threading
+from .storage import DETAIL_COLUMNS, StorageBackend, BulkInsertResult
 
 # Suppress only azure.core.pipeline.policies.http_logging_policy
 logging.getLogger('azure.core.pipeline.policies.http_logging_policy').setLevel(logging.WARNING)
@@ -11,12 +18,41 @@ logging.getLogger('azure.core.pipeline.policies.http_logging_policy').setLevel(l
 logging.getLogger('azure').setLevel(logging.WARNING)
 
 
-class AzureTableHandler:
+# Azure Table transactions hold at most 100 operations, all in one partition
+MAX_TRANSACTION_SIZE = 100
+
+# Partition that held every row before rows were partitioned by month and city
+LEGACY_PARTITION = 'pararius'
+
+# Properties read back from the table; everything else stays server-side
+QUERY_FIELDS = ['PartitionKey', 'RowKey', 'link', 'timestamp', 'Timestamp', 'price', 'content_hash']
+
+
+def month_keys(start: datetime, end: datetime) -> List[str]:
+    """YYYYMM partition prefixes of every month from start to end, newest first"""
+    months = []
+    year, month = end.year, end.month
+    while (year, month) >= (start.year, start.month):
+        months.append(f"{year:04d}{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return months
+
+
+class AzureTableHandler(StorageBackend):
     """Handles Azure Table Storage operations with proper resource management"""
 
-    def __init__(self, connection_string: Optional[str] = None):
-        """Initialize handler with connection string"""
+    def __init__(self, connection_string: Optional[str] = None, history_months: int = 36, query_workers: int = 8):
+        """
+        Initialize handler with connection string
+
+        Args:
+            connection_string: Azure Tables connection string
+            history_months: Number of monthly partitions read by full scans and point lookups
+            query_workers: Number of partitions queried concurrently
+        """
         self.connection_string = connection_string
+        self.history_months = history_months
+        self.query_workers = query_workers
         if not self.connection_string:
             raise ValueError(
                 "Azure Tables connection string not found. "
@@ -26,45 +62,72 @@ class AzureTableHandler:
 
         self.table_name = "links"
         self._service_client = None
+        self._table_client = None
+        # Query fan-outs make the first calls from several threads at once
+        self._client_lock = threading.RLock()
 
     @contextmanager
     def _get_table_service(self):
-        """Context manager for table service client"""
-        if self._service_client is None:
-            self._service_client = TableServiceClient.from_connection_string(
-                conn_str=self.connection_string
-            )
-        try:
-            yield self._service_client
-        finally:
-            if self._service_client:
-                self._service_client.close()
-                self._service_client = None
+        """Context manager for the table service client, kept open for the handler's lifetime"""
+        with self._client_lock:
+            if self._service_client is None:
+                self._service_client = TableServiceClient.from_connection_string(
+                    conn_str=self.connection_string
+                )
+        yield self._service_client
 
     @contextmanager
     def _get_table_client(self):
-        """Context manager for table client with proper resource handling"""
-        table_client = None
-        try:
-            with self._get_table_service() as service_client:
-                table_client = service_client.get_table_client(table_name=self.table_name)
-                yield table_client
-        finally:
-            if table_client:
-                table_client.close()
-            gc.collect()  # Force garbage collection after client usage
+        """Context manager for the table client; its connection pool is reused until cleanup"""
+        with self._client_lock:
+            if self._table_client is None:
+                with self._get_table_service() as service_client:
+                    self._table_client = service_client.get_table_client(table_name=self.table_name)
+        yield self._table_client
+
+    @staticmethod
+    def _link_path(link: str) -> List[str]:
+        """Path segments of a link, e.g. ['apartment-for-rent', 'haarlem', '1a2b3c4d', 'street']"""
+        return [segment for segment in urlsplit(link).path.split('/') if segment]
+
+    @classmethod
+    def _city(cls, link: str) -> str:
+        """City segment of a listing link, 'unknown' when the link has none"""
+        segments = cls._link_path(link)
+        return segments[1].lower() if len(segments) > 1 else 'unknown'
 
-    def _create_entity(self, link: str, timestamp: str) -> TableEntity:
+    @classmethod
+    def _row_key(cls, link: str) -> str:
+        """
+        RowKey of a link: its full path with '/' (not allowed in keys) replaced by '|'
+
+        Unlike the listing id alone, the path is unique across cities and
+        property types.
+        """
+        return '|'.join(cls._link_path(link)) or link.replace('/', '|')
+
+    @classmethod
+    def _partition_key(cls, link: str, written_at: Optional[datetime] = None) -> str:
+        """
+        PartitionKey of a link: the month it was written followed by its city
+
+        The month comes first so all partitions of a month form one key range,
+        which a range filter reads without knowing the cities.
+        """
+        written_at = written_at or datetime.now(timezone.utc)
+        return f"{written_at:%Y%m}-{cls._city(link)}"
+
+    def _create_entity(self, link: str, timestamp: str, **columns: Any) -> TableEntity:
         """Create table entity with minimal memory usage"""
         entity = TableEntity()
-        # Extract RowKey efficiently
-        row_key = link.split('/')[-2] if '/' in link else link
 
         entity.update({
-            'PartitionKey': 'pararius',
-            'RowKey': row_key,
+            'PartitionKey': self._partition_key(link),
+            'RowKey': self._row_key(link),
             'link': link,
-            'timestamp': timestamp
+            'timestamp': timestamp,
+            # Missing detail values are left out rather than stored as nulls
+            **{name: value for name, value in columns.items() if value is not None}
         })
 
         return entity
@@ -92,18 +155,128 @@ class AzureTableHandler:
             logging.error(f"Error inserting row: {str(e)}")
             return False
 
-        finally:
-            # Clear any references
-            del entity
-            gc.collect()
+    def insert_rows(self, rows: Iterable[Dict[str, Any]]) -> BulkInsertResult:
+        """
+        Upsert rows with one transaction per partition and 100 entities
+
+        A failed transaction is rolled back as a whole, so its entities are
+        retried one by one to find out which of them actually failed.
+
+        Rows always land in the current month's partition. A row that updates
+        a stored one carries that row's PartitionKey and RowKey; once the new
+        entity is stored, the old one is deleted when it lives elsewhere, so
+        a link never keeps a stale copy in an older partition. Upserts merge,
+        so detail columns a row leaves out keep their values; a row that moves
+        partition copies them from the old entity first.
+
+        Args:
+            rows: Dicts with 'link' and 'timestamp', plus any extra columns
+
+        Returns:
+            BulkInsertResult: Number of stored entities, requests made and per-link failures
+        """
+        # A transaction may touch every entity only once, so the last row per key wins
+        entities = {}
+        superseded = {}
+        for row in rows:
+            columns = {name: value for name, value in row.items() if name not in ('PartitionKey', 'RowKey')}
+            entity = self._create_entity(**columns)
+            key = (entity['PartitionKey'], entity['RowKey'])
+            entities[key] = entity
+            if row.get('PartitionKey') and (row['PartitionKey'], row.get('RowKey')) != key:
+                superseded[row['link']] = {'PartitionKey': row['PartitionKey'], 'RowKey': row['RowKey'], 'link': row['link']}
+        self._carry_over_details(
+            [(entities[key], superseded[entity['link']]) for key, entity in entities.items()
+             if entity['link'] in superseded and any(column not in entity for column in DETAIL_COLUMNS)]
+        )
+
+        result = self._submit_transactions(entities.values(), 'upsert')
+        logging.info(f"Inserted {result.inserted} rows in {result.requests} requests, "
+                     f"{len(result.failures)} failed")
+
+        stale = [entity for link, entity in superseded.items() if link not in result.failures]
+        if stale:
+            self.delete_rows(stale)
+        return result
+
+    def _carry_over_details(self, moves: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> None:
+        """Fill the detail columns each moving entity leaves out from the stored entity it replaces"""
+        if not moves:
+            return
+        with self._get_table_client() as table_client:
+            for entity, old in moves:
+                try:
+                    stored = table_client.get_entity(partition_key=old['PartitionKey'], row_key=old['RowKey'],
+                                                     select=list(DETAIL_COLUMNS))
+                except ResourceNotFoundError:
+                    continue
+                except Exception as e:
+                    logging.warning(f"Could not read the stored row of {entity['link']}: {str(e)}")
+                    continue
+                for column in DETAIL_COLUMNS:
+                    if column not in entity and stored.get(column) is not None:
+                        entity[column] = stored[column]
+
+    def _submit_transactions(self, entities: Iterable[Dict[str, Any]], operation: str) -> BulkInsertResult:
+        """
+        Apply one operation ('upsert' or 'delete') to entities in transactions per partition
+
+        Returns:
+            BulkInsertResult: Entities the operation succeeded for, requests made and per-link failures
+        """
+        result = BulkInsertResult()
 
-    def query_entities(self, filter_query: str, batch_size: int = 100) -> Generator[Dict[str, Any], None, None]:
+        def partition_key(entity: Dict[str, Any]) -> str:
+            return entity['PartitionKey']
+
+        with self._get_table_client() as table_client:
+            for partition, group in groupby(sorted(entities, key=partition_key), key=partition_key):
+                group = list(group)
+                for i in range(0, len(group), MAX_TRANSACTION_SIZE):
+                    chunk = group[i:i + MAX_TRANSACTION_SIZE]
+                    try:
+                        result.requests += 1
+                        table_client.submit_transaction([(operation, entity) for entity in chunk])
+                        result.inserted += len(chunk)
+                    except TableTransactionError as e:
+                        logging.warning(f"Transaction of {len(chunk)} {operation}s in {partition} failed, "
+                                        f"retrying individually: {str(e)}")
+                        self._apply_individually(table_client, chunk, operation, result)
+                    except Exception as e:
+                        logging.error(f"Error submitting transaction: {str(e)}")
+                        for entity in chunk:
+                            result.failures[entity['link']] = str(e)
+        return result
+
+    @staticmethod
+    def _apply_individually(table_client: Any,
+                            entities: List[Dict[str, Any]],
+                            operation: str,
+                            result: BulkInsertResult) -> None:
+        """Apply an operation to entities one by one, recording each failure"""
+        for entity in entities:
+            try:
+                result.requests += 1
+                if operation == 'delete':
+                    # Deleting an entity that is already gone is not an error
+                    table_client.delete_entity(partition_key=entity['PartitionKey'], row_key=entity['RowKey'])
+                else:
+                    table_client.upsert_entity(entity=entity)
+                result.inserted += 1
+            except Exception as e:
+                result.failures[entity['link']] = str(e)
+
+    def query_entities(self,
+                       filter_query: str,
+                       batch_size: int = 100,
+                       select: Optional[List[str]] = None) -> Generator[Dict[str, Any], None, None]:
         """
         Query entities with batched processing
 
         Args:
             filter_query: The filter query to apply
             batch_size: Number of entities to process at once
+            select: Properties returned by the server, all of them when None
 
         Yields:
             Dict[str, Any]: Entity data
@@ -112,15 +285,20 @@ class AzureTableHandler:
             with self._get_table_client() as table_client:
                 entities = table_client.query_entities(
                     filter_query,
-                    results_per_page=batch_size
+                    results_per_page=batch_size,
+                    select=select
                 )
 
                 for entity in entities:
-                    # Convert entity to dict and yield only necessary data
+                    # Convert entity to a plain dict of the selected properties
                     yield {
+                        'price': None,
+                        'content_hash': None,
+                        **entity,
                         'link': entity.get('link', ''),
                         'timestamp': entity.get('timestamp', ''),
-                        'RowKey': entity.get('RowKey', '')
+                        # Server-side write time, usable in Timestamp filters
+                        'Timestamp': entity.metadata.get('timestamp')
                     }
 
                     # Clear entity reference
@@ -130,15 +308,126 @@ class AzureTableHandler:
             logging.error(f"Error querying entities: {str(e)}")
             raise
 
+    def _history_start(self) -> datetime:
+        """First day of the oldest month kept in reads"""
+        now = datetime.now(timezone.utc)
+        months = now.year * 12 + now.month - 1 - (self.history_months - 1)
+        return datetime(months // 12, months % 12 + 1, 1, tzinfo=timezone.utc)
+
+    @staticmethod
+    def _datetime_literal(value: datetime) -> str:
+        return f"datetime'{value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}'"
+
+    def _partition_filters(self, since: Optional[datetime] = None, before: Optional[datetime] = None) -> List[str]:
+        """
+        One filter per monthly key range to read, plus the legacy partition
+
+        Rows land in the partition of the month they were written, so rows
+        written since a given time live in that month or a later one, and rows
+        written before a given time in that month or an earlier one.
+        """
+        start = max(since, self._history_start()) if since is not None else self._history_start()
+        end = min(before, datetime.now(timezone.utc)) if before is not None else datetime.now(timezone.utc)
+        filters = [
+            f"PartitionKey ge '{month}-' and PartitionKey lt '{month}.'"
+            for month in month_keys(start, end)
+        ]
+        filters.append(f"PartitionKey eq '{LEGACY_PARTITION}'")
+
+        timestamp_filter = ''
+        if since is not None:
+            timestamp_filter += f" and Timestamp ge {self._datetime_literal(since)}"
+        if before is not None:
+            timestamp_filter += f" and Timestamp lt {self._datetime_literal(before)}"
+        return [filter_query + timestamp_filter for filter_query in filters]
+
+    def _query_partition(self, filter_query: str, select: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """Read one partition range"""
+        return list(self.query_entities(filter_query, batch_size=1000, select=select))
+
+    def exists(self, link: str) -> bool:
+        """
+        Point lookups of a link in its city's monthly partitions and the legacy partition
+
+        A link's row may be in any of history_months + 1 partitions, so the
+        lookups run concurrently over query_workers; a stored link answers as
+        soon as one of them finds it. Runs check links against the known-links
+        index rather than calling this per listing.
+        """
+        city = self._city(link)
+        candidates = [(f"{month}-{city}", self._row_key(link))
+                      for month in month_keys(self._history_start(), datetime.now(timezone.utc))]
+        # Legacy rows were keyed by the listing id alone
+        candidates.append((LEGACY_PARTITION, link.split('/')[-2] if '/' in link else link))
+
+        with self._get_table_client() as table_client:
+            def lookup(partition_key: str, row_key: str) -> bool:
+                try:
+                    table_client.get_entity(partition_key=partition_key, row_key=row_key, select=['link'])
+                    return True
+                except ResourceNotFoundError:
+                    return False
+
+            executor = ThreadPoolExecutor(max_workers=min(self.query_workers, len(candidates)))
+            try:
+                futures = [executor.submit(lookup, partition_key, row_key) for partition_key, row_key in candidates]
+                return any(future.result() for future in as_completed(futures))
+            finally:
+                # Lookups not started yet are not needed once the link was found
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def query_links(self,
+                    since: Optional[datetime] = None,
+                    before: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield stored rows, optionally only those written at or after since and before before
+
+        Every partition range is queried concurrently. Only QUERY_FIELDS are
+        projected server-side, except for reads with before, which return
+        whole rows for archiving.
+        """
+        filters = self._partition_filters(since, before)
+        select = QUERY_FIELDS if before is None else None
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.query_workers, len(filters))) as executor:
+                futures = [executor.submit(self._query_partition, filter_query, select) for filter_query in filters]
+                for future in as_completed(futures):
+                    yield from future.result()
         finally:
             gc.collect()
 
+    def delete_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Delete rows in transactions of 100 per partition"""
+        result = self._submit_transactions(
+            [{'PartitionKey': row['PartitionKey'], 'RowKey': row['RowKey'], 'link': row['link']} for row in rows],
+            'delete'
+        )
+        logging.info(f"Deleted {result.inserted} rows in {result.requests} requests, "
+                     f"{len(result.failures)} failed")
+        return result.inserted
+
+    def touch_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Write rows again so their Timestamp is now
+
+        The rewritten row lands in the current month's partition and
+        insert_rows deletes the old entity once the new one is stored.
+        """
+        result = self.insert_rows(
+            {name: value for name, value in row.items() if name != 'Timestamp'} for row in rows
+        )
+        return result.inserted
+
     def cleanup(self) -> None:
         """Cleanup resources"""
         try:
-            if self._service_client:
-                self._service_client.close()
-                self._service_client = None
+            with self._client_lock:
+                if self._table_client:
+                    self._table_client.close()
+                    self._table_client = None
+                if self._service_client:
+                    self._service_client.close()
+                    self._service_client = None
             gc.collect()
         except Exception as e:
             logging.error(f"Error during cleanup: {str(e)}")
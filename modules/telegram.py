@@ -1,23 +1,41 @@
 import os
 import logging
 import requests
-from typing import Optional, Dict, Any
-from contextlib import contextmanager
-import urllib.parse
-import gc
+from requests.adapters import HTTPAdapter
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional, Dict, Any, List
+from .metrics import timed
+
+# Bot API host, overridable to point at a local stand-in
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+
+# Separates listings packed into one digest message
+DIGEST_SEPARATOR = '\n\n'
+
+@dataclass
+class DeliveryResult:
+    """Outcome of one sendMessage call"""
+    ok: bool
+    response: Optional[Dict[str, Any]] = None
+    retry_after: Optional[float] = None  # Seconds Telegram asked to wait (HTTP 429)
+    retryable: bool = False               # Rate limits, server errors and network errors
+    error: str = ''
 
 class TelegramSender:
-    """Manages Telegram message sending with proper resource management"""
+    """Sends Telegram messages over one pooled keep-alive session per bot"""
 
-    def __init__(self, bot_token: str, chat_id: str):
+    def __init__(self, bot_token: str, chat_id: str = ''):
         self.bot_token = bot_token
         self.chat_id = chat_id
-        self.session = requests.Session()  # Reuse session for better performance
-        self.base_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-
-    def __del__(self):
-        """Ensure session is closed on object deletion"""
-        self.cleanup()
+        self.session = requests.Session()  # Reused for every message of this bot
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.base_url = f"{TELEGRAM_API_URL}/bot{bot_token}/sendMessage"
 
     def cleanup(self) -> None:
         """Clean up resources"""
@@ -27,12 +45,6 @@ class TelegramSender:
             except Exception as e:
                 logging.error(f"Error closing session: {e}")
 
-    def _prepare_message(self, msg: str) -> str:
-        """Prepare and sanitize message text"""
-        # Replace underscores and encode message
-        sanitized_msg = msg.replace('_', ' ')
-        return urllib.parse.quote(sanitized_msg)
-
     def _log_message(self, msg: str) -> None:
         """Log shortened version of sent message"""
         try:
@@ -42,62 +54,70 @@ class TelegramSender:
         except Exception as e:
             logging.error(f"Error logging message: {e}")
 
-    def send(self, msg: str = 'Test message') -> Optional[Dict[str, Any]]:
-        """Send message to Telegram with proper resource management"""
-        response = None
+    def deliver(self, msg: str, chat_id: Optional[str] = None) -> DeliveryResult:
+        """Send a message as a JSON POST, to chat_id or the sender's default chat"""
+        payload = {
+            'chat_id': chat_id or self.chat_id,
+            'parse_mode': 'Markdown',
+            'text': msg.replace('_', ' ')  # Underscores would open Markdown italics
+        }
 
         try:
-            # Prepare message parameters
-            params = {
-                'chat_id': self.chat_id,
-                'parse_mode': 'Markdown',
-                'text': msg.replace('_', ' ')  # Direct replacement without additional memory allocation
-            }
-
-            # Send request using session
-            response = self.session.get(
-                self.base_url,
-                params=params,
-                timeout=10  # Add timeout to prevent hanging
-            )
-
-            # Log message
-            self._log_message(msg)
-
-            # Return JSON response
-            return response.json() if response.ok else None
+            with timed('telegram_send'):
+                response = self.session.post(self.base_url, json=payload, timeout=10)
+            with response:
+                if response.ok:
+                    self._log_message(msg)
+                    return DeliveryResult(ok=True, response=response.json())
+
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                error = f"HTTP {response.status_code}: {body.get('description', '')}"
+
+                if response.status_code == 429:
+                    retry_after = (body.get('parameters') or {}).get('retry_after')
+                    return DeliveryResult(ok=False, retry_after=float(retry_after or 1), retryable=True, error=error)
+                return DeliveryResult(ok=False, retryable=response.status_code >= 500, error=error)
 
         except requests.RequestException as e:
-            logging.error(f"Request error: {e}")
-            return None
+            return DeliveryResult(ok=False, retryable=True, error=f"Request error: {e}")
 
         except Exception as e:
-            logging.error(f"Error sending message: {e}")
-            return None
-
-        finally:
-            # Clear response object if it exists
-            if response:
-                response.close()
-                del response
-
-            # Force garbage collection after sending message
-            gc.collect()
-
-@contextmanager
-def telegram_sender(bot_token: str, chat_id: str):
-    """Context manager for TelegramSender"""
-    sender = TelegramSender(bot_token, chat_id)
-    try:
-        yield sender
-    finally:
-        sender.cleanup()
+            return DeliveryResult(ok=False, error=f"Error sending message: {e}")
+
+    def send(self, msg: str = 'Test message', chat_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Send a message once, returning Telegram's response or None on failure"""
+        result = self.deliver(msg, chat_id=chat_id)
+        if not result.ok:
+            logging.error(result.error)
+        return result.response
+
+_senders: Dict[str, TelegramSender] = {}
+_senders_lock = Lock()
+
+def get_sender(bot_token: str, chat_id: str = '') -> TelegramSender:
+    """Process-wide sender per bot token, so its connections stay open between messages"""
+    with _senders_lock:
+        sender = _senders.get(bot_token)
+        if sender is None:
+            sender = _senders[bot_token] = TelegramSender(bot_token, chat_id)
+        sender.chat_id = chat_id or sender.chat_id
+        return sender
+
+def close_senders() -> None:
+    """Close the sessions of every cached sender"""
+    with _senders_lock:
+        for sender in _senders.values():
+            sender.cleanup()
+        _senders.clear()
 
 def send_text(msg: str = 'Test message',
               bot_token: str = '',
               chat_id: str = '') -> Optional[Dict[str, Any]]:
     """
-    Send text message to Telegram with proper resource management
+    Send text message to Telegram over the bot's cached sender
 
     Args:
         msg: Message to send
@@ -107,8 +127,42 @@ def send_text(msg: str = 'Test message',
     Returns:
         Optional[Dict[str, Any]]: Response from Telegram API or None if error occurs
     """
-    with telegram_sender(bot_token, chat_id) as sender:
-        return sender.send(msg)
+    return get_sender(bot_token).send(msg, chat_id=chat_id)
+
+def pack_digest(messages: List[str],
+                limit: int = MAX_MESSAGE_LENGTH,
+                separator: str = DIGEST_SEPARATOR) -> List[str]:
+    """
+    Pack messages, in order, into as few texts of at most limit characters as possible
+
+    A message longer than limit on its own is split at line breaks where
+    possible, and hard-cut otherwise.
+    """
+    packed: List[str] = []
+    current = ''
+    for msg in messages:
+        for part in _split_message(msg, limit):
+            if current and len(current) + len(separator) + len(part) <= limit:
+                current += separator + part
+            else:
+                if current:
+                    packed.append(current)
+                current = part
+    if current:
+        packed.append(current)
+    return packed
+
+def _split_message(msg: str, limit: int) -> List[str]:
+    """Split a message into parts of at most limit characters"""
+    parts = []
+    while len(msg) > limit:
+        cut = msg.rfind('\n', 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        parts.append(msg[:cut])
+        msg = msg[cut:].lstrip('\n')
+    parts.append(msg)
+    return parts
 
 def configure_logging():
     """Configure logging with proper format"""
@@ -0,0 +1,159 @@
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from .journal import Journal
+from .metrics import timed
+from .storage import BulkInsertResult, StorageBackend
+
+
+class WriteBehindQueue:
+    """
+    Queue of rows written to the store in the background
+
+    insert_rows appends rows to a local append-only journal and returns;
+    a worker thread flushes them to the store in batches once batch_size rows
+    are waiting or flush_interval_seconds have passed. Rows stay in the
+    journal until the store accepted them, so rows left behind by a crash or
+    a failing store are replayed when the next queue starts.
+    """
+
+    def __init__(self,
+                 store: StorageBackend,
+                 journal_path: str = 'data/write_journal.jsonl',
+                 batch_size: int = 100,
+                 flush_interval_seconds: float = 5.0):
+        """
+        Args:
+            store: Store the rows are flushed to
+            journal_path: JSON lines file holding every row not yet flushed
+            batch_size: Number of waiting rows that triggers a flush
+            flush_interval_seconds: Maximum time a row waits before being flushed
+        """
+        self.store = store
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+
+        self._pending: List[Dict[str, Any]] = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._journal = Journal(journal_path, 'write journal')
+
+    def __enter__(self) -> 'WriteBehindQueue':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def replay(self) -> int:
+        """
+        Queue the rows left in the journal by a previous run
+
+        Returns:
+            int: Number of replayed rows
+        """
+        rows = self._journal.read()
+        with self._condition:
+            self._pending[:0] = rows
+        if rows:
+            logging.info(f"Replaying {len(rows)} rows from the write journal")
+        return len(rows)
+
+    def start(self) -> None:
+        """Replay the journal and start the flush thread"""
+        self.replay()
+        self._journal.open()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def insert_rows(self, rows: Iterable[Dict[str, Any]]) -> BulkInsertResult:
+        """
+        Queue rows for the store, returning once they are journaled
+
+        Returns:
+            BulkInsertResult: Rows that could not be journaled are reported as failures
+        """
+        rows = list(rows)
+        if not rows:
+            return BulkInsertResult()
+
+        with self._condition:
+            try:
+                self._journal.append(rows)
+            except (OSError, TypeError, ValueError) as e:
+                logging.error(f"Error writing to the write journal: {str(e)}")
+                return BulkInsertResult(failures={row['link']: str(e) for row in rows})
+
+            self._pending.extend(rows)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+        return BulkInsertResult(inserted=len(rows))
+
+    @property
+    def pending(self) -> int:
+        """Number of rows not yet flushed"""
+        with self._condition:
+            return len(self._pending)
+
+    def pending_rows(self) -> List[Dict[str, Any]]:
+        """Copy of the rows not yet flushed"""
+        with self._condition:
+            return list(self._pending)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopping or len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval_seconds
+                )
+                if self._stopping:
+                    return
+            self.flush()
+
+    def flush(self) -> BulkInsertResult:
+        """Write every waiting row to the store, keeping failed rows for the next flush"""
+        with self._flush_lock:
+            with self._condition:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return BulkInsertResult()
+
+            try:
+                with timed('insert'):
+                    result = self.store.insert_rows(batch)
+            except Exception as e:
+                logging.error(f"Error flushing {len(batch)} rows: {str(e)}")
+                result = BulkInsertResult(failures={row['link']: str(e) for row in batch})
+
+            failed = [row for row in batch if row['link'] in result.failures]
+            with self._condition:
+                self._pending[:0] = failed
+                # On failure the old journal still holds every row, flushed ones are upserted again on replay
+                self._journal.rewrite(self._pending)
+
+            if failed:
+                logging.warning(f"Flushed {len(batch) - len(failed)} rows, {len(failed)} kept for retry")
+            else:
+                logging.info(f"Flushed {len(batch)} rows in {result.requests} requests")
+            return result
+
+    def close(self) -> None:
+        """Stop the flush thread and drain every waiting row to the store"""
+        if self._thread is not None:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify()
+            self._thread.join()
+            self._thread = None
+
+        self.flush()
+        self._journal.close()
+
+        if self.pending:
+            logging.error(f"{self.pending} rows could not be stored, they stay in {self.journal_path}")
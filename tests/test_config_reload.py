@@ -0,0 +1,68 @@
+import sys
+import os
+import yaml
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+CONFIG = {
+    'searches': [{'city': 'haarlem', 'km_radius': 15, 'max_price_in_euros': 1500, 'minimum_bedrooms': 1}],
+    'scrape_interval_in_minutes': 5,
+    'storage': {'backend': 'memory'},
+    'metrics': {'enabled': False}
+}
+
+def write_config(path, **changes):
+    with open(path, 'w') as file:
+        yaml.safe_dump({**CONFIG, **changes}, file)
+    # Make the change visible even on filesystems with coarse modification times
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def test_reload_applies_valid_changes_and_keeps_the_config_on_invalid_ones(tmp_path):
+    path = str(tmp_path / 'config.yaml')
+    write_config(path)
+    manager = app.ConfigManager(path)
+
+    assert manager.reload_if_changed() is None
+
+    write_config(path, scrape_interval_in_minutes=2)
+    assert manager.reload_if_changed()['scrape_interval_in_minutes'] == 2
+
+    write_config(path, max_pages=0)
+    assert manager.reload_if_changed() is None
+    assert manager.get_config()['scrape_interval_in_minutes'] == 2
+
+def test_reload_keeps_the_config_when_a_section_has_a_typo_or_wrong_type(tmp_path):
+    path = str(tmp_path / 'config.yaml')
+    write_config(path, card_filter={'max_price': 1500})
+    manager = app.ConfigManager(path)
+
+    for changes in ({'card_filter': {'max_rent': 1500}},
+                    {'subscriptions': [{'chat_id': '1', 'min_rooms': 2}]},
+                    {'fetcher': {'detail_workers': 'four'}},
+                    {'pipeline': {'notify_worker': 2}}):
+        write_config(path, **changes)
+        assert manager.reload_if_changed() is None
+        assert manager.get_config()['card_filter'] == {'max_price': 1500}
+
+    write_config(path, subscriptions=[{'chat_id': -100123, 'cities': ['haarlem'], 'min_bedrooms': 2}])
+    assert manager.reload_if_changed()['subscriptions'][0]['min_bedrooms'] == 2
+
+def test_interval_and_retention_changes_reschedule_jobs(tmp_path, monkeypatch):
+    # Keep the test run's own signal handling
+    monkeypatch.setattr(app.signal, 'signal', lambda *args: None)
+    path = str(tmp_path / 'config.yaml')
+    write_config(path)
+    scheduler = app.SchedulerManager(app.ConfigManager(path))
+    scheduler.scheduler.add_job(lambda: None, 'interval', id=scheduler.SCRAPE_JOB_ID, minutes=5)
+
+    write_config(path, scrape_interval_in_minutes=2, retention={'ttl_days': 30, 'interval_hours': 12},
+                 telegram={'per_chat_per_second': 2})
+    scheduler.check_config()
+
+    assert scheduler.scheduler.get_job(scheduler.SCRAPE_JOB_ID).trigger.interval.total_seconds() == 120
+    assert scheduler.scheduler.get_job(scheduler.RETENTION_JOB_ID).trigger.interval.total_seconds() == 12 * 3600
+    assert scheduler._restart_dispatcher
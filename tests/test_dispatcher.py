@@ -0,0 +1,119 @@
+import sys
+import os
+import threading
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.dispatcher import TelegramDispatcher
+from modules.telegram import DeliveryResult
+
+class FakeTelegram:
+    """Delivery stand-in answering with queued results, then success"""
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.calls = []
+
+    def __call__(self, message):
+        self.calls.append((time.monotonic(), message.chat_id, message.text))
+        return self.results.pop(0) if self.results else DeliveryResult(ok=True)
+
+def test_retry_after_blocks_the_chat_then_delivers():
+    telegram = FakeTelegram([DeliveryResult(ok=False, retry_after=0.2, retryable=True)])
+    dispatcher = TelegramDispatcher(per_chat_per_second=100, deliver=telegram, workers=1)
+    dispatcher.submit('a', 'token', 'chat')
+    dispatcher.submit('b', 'token', 'chat')
+
+    assert dispatcher.drain(timeout=5)
+    dispatcher.close()
+
+    assert [text for _, _, text in telegram.calls] == ['a', 'a', 'b']
+    assert telegram.calls[1][0] - telegram.calls[0][0] >= 0.2
+    assert dispatcher.stats == {'sent': 2, 'retried': 1, 'failed': 0}
+
+def test_per_chat_limit_does_not_hold_back_other_chats():
+    telegram = FakeTelegram()
+    dispatcher = TelegramDispatcher(per_chat_per_second=5, deliver=telegram, workers=2)
+    for text in ('a1', 'a2', 'a3'):
+        dispatcher.submit(text, 'token', 'a')
+    dispatcher.submit('b1', 'token', 'b')
+
+    assert dispatcher.drain(timeout=5)
+    dispatcher.close()
+
+    order = [text for _, _, text in telegram.calls]
+    assert order.index('b1') < order.index('a2')
+    a_times = [at for at, chat, _ in telegram.calls if chat == 'a']
+    assert a_times[2] - a_times[0] >= 0.35
+
+def test_permanent_failures_are_not_retried():
+    telegram = FakeTelegram([DeliveryResult(ok=False, error='HTTP 400')])
+    dispatcher = TelegramDispatcher(deliver=telegram, workers=1)
+    dispatcher.submit('a', 'token', 'chat')
+
+    assert dispatcher.drain(timeout=5)
+    dispatcher.close()
+    assert len(telegram.calls) == 1 and dispatcher.stats['failed'] == 1
+
+def test_long_chat_queue_drains_at_the_chat_rate():
+    telegram = FakeTelegram()
+    dispatcher = TelegramDispatcher(per_chat_per_second=500, global_per_second=500, deliver=telegram)
+    for i in range(500):
+        dispatcher.submit(str(i), 'token', 'chat')
+
+    assert dispatcher.drain(timeout=10)
+    dispatcher.close()
+    assert [text for _, _, text in telegram.calls] == [str(i) for i in range(500)]
+
+def test_unsent_messages_survive_close_in_the_journal(tmp_path):
+    journal = str(tmp_path / 'telegram.jsonl')
+    blocked = TelegramDispatcher(deliver=FakeTelegram([DeliveryResult(ok=False, retry_after=60, retryable=True)]),
+                                 workers=1, journal_path=journal)
+    for text in ('a', 'b'):
+        blocked.submit(text, 'token', 'chat')
+    blocked.close(timeout=0.2)
+
+    telegram = FakeTelegram()
+    dispatcher = TelegramDispatcher(per_chat_per_second=100, deliver=telegram, journal_path=journal)
+    assert dispatcher.drain(timeout=5)
+    dispatcher.close()
+    assert [text for _, _, text in telegram.calls] == ['a', 'b']
+
+    # Sent messages are not sent again
+    again = TelegramDispatcher(deliver=telegram, journal_path=journal)
+    again.close()
+    assert len(telegram.calls) == 2
+
+class SlowTelegram(FakeTelegram):
+    """Delivery stand-in that takes longer than the chat interval and tracks sends per chat"""
+    def __init__(self, results=()):
+        super().__init__(results)
+        self.sending = set()
+        self.overlaps = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, message):
+        with self._lock:
+            self.overlaps += message.chat_id in self.sending
+            self.sending.add(message.chat_id)
+        time.sleep(0.02)
+        with self._lock:
+            self.sending.discard(message.chat_id)
+            return super().__call__(message)
+
+def test_chats_have_one_message_in_flight_and_keep_their_order():
+    telegram = SlowTelegram([DeliveryResult(ok=False, retryable=True, error='HTTP 502')])
+    dispatcher = TelegramDispatcher(per_chat_per_second=1000, global_per_second=1000, workers=4,
+                                    backoff_seconds=0.05, deliver=telegram)
+    for i in range(10):
+        for chat in ('a', 'b'):
+            dispatcher.submit(f"{chat}{i}", 'token', chat)
+
+    assert dispatcher.drain(timeout=5)
+    dispatcher.close()
+
+    assert telegram.overlaps == 0
+    for chat in ('a', 'b'):
+        sent = [text for _, sent_to, text in telegram.calls if sent_to == chat]
+        assert list(dict.fromkeys(sent)) == [f"{chat}{i}" for i in range(10)]
@@ -0,0 +1,47 @@
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from benchmarks.standins import ParariusStandIn, TelegramStandIn, make_listings
+from modules import manage, objects, telegram
+from modules.dispatcher import get_dispatcher, shutdown_dispatcher
+
+@pytest.fixture
+def standins(monkeypatch):
+    with ParariusStandIn(make_listings(40), per_page=20) as pararius, TelegramStandIn() as bot_api:
+        monkeypatch.setattr(objects, 'BASE_URL', pararius.url)
+        monkeypatch.setattr(manage, 'SEARCH_BASE_URL', pararius.url)
+        monkeypatch.setattr(telegram, 'TELEGRAM_API_URL', bot_api.url)
+        telegram.close_senders()
+        yield pararius, bot_api
+        shutdown_dispatcher()
+        telegram.close_senders()
+        objects.configure_fetcher()
+
+def test_cronjob_notifies_every_listing_once(standins, tmp_path):
+    pararius, bot_api = standins
+
+    def run():
+        manage.cronjob(
+            searches=[{'city': 'haarlem', 'minimum_bedrooms': '', 'max_price_in_euros': '0', 'km_radius': ''}],
+            bot_token='test',
+            chat_id='test-chat',
+            max_pages=pararius.last_page,
+            fetcher_options={'strategy': 'http', 'requests_per_second': 1000, 'burst': 100},
+            storage_options={'backend': 'memory'},
+            known_links_options={'path': str(tmp_path / 'known_links.sqlite3')},
+            write_behind_options={'journal_path': str(tmp_path / 'write_journal.jsonl')},
+            telegram_options={'per_chat_per_second': 1000, 'global_per_second': 1000}
+        )
+        assert get_dispatcher().drain(timeout=30)
+
+    run()
+    notified = bot_api.notified_at()
+    assert sorted(notified) == sorted(listing.path for listing in pararius.listings)
+    assert len(bot_api.messages) == len(pararius.listings)
+
+    run()
+    assert len(bot_api.messages) == len(pararius.listings)
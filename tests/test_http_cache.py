@@ -0,0 +1,48 @@
+import sys
+import os
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.http_cache import HttpCache
+
+URL = 'https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/kruisstraat'
+
+def test_store_and_revalidate(tmp_path):
+    cache = HttpCache(str(tmp_path), fresh_seconds=0)
+    assert cache.get(URL) is None
+
+    cache.store(URL, '<html>1</html>', etag='"abc"', last_modified='Wed, 01 Oct 2026 10:00:00 GMT')
+    entry = cache.get(URL)
+
+    assert entry.body == '<html>1</html>'
+    assert not cache.is_fresh(entry)
+    assert HttpCache.conditional_headers(entry) == {
+        'If-None-Match': '"abc"',
+        'If-Modified-Since': 'Wed, 01 Oct 2026 10:00:00 GMT'
+    }
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = HttpCache(str(tmp_path), ttl_seconds=60)
+    cache.store(URL, '<html>1</html>')
+
+    entry = cache.get(URL)
+    entry.stored_at = time.time() - 120
+    cache._write(entry)
+
+    assert cache.get(URL) is None
+    assert os.listdir(tmp_path) == []
+
+def test_evict_keeps_total_size_under_limit(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=3000)
+    for i in range(5):
+        cache.store(f"{URL}/{i}", 'x' * 1000)
+        path = cache._path(f"{URL}/{i}")
+        os.utime(path, (time.time() - 100 + i, time.time() - 100 + i))
+
+    cache.evict()
+
+    assert cache.get(f"{URL}/0") is None
+    assert cache.get(f"{URL}/4") is not None
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 3000
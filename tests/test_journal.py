@@ -0,0 +1,25 @@
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.journal import Journal
+
+def test_append_rewrite_and_skip_a_partial_line(tmp_path):
+    path = tmp_path / 'data' / 'journal.jsonl'
+    journal = Journal(str(path))
+    journal.append([{'id': 1}, {'id': 2}])
+    journal.close()
+
+    # A crash mid-write leaves a partial last line
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('{"id": 3')
+    assert journal.read() == [{'id': 1}, {'id': 2}]
+
+    journal.open()
+    assert journal.rewrite([{'id': 2}])
+    journal.append([{'id': 4}])
+    journal.close()
+    assert journal.read() == [{'id': 2}, {'id': 4}]
+    assert [name for name in os.listdir(path.parent)] == ['journal.jsonl']
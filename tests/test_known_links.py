@@ -0,0 +1,72 @@
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.known_links import KnownLinksIndex, KnownListing
+
+class FakeStore:
+    """Store stand-in returning every row and recording the since it was queried with"""
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def query_links(self, since=None):
+        self.queries.append(since)
+        return iter(self.rows)
+
+def row(link, minute):
+    return {'link': link, 'Timestamp': datetime(2026, 10, 16, 10, minute, tzinfo=timezone.utc)}
+
+def test_first_sync_is_full_then_incremental(tmp_path):
+    index = KnownLinksIndex(str(tmp_path / 'index.sqlite3'), overlap_minutes=5)
+    store = FakeStore([row('a', 0), row('b', 30)])
+
+    index.sync(store)
+    assert 'a' in index and 'b' in index
+    assert store.queries[-1] is None
+
+    store.rows = [row('c', 40)]
+    index.sync(store)
+    assert 'c' in index and len(index) == 3
+    assert store.queries[-1] == datetime(2026, 10, 16, 10, 25, tzinfo=timezone.utc)
+
+def test_index_survives_restart_and_reconciles_deletions(tmp_path):
+    path = str(tmp_path / 'index.sqlite3')
+    index = KnownLinksIndex(path)
+    index.sync(FakeStore([row('a', 0), row('b', 1)]))
+    index.close()
+
+    reopened = KnownLinksIndex(path, full_reconcile_hours=0)
+    assert 'a' in reopened
+
+    reopened.sync(FakeStore([row('b', 1)]))
+    assert 'a' not in reopened and 'b' in reopened
+
+def test_newest_row_sets_hash_and_price(tmp_path):
+    path = str(tmp_path / 'index.sqlite3')
+    index = KnownLinksIndex(path)
+    index.sync(FakeStore([
+        {**row('a', 5), 'content_hash': 'new', 'price': 1400},
+        {**row('a', 0), 'content_hash': 'old', 'price': 1500},
+    ]))
+    assert index.get('a') == KnownListing('new', 1400)
+
+    index.add([{'link': 'b', 'content_hash': 'h', 'price': 900}])
+    index.close()
+    assert KnownLinksIndex(path).get('b') == KnownListing('h', 900)
+
+def test_sync_records_the_keys_of_the_newest_row(tmp_path):
+    path = str(tmp_path / 'index.sqlite3')
+    index = KnownLinksIndex(path)
+    index.sync(FakeStore([
+        {**row('a', 5), 'content_hash': 'new', 'PartitionKey': '202610-haarlem', 'RowKey': 'a'},
+        {**row('a', 0), 'content_hash': 'old', 'PartitionKey': '202601-haarlem', 'RowKey': 'a'},
+    ]))
+    index.close()
+
+    listing = KnownLinksIndex(path).get('a')
+    assert listing.stored_keys() == {'PartitionKey': '202610-haarlem', 'RowKey': 'a'}
+    assert KnownListing('h', 900).stored_keys() == {}
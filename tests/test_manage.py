@@ -0,0 +1,164 @@
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import manage
+from modules.filters import CardFilter
+from modules.known_links import KnownListing
+from modules.objects import ListingCard
+from modules.storage import MemoryStorage
+from modules.subscriptions import SubscriptionIndex
+
+def test_build_search_url():
+    url = manage.build_search_url(city='haarlem', minimum_bedrooms='2', max_price_in_euros='1500', km_radius='15')
+
+    assert url == 'https://www.pararius.com/apartments/haarlem/2-bedrooms/0-1500/radius-15'
+
+def test_crawl_searches_merges_overlapping_results(monkeypatch):
+    results = {
+        'https://www.pararius.com/apartments/haarlem': ['a', 'b', 'c'],
+        'https://www.pararius.com/apartments/heemstede': ['c', 'd'],
+    }
+    monkeypatch.setattr(
+        manage, 'get_pararius_cards',
+        lambda url, **kwargs: [ListingCard(url=link) for link in results[url]]
+    )
+
+    merged = manage.crawl_searches(list(results), known_links=set())
+
+    assert [card.url for card in merged] == ['a', 'b', 'c', 'd']
+
+def test_card_filter_rejects_only_on_known_values():
+    card_filter = CardFilter.from_config({'max_price': 1500, 'min_rooms': 2, 'postcodes': ['2011', '2012 a']})
+
+    assert card_filter.accepts(ListingCard(url='a', price=1450, rooms=3, postcode='2011 AB'))
+    assert card_filter.accepts(ListingCard(url='b'))
+    assert card_filter.accepts(ListingCard(url='c', postcode='2012AB'))
+    assert not card_filter.accepts(ListingCard(url='d', price=1600))
+    assert not card_filter.accepts(ListingCard(url='e', rooms=1))
+    assert not card_filter.accepts(ListingCard(url='f', postcode='2031 CD'))
+
+class FakeDispatcher:
+    """Dispatcher stand-in recording the submitted messages"""
+    def __init__(self, sent):
+        self.sent = sent
+
+    def submit(self, text, bot_token, chat_id):
+        self.sent.append(text)
+
+def test_changed_listings_notify_only_on_price_drop(monkeypatch):
+    details = {
+        'a': {'price': 1400, 'bedrooms': 2, 'service_costs': 0, 'rental_price_services': '', 'surface_area': 50},
+        'b': {'price': 1600, 'bedrooms': 2, 'service_costs': 0, 'rental_price_services': '', 'surface_area': 50},
+        'c': {'price': 1200, 'bedrooms': 1, 'service_costs': 0, 'rental_price_services': '', 'surface_area': 40},
+    }
+    sent = []
+    monkeypatch.setattr(manage, 'get_object_html', lambda link: link)
+    monkeypatch.setattr(manage, 'parse_object_details', lambda html: dict(details[html]))
+    store = MemoryStorage()
+
+    stored = manage.process_property_batch(
+        ['a', 'b', 'c'], store, bot_token='', chat_id='',
+        content_hashes={'a': 'h1', 'b': 'h2', 'c': 'h3'},
+        previous={'a': KnownListing('old', 1500), 'b': KnownListing('old', 1500)},
+        dispatcher=FakeDispatcher(sent)
+    )
+
+    assert sorted(row['link'] for row in stored) == ['a', 'b', 'c']
+    assert len(sent) == 2
+    drops = [text for text in sent if text.startswith('Price drop: ')]
+    assert len(drops) == 1 and drops[0].startswith('Price drop: €1500 → €1400')
+    assert any(text.endswith('\nc') for text in sent)
+    assert {row['link']: row['price'] for row in store.query_links()} == {'a': 1400, 'b': 1600, 'c': 1200}
+
+def test_listings_are_routed_to_matching_subscribers(monkeypatch):
+    link = 'https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/street'
+    details = {'price': 1400, 'bedrooms': 0, 'service_costs': 0, 'rental_price_services': '', 'surface_area': 55}
+    monkeypatch.setattr(manage, 'get_object_html', lambda link: '<html></html>')
+    monkeypatch.setattr(manage, 'parse_object_details', lambda html: dict(details))
+    sent = []
+
+    class RecordingDispatcher:
+        def submit(self, text, bot_token, chat_id):
+            sent.append(chat_id)
+
+    index = SubscriptionIndex.from_config([
+        {'chat_id': 'cheap', 'cities': ['haarlem'], 'max_price': 1200},
+        {'chat_id': 'roomy', 'cities': ['haarlem'], 'min_surface_area': 50, 'min_bedrooms': 2},
+        {'chat_id': 'leiden', 'cities': ['leiden']},
+    ])
+    manage.process_property_batch([link], MemoryStorage(), bot_token='', chat_id='',
+                                  dispatcher=RecordingDispatcher(), subscriptions=index)
+
+    # Bedrooms missing from the page (parsed as 0) do not fail min_bedrooms
+    assert sent == ['roomy']
+
+def test_failed_fetches_and_inserts_are_neither_stored_nor_notified(monkeypatch):
+    monkeypatch.setattr(manage, 'get_object_html', lambda link: None if link == 'gone' else link)
+    monkeypatch.setattr(manage, 'parse_object_details', lambda html: {
+        'price': 1000, 'bedrooms': 1, 'service_costs': 0, 'rental_price_services': '', 'surface_area': 40
+    })
+    store = MemoryStorage()
+    original_insert_rows = store.insert_rows
+
+    def insert_rows(rows):
+        result = original_insert_rows([row for row in rows if row['link'] != 'rejected'])
+        result.failures.update({row['link']: 'rejected' for row in rows if row['link'] == 'rejected'})
+        return result
+
+    monkeypatch.setattr(store, 'insert_rows', insert_rows)
+    sent = []
+
+    stored = manage.process_property_batch(
+        ['a', 'gone', 'rejected', 'b'], store, bot_token='', chat_id='', batch_size=2,
+        dispatcher=FakeDispatcher(sent)
+    )
+
+    assert sorted(row['link'] for row in stored) == ['a', 'b']
+    assert sorted(text.rsplit('\n', 1)[1] for text in sent) == ['a', 'b']
+
+def test_updates_name_the_row_they_replace(monkeypatch):
+    monkeypatch.setattr(manage, 'get_object_html', lambda link: link)
+    monkeypatch.setattr(manage, 'parse_object_details', lambda html: {
+        'price': 1400, 'bedrooms': 1, 'service_costs': 0, 'rental_price_services': '', 'surface_area': 40
+    })
+    written = []
+
+    class RecordingStore(MemoryStorage):
+        def insert_rows(self, rows):
+            rows = list(rows)
+            written.extend(rows)
+            return super().insert_rows(rows)
+
+    manage.process_property_batch(
+        ['a', 'b'], RecordingStore(), bot_token='', chat_id='',
+        previous={'a': KnownListing('old', 1500, '202601-haarlem', 'a')},
+        dispatcher=FakeDispatcher([])
+    )
+
+    keys = {row['link']: (row.get('PartitionKey'), row.get('RowKey')) for row in written}
+    assert keys == {'a': ('202601-haarlem', 'a'), 'b': (None, None)}
+
+def test_every_stage_takes_its_worker_count(monkeypatch):
+    monkeypatch.setattr(manage, 'get_object_html', lambda link: link)
+    monkeypatch.setattr(manage, 'parse_object_details', lambda html: {
+        'price': 1000, 'bedrooms': 1, 'service_costs': 0, 'rental_price_services': '', 'surface_area': 40
+    })
+    stages = []
+    original = manage.Pipeline.__init__
+
+    def record(self, stage_list):
+        stages.extend(stage_list)
+        original(self, stage_list)
+
+    monkeypatch.setattr(manage.Pipeline, '__init__', record)
+    stored = manage.process_property_batch(
+        [str(i) for i in range(10)], MemoryStorage(), bot_token='', chat_id='', batch_size=2,
+        dispatcher=FakeDispatcher([]),
+        pipeline_options={'fetch_workers': 3, 'parse_workers': 2, 'persist_workers': 2, 'notify_workers': 3}
+    )
+
+    assert len(stored) == 10
+    assert {stage.name: stage.workers for stage in stages} == {'fetch': 3, 'parse': 2, 'persist': 2, 'notify': 3}
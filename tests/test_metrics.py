@@ -0,0 +1,54 @@
+import sys
+import os
+import json
+import time
+import urllib.request
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.metrics import MemorySampler, MetricsRegistry, MetricsServer, current_rss_mb
+
+def test_stage_histograms_render_in_prometheus_format():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.observe('detail_fetch', 0.05)
+    registry.observe('detail_fetch', 0.5)
+    registry.inc('pararius_runs_total', result='success')
+    registry.set_gauge('pararius_last_run_duration_seconds', 12.5)
+
+    text = registry.render()
+
+    assert 'pararius_stage_seconds_bucket{stage="detail_fetch",le="0.1"} 1' in text
+    assert 'pararius_stage_seconds_bucket{stage="detail_fetch",le="1.0"} 2' in text
+    assert 'pararius_stage_seconds_bucket{stage="detail_fetch",le="+Inf"} 2' in text
+    assert 'pararius_stage_seconds_count{stage="detail_fetch"} 2' in text
+    assert 'pararius_runs_total{result="success"} 1.0' in text
+    assert 'pararius_last_run_duration_seconds 12.5' in text
+    assert registry.stage_summary()['detail_fetch']['count'] == 2
+
+def test_memory_sampler_catches_a_peak_between_readings():
+    before = current_rss_mb()
+    with MemorySampler(interval_seconds=0.01) as sampler:
+        ballast = b'x' * (64 * 1024 * 1024)
+        time.sleep(0.1)
+        del ballast
+
+    # The ballast is freed before the last reading, only the sampler saw it
+    assert sampler.peak_mb >= before + 50
+
+def test_server_exposes_metrics_health_and_summary():
+    registry = MetricsRegistry()
+    with registry.timer('telegram_send'):
+        pass
+    server = MetricsServer(registry, host='127.0.0.1', port=0, summary=lambda: {'runs': 3}).start()
+    try:
+        base = f"http://127.0.0.1:{server.port}"
+        with urllib.request.urlopen(f"{base}/metrics") as response:
+            assert 'stage="telegram_send"' in response.read().decode()
+        with urllib.request.urlopen(f"{base}/health") as response:
+            assert response.status == 200
+        with urllib.request.urlopen(f"{base}/summary") as response:
+            summary = json.loads(response.read())
+        assert summary['runs'] == 3 and summary['stages']['telegram_send']['count'] == 1
+    finally:
+        server.stop()
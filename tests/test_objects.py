@@ -0,0 +1,371 @@
+import sys
+import os
+import json
+import threading
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from modules import objects
+
+SEARCH_URL = 'https://www.pararius.com/apartments/haarlem/0-1500'
+
+def make_search_page(hrefs, last_page=1):
+    """Build a minimal search results page"""
+    items = "".join(
+        f'<a class="listing-search-item__link listing-search-item__link--title" href="{href}">x</a>'
+        for href in hrefs
+    )
+    pagination = "".join(
+        f'<a class="pagination__link" href="/apartments/haarlem/0-1500/page-{n}">{n}</a>'
+        for n in range(2, last_page + 1)
+    )
+    return f"<html><body>{items}{pagination}</body></html>"
+
+def test_iter_listing_links_yields_canonical_urls():
+    html = make_search_page([
+        '/apartment-for-rent/haarlem/1a2b3c4d/kruisstraat',
+        'https://www.pararius.com/apartment-for-rent/haarlem/5e6f7a8b/grote-markt?ref=x#top',
+    ])
+
+    assert list(objects.iter_listing_links(html)) == [
+        'https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/kruisstraat',
+        'https://pararius.com/apartment-for-rent/haarlem/5e6f7a8b/grote-markt',
+    ]
+
+def test_page_url():
+    assert objects._page_url(SEARCH_URL, 1) == SEARCH_URL
+    assert objects._page_url(SEARCH_URL, 3) == SEARCH_URL + '/page-3'
+    assert objects._page_url(SEARCH_URL + '/page-2/', 4) == SEARCH_URL + '/page-4'
+
+def test_last_page():
+    assert objects._last_page(make_search_page([], last_page=1)) == 1
+    assert objects._last_page(make_search_page([], last_page=7)) == 7
+
+def test_crawl_stops_at_page_without_new_links(monkeypatch):
+    pages = {
+        SEARCH_URL: make_search_page(['/a/1/', '/a/2/'], last_page=5),
+        SEARCH_URL + '/page-2': make_search_page(['/a/3/'], last_page=5),
+        SEARCH_URL + '/page-3': make_search_page(['/a/4/'], last_page=5),
+        SEARCH_URL + '/page-4': make_search_page(['/a/5/'], last_page=5),
+    }
+    fetched = []
+
+    def fake_fetch(url):
+        fetched.append(url)
+        return pages.get(url)
+
+    monkeypatch.setattr(objects, '_fetch_search_page', fake_fetch)
+
+    known = {'https://pararius.com/a/4/'}
+    links = objects.get_pararius_objects(
+        url=SEARCH_URL, known_links=known, max_pages=5, page_concurrency=1
+    )
+
+    assert links == [
+        'https://pararius.com/a/1/',
+        'https://pararius.com/a/2/',
+        'https://pararius.com/a/3/',
+        'https://pararius.com/a/4/',
+    ]
+    assert SEARCH_URL + '/page-4' not in fetched
+
+def test_crawl_single_page_when_first_page_known(monkeypatch):
+    fetched = []
+
+    def fake_fetch(url):
+        fetched.append(url)
+        return make_search_page(['/a/1/'], last_page=3)
+
+    monkeypatch.setattr(objects, '_fetch_search_page', fake_fetch)
+
+    objects.get_pararius_objects(
+        url=SEARCH_URL, known_links={'https://pararius.com/a/1/'}, max_pages=3
+    )
+
+    assert fetched == [SEARCH_URL]
+
+class FakeDriverManager:
+    def __init__(self):
+        self.urls = []
+
+    def _process_task(self, task):
+        self.urls.append(task['url'])
+        return make_search_page(['/a/1/'])
+
+def test_browser_fallback_only_without_listing_markup(monkeypatch):
+    driver_manager = FakeDriverManager()
+    monkeypatch.setattr(objects.ParariusDriver, 'get_instance', classmethod(lambda cls: driver_manager))
+
+    monkeypatch.setattr(objects, '_fetch_search_page_http', lambda url: make_search_page(['/a/2/']))
+    assert '/a/2/' in objects._fetch_search_page(SEARCH_URL)
+    assert driver_manager.urls == []
+
+    monkeypatch.setattr(objects, '_fetch_search_page_http', lambda url: None)
+    assert '/a/1/' in objects._fetch_search_page(SEARCH_URL)
+    assert driver_manager.urls == [SEARCH_URL]
+
+class FakeResponse:
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+class FakeSession:
+    def __init__(self, text):
+        self.text = text
+
+    def get(self, url, timeout=None):
+        return FakeResponse(self.text)
+
+def test_empty_results_page_is_a_successful_http_fetch(monkeypatch):
+    driver_manager = FakeDriverManager()
+    monkeypatch.setattr(objects.ParariusDriver, 'get_instance', classmethod(lambda cls: driver_manager))
+    monkeypatch.setattr(objects._rate_limiter, 'acquire', lambda url: None)
+
+    empty = '<html><body><ul class="search-list"><li class="search-list__no-results">No results</li></ul></body></html>'
+    monkeypatch.setattr(objects, 'get_http_session', lambda: FakeSession(empty))
+    assert objects._fetch_search_page(SEARCH_URL) == empty
+    assert list(objects.iter_listing_cards(empty)) == []
+    assert driver_manager.urls == []
+
+    # A page with neither listings nor a no-results notice, like a JS challenge, still falls back
+    monkeypatch.setattr(objects, 'get_http_session', lambda: FakeSession('<html><body>Checking your browser</body></html>'))
+    objects._fetch_search_page(SEARCH_URL)
+    assert driver_manager.urls == [SEARCH_URL]
+
+DETAIL_PAGE = """
+<html><head><script>var x = 1;</script></head><body>
+<nav class="menu"><a href="/">Home</a></nav>
+<section class="listing-detail-summary">
+  <div class="listing-detail-summary__price">
+    <span class="listing-detail-summary__price-main">€1,650</span>
+    <span class="listing-detail-summary__price-postfix">per month</span>
+  </div>
+  <ul class="illustrated-features">
+    <li class="illustrated-features__item illustrated-features__item--surface-area">75 m²</li>
+    <li class="illustrated-features__item illustrated-features__item--number-of-rooms">3 rooms</li>
+  </ul>
+</section>
+<section class="listing-features">
+  <dl class="listing-features__list">
+    <dd class="listing-features__description listing-features__description--number_of_bedrooms">2</dd>
+    <dd class="listing-features__description listing-features__description--service_costs">€ 50 per month</dd>
+  </dl>
+  <ul class="listing-features__sub-description"><li>Includes   gas</li></ul>
+</section>
+</body></html>
+"""
+
+def test_parse_object_details_returns_typed_values():
+    details = objects.parse_object_details(DETAIL_PAGE)
+
+    assert details == {
+        'price': 1650,
+        'bedrooms': 2,
+        'service_costs': 50,
+        'rental_price_services': 'Includes gas',
+        'surface_area': 75
+    }
+
+def test_parse_object_details_without_price_postfix():
+    html = DETAIL_PAGE.replace('<span class="listing-detail-summary__price-postfix">per month</span>', '')
+    details = objects.parse_object_details(html)
+
+    assert details['price'] == 1650
+
+def test_parse_object_details_defaults_for_missing_fields():
+    details = objects.parse_object_details("<html><body><p>Gone</p></body></html>")
+
+    assert details == {
+        'price': None,
+        'bedrooms': 0,
+        'service_costs': 0,
+        'rental_price_services': '',
+        'surface_area': 0
+    }
+
+class FakeDriver:
+    def __init__(self):
+        self.closed = False
+
+    def execute_script(self, script):
+        if self.closed:
+            raise RuntimeError("browser is gone")
+        return 1
+
+    def quit(self):
+        self.closed = True
+
+@pytest.fixture
+def driver_pool(monkeypatch):
+    """Fresh driver pool that starts fake drivers"""
+    monkeypatch.setattr(objects.ParariusDriver, '_instance', None)
+    monkeypatch.setattr(objects.ParariusDriver, '_setup_driver', lambda self: FakeDriver())
+    objects.ParariusDriver.configure(pool_size=2, max_pages_per_driver=2, max_driver_age_minutes=60)
+    yield objects.ParariusDriver.get_instance()
+    objects.ParariusDriver.configure()
+
+def test_driver_pool_is_bounded_and_reuses_drivers(driver_pool):
+    objects.ParariusDriver.configure(pool_size=2, max_pages_per_driver=10)
+
+    with driver_pool.checkout() as first:
+        with driver_pool.checkout() as second:
+            assert first is not second
+    assert driver_pool._created == 2
+
+    with driver_pool.checkout() as again:
+        assert again in (first, second)
+    assert driver_pool._created == 2
+
+def test_driver_pool_recycles_worn_out_and_dead_drivers(driver_pool):
+    with driver_pool.checkout() as first:
+        pass
+    with driver_pool.checkout() as driver:
+        assert driver is first
+
+    # Two pages served: the driver is retired on check-in
+    assert first.closed
+    with driver_pool.checkout() as replacement:
+        assert replacement is not first
+
+    replacement.quit()
+    with driver_pool.checkout() as driver:
+        assert driver is not replacement
+
+def test_driver_pool_wakes_waiters_when_drivers_are_retired(driver_pool):
+    objects.ParariusDriver.configure(pool_size=2, max_pages_per_driver=1)
+    holders_ready = threading.Barrier(3)
+    release = threading.Event()
+    got_driver = threading.Event()
+
+    def hold():
+        with driver_pool.checkout():
+            holders_ready.wait()
+            release.wait()
+
+    def wait_for_driver():
+        with driver_pool.checkout():
+            got_driver.set()
+
+    holders = [threading.Thread(target=hold, daemon=True) for _ in range(2)]
+    for holder in holders:
+        holder.start()
+    holders_ready.wait()
+
+    waiter = threading.Thread(target=wait_for_driver, daemon=True)
+    waiter.start()
+    assert not got_driver.wait(0.1)
+
+    # Both holders reach max_pages_per_driver and are retired instead of checked in
+    release.set()
+    for holder in holders:
+        holder.join()
+    assert got_driver.wait(2)
+    waiter.join()
+
+SEARCH_CARD = """
+<li class="search-list__item search-list__item--listing">
+  <section class="listing-search-item listing-search-item--list listing-search-item--for-rent">
+    <h2 class="listing-search-item__title">
+      <a class="listing-search-item__link listing-search-item__link--title"
+         href="/apartment-for-rent/haarlem/1a2b3c4d/kruisstraat">Flat Kruisstraat</a>
+    </h2>
+    <div class="listing-search-item__sub-title">2011 AB Haarlem (Centrum)</div>
+    <div class="listing-search-item__price">€1,450 per month</div>
+    <ul class="illustrated-features illustrated-features--compact">
+      <li class="illustrated-features__item illustrated-features__item--surface-area">62 m²</li>
+      <li class="illustrated-features__item illustrated-features__item--number-of-rooms">3 rooms</li>
+    </ul>
+  </section>
+</li>
+"""
+
+def test_iter_listing_cards_reads_card_summary():
+    cards = list(objects.iter_listing_cards(f"<html><body><ul>{SEARCH_CARD}</ul></body></html>"))
+
+    assert cards == [objects.ListingCard(
+        url='https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/kruisstraat',
+        price=1450,
+        surface_area=62,
+        rooms=3,
+        postcode='2011 AB'
+    )]
+
+class FakeChrome:
+    """webdriver.Chrome stand-in recording its options and CDP commands"""
+    def __init__(self, service=None, options=None):
+        self.options = options
+        self.cdp_commands = []
+        self.log = []
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp_commands.append((command, params))
+
+    def get_log(self, log_type):
+        entries, self.log = self.log, []
+        return entries
+
+@pytest.fixture
+def fake_chrome(monkeypatch):
+    monkeypatch.setattr(objects.ParariusDriver, '_instance', None)
+    monkeypatch.setattr(objects.webdriver, 'Chrome', FakeChrome)
+    monkeypatch.setattr(objects, 'Service', lambda **kwargs: None)
+    yield objects.ParariusDriver.get_instance()
+    objects.ParariusDriver.configure()
+
+def test_lean_driver_blocks_default_and_configured_patterns(fake_chrome):
+    objects.ParariusDriver.configure(lean=True, blocked_url_patterns=['*ads.example.com*'])
+    driver = fake_chrome._setup_driver()
+
+    assert driver.options.experimental_options['prefs'] == {'profile.managed_default_content_settings.images': 2}
+    assert ('Network.enable', {}) in driver.cdp_commands
+    blocked = dict(driver.cdp_commands)['Network.setBlockedURLs']['urls']
+    assert blocked == objects.BLOCKED_URL_PATTERNS + ['*ads.example.com*']
+
+    objects.ParariusDriver.configure(lean=False)
+    driver = fake_chrome._setup_driver()
+    assert driver.cdp_commands == [] and 'prefs' not in driver.options.experimental_options
+
+def network_event(method, **params):
+    """Performance log entry as chromedriver returns it"""
+    return {'level': 'INFO', 'message': json.dumps({'message': {'method': method, 'params': params}})}
+
+def test_driver_enables_the_performance_log_in_both_modes(fake_chrome):
+    for lean in (True, False):
+        objects.ParariusDriver.configure(lean=lean)
+        driver = fake_chrome._setup_driver()
+        assert driver.options.to_capabilities()['goog:loggingPrefs'] == {'performance': 'ALL'}
+
+def test_page_transfer_counts_encoded_bytes_of_finished_requests():
+    entries = [
+        network_event('Network.requestWillBeSent', requestId='1'),
+        network_event('Network.loadingFinished', requestId='1', encodedDataLength=2048),
+        # Cross-origin responses carry their size too
+        network_event('Network.loadingFinished', requestId='2', encodedDataLength=512),
+        network_event('Network.loadingFailed', requestId='3', blockedReason='inspector'),
+        {'level': 'INFO', 'message': 'not json'}
+    ]
+
+    assert objects.page_transfer(entries) == (2560, 2)
+
+def test_browser_stats_add_up_and_reset_on_drain(monkeypatch):
+    monkeypatch.setattr(objects, '_browser_stats', objects.BrowserFetchStats())
+    driver = FakeChrome()
+    driver.log = [network_event('Network.loadingFinished', encodedDataLength=1024)] * 5 + [
+        network_event('Network.loadingFinished', encodedDataLength=2048)
+    ]
+    objects.ParariusDriver._record_transfer(driver, SEARCH_URL, 1.25)
+    driver.log = [network_event('Network.loadingFinished', encodedDataLength=512)] * 2
+    objects.ParariusDriver._record_transfer(driver, SEARCH_URL, 0.5)
+
+    assert objects.pop_browser_stats() == {
+        'browser_fetches': 2, 'browser_kib': 8.0, 'browser_requests': 8, 'browser_seconds': 1.75
+    }
+    assert objects.pop_browser_stats() == {
+        'browser_fetches': 0, 'browser_kib': 0.0, 'browser_requests': 0, 'browser_seconds': 0.0
+    }
@@ -0,0 +1,55 @@
+import sys
+import os
+import threading
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.pipeline import Pipeline, Stage
+
+def test_items_pass_every_stage_and_failures_are_dropped():
+    def double(batch):
+        return [item * 2 for item in batch]
+
+    def fail_on_six(batch):
+        if 6 in batch:
+            raise ValueError("six")
+        return batch
+
+    pipeline = Pipeline([
+        Stage('double', double, workers=3),
+        Stage('check', fail_on_six, workers=2),
+        Stage('collect', lambda batch: batch, batch_size=4)
+    ])
+
+    assert sorted(pipeline.run(range(5))) == [0, 2, 4, 8]
+    assert pipeline.stats['double']['items'] == 5
+    assert pipeline.stats['check']['items'] == 5
+
+def test_slow_stages_overlap_and_bound_the_queues():
+    in_flight = []
+    lock = threading.Lock()
+
+    def slow(batch):
+        time.sleep(0.05)
+        return batch
+
+    def track(batch):
+        with lock:
+            in_flight.append(len(batch))
+        return batch
+
+    pipeline = Pipeline([
+        Stage('fetch', slow, workers=4, queue_size=2),
+        Stage('store', slow, workers=1, queue_size=2, batch_size=4),
+        Stage('track', track)
+    ])
+    started = time.monotonic()
+    results = pipeline.run(range(16))
+    elapsed = time.monotonic() - started
+
+    assert sorted(results) == list(range(16))
+    # Sequentially this takes 16 * 0.05 plus the store calls; the stages overlap instead
+    assert elapsed < 0.6
+    assert max(in_flight) <= 4
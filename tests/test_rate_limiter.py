@@ -0,0 +1,22 @@
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.rate_limiter import TokenBucket, HostRateLimiter
+
+def test_bucket_allows_burst_then_reports_wait():
+    bucket = TokenBucket(rate=2, capacity=2)
+
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+
+    wait = bucket.try_acquire()
+    assert 0 < wait <= 0.5
+
+def test_hosts_have_separate_budgets():
+    limiter = HostRateLimiter(rate=1, capacity=1)
+
+    assert limiter.bucket('https://www.pararius.com/a') is limiter.bucket('https://pararius.com/b')
+    assert limiter.bucket('https://pararius.com/a') is not limiter.bucket('https://api.telegram.org/x')
@@ -0,0 +1,76 @@
+import sys
+import os
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.known_links import KnownListing
+from modules.retention import apply_retention
+from modules.storage import MemoryStorage
+
+def expired_store(*links):
+    store = MemoryStorage()
+    store.insert_rows({'link': link, 'timestamp': 'then'} for link in links)
+    for row in store._rows.values():
+        row['Timestamp'] -= timedelta(days=100)
+    return store
+
+def test_live_rows_are_kept_and_gone_rows_archived(tmp_path):
+    store = expired_store('live', 'gone', 'unknown')
+    states = {'live': True, 'gone': False, 'unknown': None}
+
+    stats = apply_retention(store, ttl_days=90, archive_dir=str(tmp_path), is_live=states.get)
+
+    assert stats == {'expired': 3, 'superseded': 0, 'kept': 1, 'deleted': 1, 'unchecked': 1}
+    assert store.exists('live') and store.exists('unknown') and not store.exists('gone')
+    assert list(store.query_links(before=datetime.now(timezone.utc) - timedelta(days=90)))[0]['link'] == 'unknown'
+
+    archive, = os.listdir(tmp_path)
+    with gzip.open(tmp_path / archive, 'rt') as file:
+        assert [json.loads(line)['link'] for line in file] == ['gone']
+
+def test_recent_rows_are_untouched(tmp_path):
+    store = MemoryStorage()
+    store.insert_rows([{'link': 'a', 'timestamp': 'now'}])
+
+    assert apply_retention(store, ttl_days=90, archive_dir=str(tmp_path))['expired'] == 0
+    assert store.exists('a') and not os.listdir(tmp_path)
+
+class KeyedStore(MemoryStorage):
+    """Store holding one expired row per key, like a partitioned table with a stale copy left behind"""
+    def __init__(self, rows):
+        super().__init__()
+        self.expired = rows
+        self.deleted, self.touched = [], []
+
+    def query_links(self, since=None, before=None):
+        return iter(self.expired)
+
+    def delete_rows(self, rows):
+        rows = list(rows)
+        self.deleted += rows
+        return len(rows)
+
+    def touch_rows(self, rows):
+        rows = list(rows)
+        self.touched += rows
+        return len(rows)
+
+def test_superseded_rows_are_deleted_instead_of_touched(tmp_path):
+    stale = {'link': 'a', 'PartitionKey': '202601-haarlem', 'RowKey': 'a', 'price': 1500, 'content_hash': 'old'}
+    newest = {'link': 'b', 'PartitionKey': '202601-haarlem', 'RowKey': 'b', 'price': 900, 'content_hash': 'h'}
+    store = KeyedStore([stale, newest])
+    index = {
+        'a': KnownListing('new', 1400, '202604-haarlem', 'a'),
+        'b': KnownListing('h', 900, '202601-haarlem', 'b'),
+    }
+
+    stats = apply_retention(store, ttl_days=90, archive_dir=str(tmp_path),
+                            is_live=lambda link: True, newest_row=index.get)
+
+    assert stats['superseded'] == 1 and stats['kept'] == 1
+    assert store.deleted == [stale] and store.touched == [newest]
+    assert not os.listdir(tmp_path)
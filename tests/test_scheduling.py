@@ -0,0 +1,71 @@
+import sys
+import os
+import random
+from datetime import datetime, timedelta
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.scheduling import AdaptiveInterval, ArrivalModel
+
+# A Monday
+NOW = datetime(2026, 10, 12, 12, 0)
+
+def rows_at(times):
+    return [{'link': str(i), 'timestamp': when.strftime("%d/%m/%Y %H:%M:%S")} for i, when in enumerate(times)]
+
+def busy_mornings(weeks=4, per_hour=6):
+    """per_hour listings every Monday between 09:00 and 10:00, nothing else"""
+    monday = NOW.replace(hour=9, minute=0)
+    return rows_at(
+        monday - timedelta(weeks=week) + timedelta(minutes=i * 60 / per_hour)
+        for week in range(weeks) for i in range(per_hour)
+    )
+
+def test_arrival_rates_are_per_weekday_and_hour():
+    model = ArrivalModel(history_days=28)
+
+    assert model.fit(busy_mornings(weeks=4) + rows_at([NOW - timedelta(days=60)]), now=NOW) == 24
+
+    assert model.rate(NOW.replace(hour=9, minute=30)) == 6
+    assert model.rate(NOW.replace(hour=3)) == 0
+    assert model.rate((NOW + timedelta(days=1)).replace(hour=9)) == 0
+
+def test_interval_follows_the_rate_within_bounds():
+    model = ArrivalModel()
+    model.fit(busy_mornings(weeks=1, per_hour=30), now=NOW)
+    interval = AdaptiveInterval(model, min_interval_minutes=2, max_interval_minutes=30, jitter=0)
+
+    assert interval.base_minutes(NOW.replace(hour=9, minute=10)) == 2
+    assert interval.base_minutes(NOW.replace(hour=3)) == 30
+    # Within one longest interval of the busy hour, runs already speed up
+    assert interval.base_minutes(NOW.replace(hour=8, minute=40)) == 2
+
+def test_without_history_the_default_interval_is_used():
+    interval = AdaptiveInterval(ArrivalModel(), max_interval_minutes=30, jitter=0, default_interval_minutes=5)
+
+    assert interval.next_minutes(now=NOW) == 5
+
+def test_errors_back_off_and_success_resets():
+    interval = AdaptiveInterval(ArrivalModel(), min_interval_minutes=2, max_interval_minutes=10,
+                                jitter=0, max_backoff_minutes=35, default_interval_minutes=5)
+
+    assert [interval.next_minutes(error=True, now=NOW) for _ in range(4)] == [10, 20, 35, 35]
+    assert interval.next_minutes(now=NOW) == 5
+
+def test_jitter_stays_within_its_fraction():
+    interval = AdaptiveInterval(ArrivalModel(), jitter=0.2, default_interval_minutes=10, rng=random.Random(1))
+
+    minutes = [interval.next_minutes(now=NOW) for _ in range(200)]
+    assert min(minutes) >= 8 and max(minutes) <= 12 and len(set(minutes)) > 1
+
+def test_jitter_never_leaves_the_interval_bounds():
+    quiet = AdaptiveInterval(ArrivalModel(), min_interval_minutes=2, max_interval_minutes=30,
+                             jitter=0.5, rng=random.Random(3))
+    busy = AdaptiveInterval(ArrivalModel(), min_interval_minutes=2, max_interval_minutes=30,
+                            jitter=0.5, default_interval_minutes=2, rng=random.Random(3))
+
+    at_max = [quiet.next_minutes(now=NOW) for _ in range(200)]
+    at_min = [busy.next_minutes(now=NOW) for _ in range(200)]
+    assert max(at_max) == 30 and min(at_max) < 30
+    assert min(at_min) == 2 and max(at_min) > 2
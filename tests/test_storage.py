@@ -0,0 +1,72 @@
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.storage import MemoryStorage, SQLiteStorage, create_storage
+
+LINK = 'https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/kruisstraat'
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        yield MemoryStorage()
+    else:
+        store = SQLiteStorage(str(tmp_path / 'links.sqlite3'))
+        yield store
+        store.cleanup()
+
+def test_insert_and_exists(store):
+    assert not store.exists(LINK)
+    assert store.insert_row_to_table(LINK, '16/10/2026 10:00:00')
+    assert store.exists(LINK)
+
+    # Single inserts refuse duplicates, bulk inserts upsert
+    assert not store.insert_row_to_table(LINK, '16/10/2026 10:05:00')
+    result = store.insert_rows([{'link': LINK, 'timestamp': '16/10/2026 10:05:00'}, {'link': LINK + '2', 'timestamp': 'x'}])
+    assert result.inserted == 2 and not result.failures
+
+def test_query_links_since(store):
+    store.insert_rows([{'link': LINK, 'timestamp': '16/10/2026 10:00:00'}])
+    rows = list(store.query_links())
+
+    assert [row['link'] for row in rows] == [LINK]
+    assert rows[0]['Timestamp'].tzinfo is not None
+    assert list(store.query_links(since=datetime.now(timezone.utc) + timedelta(minutes=1))) == []
+
+def test_memory_backend_outlives_a_run():
+    assert create_storage('memory') is create_storage('memory')
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_storage('dynamodb')
+
+def test_detail_columns_round_trip(store):
+    store.insert_rows([{'link': LINK, 'timestamp': 'x', 'price': 1450, 'bedrooms': 2, 'content_hash': 'abc'}])
+    row, = store.query_links()
+
+    assert row['price'] == 1450 and row['content_hash'] == 'abc'
+
+def test_rows_keep_the_detail_columns_they_leave_out(store):
+    link = 'https://pararius.com/a/1/'
+    store.insert_rows([{'link': link, 'timestamp': 't1', 'price': 1500, 'bedrooms': 2,
+                        'rental_price_services': 'Includes gas', 'content_hash': 'old'}])
+    store.insert_rows([{'link': link, 'timestamp': 't2', 'price': 1400, 'content_hash': 'new'}])
+
+    row, = store.query_links()
+    assert (row['timestamp'], row['price'], row['content_hash']) == ('t2', 1400, 'new')
+    assert (row['bedrooms'], row['rental_price_services']) == (2, 'Includes gas')
+
+def test_query_before_delete_and_touch(store):
+    store.insert_rows([{'link': LINK, 'timestamp': 'x'}, {'link': LINK + '2', 'timestamp': 'x'}])
+    later = datetime.now(timezone.utc) + timedelta(seconds=1)
+    expired = list(store.query_links(before=later))
+    assert len(expired) == 2
+
+    assert store.delete_rows(expired[:1]) == 1
+    assert store.touch_rows(expired[1:]) == 1
+    assert [row['link'] for row in store.query_links()] == [expired[1]['link']]
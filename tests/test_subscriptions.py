@@ -0,0 +1,68 @@
+import sys
+import os
+import random
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.subscriptions import Subscription, SubscriptionIndex
+
+def test_match_by_city_price_and_criteria():
+    index = SubscriptionIndex.from_config([
+        {'chat_id': 1, 'cities': ['Haarlem'], 'max_price': 1500, 'min_bedrooms': 2},
+        {'chat_id': 2, 'cities': ['haarlem', 'leiden'], 'max_price': 1200},
+        {'chat_id': 3, 'postcodes': ['2011']},
+    ])
+
+    assert sorted(index.chat_ids(city='haarlem', price=1400, bedrooms=2, postcode='2011 AB')) == ['1', '3']
+    assert index.chat_ids(city='haarlem', price=1100, bedrooms=1, postcode='2031 CD') == ['2']
+    assert index.chat_ids(city='leiden', price=1600, postcode='2312 AA') == []
+    # Unknown values never reject
+    assert sorted(index.chat_ids(city='haarlem')) == ['1', '2', '3']
+
+def test_default_chat_receives_everything_without_subscriptions():
+    assert SubscriptionIndex.from_config([], default_chat_id='42').chat_ids(city='utrecht', price=9999) == ['42']
+    assert SubscriptionIndex.from_config(None).size == 0
+
+def test_index_agrees_with_a_linear_scan_and_is_cheaper_per_listing():
+    rng = random.Random(7)
+    cities = ['haarlem', 'leiden', 'amsterdam', 'utrecht']
+    subscriptions = [
+        Subscription(chat_id=str(i), cities=rng.sample(cities, rng.randint(0, 2)),
+                     max_price=rng.choice([None, *range(800, 3000, 100)]),
+                     min_bedrooms=rng.choice([None, 1, 2, 3, 4]),
+                     min_surface_area=rng.choice([None, 40, 60, 80]),
+                     postcodes=rng.choice([[], ['20'], ['2011', '1012']]))
+        for i in range(5000)
+    ]
+    index = SubscriptionIndex(subscriptions)
+
+    def random_value(values):
+        # Unknown listing values must never reject
+        return None if rng.random() < 0.1 else rng.choice(values)
+
+    listings = [
+        {'city': random_value(cities), 'price': random_value(range(800, 3000)),
+         'bedrooms': random_value(range(1, 5)), 'surface_area': random_value(range(30, 120)),
+         'postcode': random_value(['2011 AB', '2031 CD', '1012 XY', '3511 AA'])}
+        for _ in range(200)
+    ]
+
+    for listing in listings:
+        matched = [s.chat_id for s in index.match(**listing)]
+        assert len(matched) == len(set(matched))
+        assert set(matched) == {s.chat_id for s in subscriptions if s.matches(**listing)}
+
+    started = time.perf_counter()
+    for listing in listings:
+        index.match(**listing)
+    indexed = (time.perf_counter() - started) / len(listings)
+
+    started = time.perf_counter()
+    for listing in listings:
+        [s for s in subscriptions if s.matches(**listing)]
+    scanned = (time.perf_counter() - started) / len(listings)
+
+    print(f"5000 subscriptions: {indexed * 1000:.3f} ms per listing indexed, {scanned * 1000:.3f} ms scanned")
+    assert indexed < scanned / 2
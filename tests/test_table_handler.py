@@ -0,0 +1,192 @@
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from azure.core.exceptions import ResourceNotFoundError
+from azure.data.tables import TableTransactionError
+from modules.table_handler import AzureTableHandler, month_keys
+
+class FakeTableClient:
+    """Table client stand-in that fails transactions containing a poisoned link"""
+    def __init__(self, poisoned=(), stored=None):
+        self.poisoned = set(poisoned)
+        self.stored = stored or {}
+        self.transactions = []
+        self.upserts = []
+
+    def get_entity(self, partition_key, row_key, select=None):
+        if (partition_key, row_key) not in self.stored:
+            raise ResourceNotFoundError("not found")
+        return self.stored[(partition_key, row_key)]
+
+    def submit_transaction(self, operations):
+        self.transactions.append(operations)
+        if any(entity['link'] in self.poisoned for _, entity in operations):
+            raise TableTransactionError(message="batch failed")
+
+    def upsert_entity(self, entity):
+        self.upserts.append(entity)
+        if entity['link'] in self.poisoned:
+            raise ValueError("rejected")
+
+def make_handler(table_client):
+    handler = AzureTableHandler('DefaultEndpointsProtocol=https;AccountName=test;AccountKey=a2V5;EndpointSuffix=core.windows.net')
+    handler._table_client = table_client
+    return handler
+
+def rows(count):
+    return [{'link': f"https://pararius.com/apartment-for-rent/haarlem/{i:08x}/street", 'timestamp': 'now'}
+            for i in range(count)]
+
+def test_insert_rows_batches_up_to_100_per_transaction():
+    client = FakeTableClient()
+    result = make_handler(client).insert_rows(rows(150))
+
+    assert [len(operations) for operations in client.transactions] == [100, 50]
+    assert result.inserted == 150 and result.requests == 2 and not result.failures
+
+def test_insert_rows_reports_per_entity_failures():
+    batch = rows(3)
+    client = FakeTableClient(poisoned=[batch[1]['link']])
+    result = make_handler(client).insert_rows(batch)
+
+    assert result.inserted == 2
+    assert result.failed_links == [batch[1]['link']]
+
+def test_keys_are_partitioned_by_month_and_city():
+    handler = make_handler(FakeTableClient())
+    entity = handler._create_entity("https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/street", 'now')
+    other = handler._create_entity("https://pararius.com/house-for-rent/leiden/1a2b3c4d/street", 'now')
+
+    assert entity['PartitionKey'] == f"{datetime.now(timezone.utc):%Y%m}-haarlem"
+    assert entity['RowKey'] == 'apartment-for-rent|haarlem|1a2b3c4d|street'
+    assert entity['RowKey'] != other['RowKey']
+
+def test_month_keys_cross_year_boundaries():
+    assert month_keys(datetime(2025, 11, 20), datetime(2026, 2, 1)) == ['202602', '202601', '202512', '202511']
+
+def test_query_links_reads_months_since_and_legacy_partition():
+    handler = make_handler(FakeTableClient())
+    handler.history_months = 3
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+    filters = handler._partition_filters(since)
+
+    month = f"{since:%Y%m}"
+    assert filters[-1].startswith("PartitionKey eq 'pararius'")
+    assert any(f"PartitionKey ge '{month}-' and PartitionKey lt '{month}.'" in f for f in filters)
+    assert all('Timestamp ge' in f for f in filters)
+    assert len(handler._partition_filters()) == 4
+
+def test_delete_rows_batches_per_partition():
+    client = FakeTableClient()
+    stored = [{'PartitionKey': f"2026{month:02d}-haarlem", 'RowKey': str(i), 'link': str(i)}
+              for month in (9, 10) for i in range(120)]
+    assert make_handler(client).delete_rows(stored) == 240
+
+    assert [len(operations) for operations in client.transactions] == [100, 20, 100, 20]
+    assert all(operation == 'delete' for operations in client.transactions for operation, _ in operations)
+
+def test_updated_rows_replace_the_row_in_their_old_partition():
+    client = FakeTableClient()
+    link = "https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/street"
+    current = f"{datetime.now(timezone.utc):%Y%m}-haarlem"
+    make_handler(client).insert_rows([
+        {'link': link, 'timestamp': 'now', 'price': 1400,
+         'PartitionKey': '202601-haarlem', 'RowKey': 'apartment-for-rent|haarlem|1a2b3c4d|street'},
+    ])
+
+    (upsert, stored), = client.transactions[0]
+    assert upsert == 'upsert' and stored['PartitionKey'] == current and 'price' in stored
+    (delete, old), = client.transactions[1]
+    assert delete == 'delete' and old['PartitionKey'] == '202601-haarlem'
+
+def test_moved_rows_keep_the_detail_columns_they_leave_out():
+    link = "https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/street"
+    old_keys = ('202601-haarlem', 'apartment-for-rent|haarlem|1a2b3c4d|street')
+    client = FakeTableClient(stored={old_keys: {'price': 1500, 'bedrooms': 2, 'surface_area': 70}})
+    make_handler(client).insert_rows([
+        {'link': link, 'timestamp': 'now', 'price': 1400, 'content_hash': 'new',
+         'PartitionKey': old_keys[0], 'RowKey': old_keys[1]},
+    ])
+
+    (_, stored), = client.transactions[0]
+    assert (stored['price'], stored['bedrooms'], stored['surface_area'], stored['content_hash']) == (1400, 2, 70, 'new')
+
+def test_failed_updates_keep_the_old_row():
+    link = "https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/street"
+    client = FakeTableClient(poisoned=[link])
+    make_handler(client).insert_rows([
+        {'link': link, 'timestamp': 'now', 'PartitionKey': '202601-haarlem', 'RowKey': 'x'},
+    ])
+
+    assert all(operation == 'upsert' for operations in client.transactions for operation, _ in operations)
+
+class SlowLookupClient:
+    """Table client stand-in whose point lookups take a while and only find the given partitions"""
+    def __init__(self, stored=()):
+        self.stored = set(stored)
+        self.lookups = 0
+        self._lock = threading.Lock()
+
+    def get_entity(self, partition_key, row_key, select=None):
+        with self._lock:
+            self.lookups += 1
+        time.sleep(0.02)
+        if partition_key not in self.stored:
+            raise ResourceNotFoundError("not found")
+        return {'link': row_key}
+
+def test_exists_runs_the_point_lookups_concurrently():
+    link = "https://pararius.com/apartment-for-rent/haarlem/1a2b3c4d/street"
+    client = SlowLookupClient()
+    handler = make_handler(client)
+    handler.history_months, handler.query_workers = 36, 8
+
+    started = time.monotonic()
+    assert not handler.exists(link)
+    # 37 lookups of 20 ms one after another would take 0.74s
+    assert time.monotonic() - started < 0.4
+    assert client.lookups == 37
+
+    client.stored = {'pararius'}
+    assert handler.exists(link)
+
+class SlowServiceClient:
+    """TableServiceClient stand-in that takes a while to hand out table clients"""
+    created = 0
+
+    def __init__(self):
+        SlowServiceClient.created += 1
+
+    @classmethod
+    def from_connection_string(cls, conn_str):
+        time.sleep(0.02)
+        return cls()
+
+    def get_table_client(self, table_name):
+        time.sleep(0.02)
+        return SlowLookupClient(stored={'pararius'})
+
+def test_concurrent_first_lookups_share_one_client(monkeypatch):
+    monkeypatch.setattr('modules.table_handler.TableServiceClient', SlowServiceClient)
+    SlowServiceClient.created = 0
+    handler = make_handler(None)
+    clients = []
+
+    def lookup():
+        with handler._get_table_client() as table_client:
+            clients.append(table_client)
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert SlowServiceClient.created == 1
+    assert len({id(client) for client in clients}) == 1
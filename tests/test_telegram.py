@@ -0,0 +1,41 @@
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import telegram
+from modules.telegram import pack_digest, get_sender
+
+def test_pack_digest_fills_messages_up_to_the_limit():
+    listings = [f"listing {i}\n" + 'x' * 180 for i in range(30)]
+    packed = pack_digest(listings)
+
+    assert len(packed) == 2
+    assert all(len(text) <= telegram.MAX_MESSAGE_LENGTH for text in packed)
+    assert packed[0].startswith('listing 0') and 'listing 29' in packed[-1]
+
+def test_pack_digest_splits_oversized_messages_at_line_breaks():
+    packed = pack_digest(['a' * 60 + '\n' + 'b' * 60], limit=100)
+
+    assert packed == ['a' * 60, 'b' * 60]
+
+def test_sender_is_cached_per_bot_and_posts_json(monkeypatch):
+    calls = []
+
+    class Response:
+        ok = True
+        def json(self):
+            return {'ok': True}
+        def __enter__(self):
+            return self
+        def __exit__(self, *args):
+            pass
+
+    sender = get_sender('token', 'chat')
+    assert get_sender('token') is sender
+    monkeypatch.setattr(sender.session, 'post', lambda url, **kwargs: calls.append(kwargs) or Response())
+
+    assert telegram.send_text('hello_world', bot_token='token', chat_id='other') == {'ok': True}
+    assert calls[0]['json'] == {'chat_id': 'other', 'parse_mode': 'Markdown', 'text': 'hello world'}
+    telegram.close_senders()
@@ -0,0 +1,57 @@
+import sys
+import os
+import time
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.storage import MemoryStorage
+from modules.write_behind import WriteBehindQueue
+
+class FlakyStore(MemoryStorage):
+    """Memory store rejecting the links in failing"""
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+
+    def insert_rows(self, rows):
+        rows = list(rows)
+        result = super().insert_rows(row for row in rows if row['link'] not in self.failing)
+        result.failures = {row['link']: 'rejected' for row in rows if row['link'] in self.failing}
+        return result
+
+def rows(*links):
+    return [{'link': link, 'timestamp': 'now'} for link in links]
+
+def test_rows_reach_the_store_on_close(tmp_path):
+    store = MemoryStorage()
+    with WriteBehindQueue(store, str(tmp_path / 'journal.jsonl'), flush_interval_seconds=60) as queue:
+        assert queue.insert_rows(rows('a', 'b')).inserted == 2
+
+    assert store.exists('a') and store.exists('b')
+    assert os.path.getsize(tmp_path / 'journal.jsonl') == 0
+
+def test_failed_rows_are_replayed_by_the_next_queue(tmp_path):
+    journal = str(tmp_path / 'journal.jsonl')
+    store = FlakyStore(failing=['b'])
+    with WriteBehindQueue(store, journal, flush_interval_seconds=60) as queue:
+        queue.insert_rows(rows('a', 'b'))
+    assert store.exists('a') and not store.exists('b')
+
+    store.failing.clear()
+    with WriteBehindQueue(store, journal) as queue:
+        assert [row['link'] for row in queue.pending_rows()] == ['b']
+    assert store.exists('b')
+
+def test_batch_size_triggers_a_background_flush(tmp_path):
+    store = MemoryStorage()
+    queue = WriteBehindQueue(store, str(tmp_path / 'journal.jsonl'), batch_size=2, flush_interval_seconds=60)
+    queue.start()
+    queue.insert_rows(rows('a', 'b'))
+
+    for _ in range(100):
+        if store.exists('b'):
+            break
+        time.sleep(0.01)
+    assert store.exists('b')
+    queue.close()